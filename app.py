@@ -1,10 +1,36 @@
 import streamlit as st
-import json, math
+import functools, json, math, os, tempfile
 import pandas as pd
+import altair as alt
 import numpy as np
 from datetime import datetime
 
+from scsim import (BASE_FORECAST, LT_PROFILES, VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED,
+                   compute_kpis, cumulative_kpis, make_playback_html)
+from scsim import simulate_flows as _simulate_flows, resume_flows, valuate
+from scsim.engine import RESUME_ARGS
+from scsim.valuation import ECON_ARGS
+from scsim.sweep import run_sweep
+from scsim.cache import DiskCache
+from scsim.frames import chart_frames, week_table
+from scsim.demand import demand_vector, demand_over
+from scsim.ingest import load_demand
+from scsim.stochastic import run_monte_carlo
+from scsim.solver import kpis_at, min_stock_for_target, min_capacity_for_target, cheapest_split_for_target
+from scsim.profiling import PhaseTimer, ProfileLog
+from scsim.sensitivity import sensitivity
+
 st.set_page_config(layout="wide", page_title="Supply Chain Agility Simulator", page_icon="\U0001f3ed")
+# Per-phase timings of this run; the session keeps the last 200 runs.
+# SCSIM_PROFILE_LOG appends every run as a JSON line; ?debug=1 shows the panel
+prof = PhaseTimer("run")
+prof.phase("setup")
+if "_profile" not in st.session_state:
+    st.session_state["_profile"] = ProfileLog(sink=os.environ.get("SCSIM_PROFILE_LOG"))
+profile_log = st.session_state["_profile"]
+
+# Week steps rerun only the week view (st.fragment is Streamlit >= 1.37)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
 
 # ════════════════════════════════════════════════════════════════
 # SESSION STATE DEFAULTS
@@ -23,796 +49,93 @@ DEMAND_SHAPES = [
     "\U0001f4c8 Linear ramp then flat",
     "\U0001f4c9 Linear drop then flat",
     "\U0001f30a Seasonal (curve profile)",
+    "\U0001f4c2 Demand file (CSV / Parquet)",
 ]
+# Seasonal radio label -> scsim.demand.SEASONAL profile
+SEASONAL_PROFILES = {"Very Steep": "very_steep", "Steep": "steep", "~Flat": "flat"}
 for _k, _v in _DEFAULTS.items():
     if _k not in st.session_state:
         st.session_state[_k] = _v
 
-BASE_FORECAST = 100  # Fixed (point 3)
-
-# ════════════════════════════════════════════════════════════════
-# PRESET SCENARIOS (3 Lead Time × 3 Demand)
-# ════════════════════════════════════════════════════════════════
-LT_PROFILES = {
-    "Agile": {"mat_lt": 4, "semi_lt": 2, "fp_lt": 1, "dist_lt": 1, "order_freq": 1},
-    "Medium": {"mat_lt": 8, "semi_lt": 4, "fp_lt": 2, "dist_lt": 2, "order_freq": 2},
-    "Push":   {"mat_lt": 12, "semi_lt": 6, "fp_lt": 3, "dist_lt": 3, "order_freq": 4},
+# Results persist on disk across restarts and replicas sharing the file;
+# SCSIM_CACHE sets its path ("off" keeps the in-memory cache only)
+_cache_path = os.environ.get("SCSIM_CACHE", os.path.join(tempfile.gettempdir(), "scsim-cache.sqlite"))
+disk_cache = st.cache_resource(DiskCache)(_cache_path) if _cache_path != "off" else None
+
+
+def _simulate_flows_disk(_prev=None, **params):
+    # _prev (unhashed): this session's last (other args, flows); when only the
+    # demand moved, a miss re-simulates from the first edited week
+    compute, how = _simulate_flows, "simulated"
+    if _prev is not None and _prev[0] == {k: v for k, v in params.items() if k not in RESUME_ARGS}:
+        compute, how = functools.partial(resume_flows, _prev[1]), "resumed"
+
+    def run(**p):
+        prof.note("flows", how)
+        return compute(**p)
+
+    prof.note("flows", "disk hit")
+    if disk_cache is None:
+        return run(**params)
+    return disk_cache.run(run, **params)
+
+
+# Only the physical flow is cached: price / cost sliders re-value it, never re-simulate
+simulate_flows = st.cache_data(_simulate_flows_disk)
+run_sweep_cached = st.cache_data(run_sweep, show_spinner=False)
+run_monte_carlo_cached = st.cache_data(run_monte_carlo, show_spinner=False)
+sensitivity_cached = st.cache_data(sensitivity, show_spinner=False, max_entries=32)
+kpis_at_cached = st.cache_data(kpis_at, show_spinner=False, max_entries=32)
+
+ALL = "All"
+
+
+def file_history():
+    """(DemandHistory of the uploaded demand file or None, error message or None).
+
+    Parsed once per file content (load_demand hashes it), not on every rerun.
+    """
+    up = st.session_state.get("demand_file")
+    if up is None:
+        return None, None
+    try:
+        return load_demand(up.getvalue()), None
+    except (ValueError, ImportError) as e:
+        return None, f"Could not read {up.name}: {e}"
+
+
+def file_demand(history, weeks):
+    """custom_demand from the file: the selected store / SKU from the selected first week."""
+    store = st.session_state.get("demand_file_store", ALL)
+    sku = st.session_state.get("demand_file_sku", ALL)
+    return history.window(st.session_state.get("demand_file_start", 1), weeks,
+                          None if store == ALL else store, None if sku == ALL else sku)
+
+# Sweepable parameters: label -> (param, slider min, slider max, step, default range)
+SWEEP_AXES = {
+    "Order frequency (wk)": ("order_freq", 1, 4, 1, (1, 4)),
+    "Total lead time (wk)": ("total_lt", 4, 48, 1, (8, 24)),
+    "Total initial stock (pcs)": ("total_stock", 0, 10000, 250, (0, 10000)),
+    "Starting capacity (pcs/wk)": ("cap_start", 10, 1000, 10, (50, 300)),
+    "Capacity ramp-up (%/wk)": ("cap_ramp", 0, 50, 5, (0, 50)),
+    "Store A demand (%)": ("store_a_pct", 0, 100, 5, (20, 80)),
+}
+SWEEP_METRICS = {
+    "Service level": "svc_level", "Net margin (\u20ac)": "margin", "Margin %": "margin_pct",
+    "Missed sales (pcs)": "total_missed", "Stockout weeks": "stockout_weeks",
+    "Useful production %": "useful_pct",
+}
+SENS_LEVERS = {
+    "mat_lt": "Raw material LT", "semi_lt": "Semi-finished LT", "fp_lt": "Finishing LT",
+    "dist_lt": "Distribution LT", "order_freq": "Order frequency", "cap_start": "Starting capacity",
+    "cap_ramp": "Capacity ramp-up", "total_stock": "Total initial stock", "store_pct": "Store share of stock",
+    "store_a_pct": "Store A demand split",
 }
-
-
-# ════════════════════════════════════════════════════════════════
-# VALORIZATION CONSTANTS
-# ════════════════════════════════════════════════════════════════
-VALOR_RAW_MAT = 0.50
-VALOR_SEMI    = 0.75
-VALOR_FINISHED = 1.00
-
-# ════════════════════════════════════════════════════════════════
-# SIMULATION ENGINE — with stage-specific push logic (points 9, 10)
-# ════════════════════════════════════════════════════════════════
-@st.cache_data
-def run_simulation(weeks, init_store, init_cw, init_semi, init_rawmat,
-                   order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
-                   cap_start, cap_ramp, base_forecast,
-                   demand_mult, ramp_start, ramp_end,
-                   price, var_cost, fixed_pct, store_a_pct, smart_distrib,
-                   custom_demand=None):
-
-    phys_lt = mat_lt + semi_lt + fp_lt + dist_lt
-    coverage = phys_lt + order_freq
-    pct_a = store_a_pct / 100.0
-    pct_b = 1.0 - pct_a
-
-
-    demand = {}
-    if custom_demand is not None:
-        for w in range(0, weeks + 1):
-            demand[w] = int(custom_demand[w]) if w < len(custom_demand) else int(custom_demand[-1])
-    else:
-        for w in range(0, weeks + 1):
-            if w < ramp_start:
-                demand[w] = base_forecast
-            elif ramp_start == ramp_end:
-                demand[w] = round(base_forecast * demand_mult)
-            elif w <= ramp_end:
-                p = (w - ramp_start) / (ramp_end - ramp_start)
-                demand[w] = round(base_forecast + (base_forecast * demand_mult - base_forecast) * p)
-            else:
-                demand[w] = round(base_forecast * demand_mult)
-
-    mat_pipe = [0.0] * max(1, mat_lt)
-    semi_pipe = [0.0] * max(1, semi_lt)
-    fp_pipe = [0.0] * max(1, fp_lt)
-    dist_pipe_a = [0.0] * max(1, dist_lt)
-    dist_pipe_b = [0.0] * max(1, dist_lt)
-
-    # Initial store stock: ALWAYS 50/50 (push reality — planner hasn't reviewed yet)
-    store_a = float(init_store) / 2.0
-    store_b = float(init_store) / 2.0
-    raw_mat = float(init_rawmat)
-    semi = float(init_semi)
-    cw = float(init_cw)
-
-    pb = 0.0  # supplier backlog
-    pn = 0; pc = float(cap_start)
-    sn = 0; sc_ = float(cap_start)
-    fn = 0; fpc = float(cap_start)
-    co = 0.0; cas = 0.0
-    smart_discovered = False
-    first_order_week = None  # capacity ramp starts the week AFTER first order
-
-    ow = list(range(order_freq, weeks + 1, order_freq)) if order_freq > 1 else list(range(1, weeks + 1))
-    states = []
-    ff = float(base_forecast)  # forecast: starts at base, updates at planning freq only
-
-    s0 = {
-        'week': 0,
-        'demand': 0, 'demand_a': 0, 'demand_b': 0,
-        'forecast': base_forecast,
-        'mat_arr': 0, 'semi_arr': 0, 'fp_arr': 0,
-        'dist_arr_a': 0, 'dist_arr_b': 0, 'dist_arr': 0,
-        'sales_a': 0, 'sales_b': 0, 'sales': 0,
-        'missed_a': 0, 'missed_b': 0, 'missed': 0,
-        'store_a': store_a, 'store_b': store_b, 'store_stock': store_a + store_b,
-        'supplier_shipped': 0, 'supplier_cap': cap_start,
-        'raw_mat_before_prod': raw_mat, 'raw_mat_stock': raw_mat,
-        'semi_input': 0, 'semi_cap': cap_start, 'semi_stock': semi,
-        'fp_input': 0, 'fp_cap': cap_start,
-        'cw_shipped': 0, 'cw_stock': cw,
-        'alloc_a': 0, 'alloc_b': 0,
-        'mat_pipe': [0.0] * max(1, mat_lt),
-        'semi_pipe': [0.0] * max(1, semi_lt),
-        'fp_pipe': [0.0] * max(1, fp_lt),
-        'dist_pipe_a': [0.0] * max(1, dist_lt),
-        'dist_pipe_b': [0.0] * max(1, dist_lt),
-        'order': 0, 'pending': 0, 'backlog': 0,
-        'wip_total': 0,
-        # W0 has no production costs — initial stock is valorized separately
-        # via init_stock_value in compute_kpis (avoids double counting)
-        'cost_mat': 0.0,
-        'cost_semi': 0.0,
-        'cost_fp': 0.0,
-        'coverage': coverage,
-        'comment': "Week 0 - Initial state.",
-    }
-    states.append(s0)
-
-    for w in range(1, weeks + 1):
-        s = {'week': w}
-        dem_total = demand[w]
-        dem_a = round(dem_total * pct_a)
-        dem_b = dem_total - dem_a
-
-        # Forecast: updates only at planning frequency (periodic review)
-        # Between reviews, system is blind to demand changes
-        if w in ow:
-            ff = float(dem_total)  # update forecast to current demand curve
-            if smart_distrib and not smart_discovered:
-                smart_discovered = True  # planner discovers demand imbalance
-        s['demand'] = dem_total; s['demand_a'] = dem_a; s['demand_b'] = dem_b
-        s['forecast'] = round(ff, 1)
-
-        # 1. Arrivals from pipes
-        m_arr = mat_pipe[0]; sm_arr = semi_pipe[0]; fp_arr = fp_pipe[0]
-        da_arr = dist_pipe_a[0]; db_arr = dist_pipe_b[0]
-        d_arr_total = da_arr + db_arr
-        # Clear fronts — these units have arrived, no longer in transit
-        mat_pipe[0] = 0.0; semi_pipe[0] = 0.0; fp_pipe[0] = 0.0
-        dist_pipe_a[0] = 0.0; dist_pipe_b[0] = 0.0
-        s['mat_arr'] = round(m_arr, 1); s['semi_arr'] = round(sm_arr, 1)
-        s['fp_arr'] = round(fp_arr, 1)
-        s['dist_arr_a'] = round(da_arr, 1); s['dist_arr_b'] = round(db_arr, 1)
-        s['dist_arr'] = round(d_arr_total, 1)
-        cas += d_arr_total
-
-        # 2. Store A — sell
-        avail_a = store_a + da_arr
-        sales_a = min(dem_a, avail_a)
-        missed_a = max(0, dem_a - sales_a)
-        store_a = avail_a - sales_a
-
-        # 3. Store B — sell
-        avail_b = store_b + db_arr
-        sales_b = min(dem_b, avail_b)
-        missed_b = max(0, dem_b - sales_b)
-        store_b = avail_b - sales_b
-
-        sales = sales_a + sales_b
-        missed = missed_a + missed_b
-        store_total = store_a + store_b
-
-        s.update({
-            'store_a': round(store_a, 1), 'store_b': round(store_b, 1),
-            'sales_a': round(sales_a, 1), 'sales_b': round(sales_b, 1),
-            'missed_a': round(missed_a, 1), 'missed_b': round(missed_b, 1),
-            'sales': round(sales, 1), 'missed': round(missed, 1),
-            'store_stock': round(store_total, 1),
-        })
-
-        # 4. Supplier — capacity ramps starting the week AFTER first order
-        pc = min(cap_start * (1 + pn * cap_ramp), cap_start * 10)
-        if pb > 0.01:
-            shipped = math.ceil(min(pb, pc)); pb -= shipped
-        else:
-            shipped = 0.0
-        if first_order_week is not None and w > first_order_week:
-            pn += 1  # ramp for NEXT week
-        s['supplier_shipped'] = round(shipped, 1); s['supplier_cap'] = round(pc, 0)
-
-        # 5. Arrivals update stocks
-        raw_mat += m_arr; s['raw_mat_before_prod'] = round(raw_mat, 1)
-        semi += sm_arr
-        cw += fp_arr
-
-        # 5b. ORDER DECISION (before processing, so factory sees the order)
-        # WIP calculated from pre-processing state
-        pre_wip = (sum(mat_pipe) + sum(semi_pipe) + sum(fp_pipe)
-                   + sum(dist_pipe_a) + sum(dist_pipe_b)
-                   + raw_mat + semi + cw + pb)
-        od = 0
-        if w in ow:
-            tgt = ff * coverage
-            existing = store_total + pre_wip
-            od = math.ceil(max(0, tgt - existing))
-            co += od; pb += od; s['order'] = round(od, 0)
-            if od > 0 and first_order_week is None:
-                first_order_week = w
-        else:
-            s['order'] = 0
-
-        # 6. Semi — process RM into semi (capacity-limited)
-        # Only starts processing after first order has been placed
-        sc_ = min(cap_start * (1 + sn * cap_ramp), cap_start * 10)
-        if raw_mat > 0.01 and first_order_week is not None:
-            si = math.ceil(min(raw_mat, sc_))
-            raw_mat -= si
-        else:
-            si = 0.0
-        sn += 1
-        s['semi_input'] = round(si, 1); s['semi_cap'] = round(sc_, 0)
-        s['raw_mat_stock'] = round(raw_mat, 1)
-
-        # 7. FP — process semi into finished (capacity-limited)
-        # Only starts processing after first order has been placed
-        fpc = min(cap_start * (1 + fn * cap_ramp), cap_start * 10)
-        if semi > 0.01 and first_order_week is not None:
-            fi = math.ceil(min(semi, fpc))
-            semi -= fi
-        else:
-            fi = 0.0
-        fn += 1
-        s['fp_input'] = round(fi, 1); s['fp_cap'] = round(fpc, 0)
-        s['semi_stock'] = round(semi, 1)
-
-        # 8. CW — push everything to stores, allocate per-store
-        ship_out = math.ceil(cw) if cw > 0.01 else 0.0
-        cw -= ship_out
-        s['cw_shipped'] = round(ship_out, 1); s['cw_stock'] = round(cw, 1)
-
-        # Allocate: Before first planning review = 50/50 (blind)
-        # After first review: equalize weeks-of-cover, then split by demand rate
-        if ship_out > 0:
-            if smart_distrib and smart_discovered:
-                dem_a_wk = max(ff * pct_a, 0.01)
-                dem_b_wk = max(ff * pct_b, 0.01)
-                cover_a = (store_a + sum(dist_pipe_a)) / dem_a_wk
-                cover_b = (store_b + sum(dist_pipe_b)) / dem_b_wk
-                # Priority: fill the worst-covered store first to equalize
-                if cover_a < cover_b:
-                    gap = math.ceil(max(0, (cover_b - cover_a) * dem_a_wk))
-                    priority_a = min(ship_out, gap)
-                    remaining = ship_out - priority_a
-                    alloc_a = priority_a + round(remaining * pct_a)
-                    alloc_b = ship_out - alloc_a
-                elif cover_b < cover_a:
-                    gap = math.ceil(max(0, (cover_a - cover_b) * dem_b_wk))
-                    priority_b = min(ship_out, gap)
-                    remaining = ship_out - priority_b
-                    alloc_b = priority_b + round(remaining * pct_b)
-                    alloc_a = ship_out - alloc_b
-                else:
-                    alloc_a = round(ship_out * pct_a)
-                    alloc_b = ship_out - alloc_a
-            else:
-                # Push / not yet discovered: 50/50 blind
-                alloc_a = round(ship_out * 0.5)
-                alloc_b = ship_out - alloc_a
-        else:
-            alloc_a = 0; alloc_b = 0
-        s['alloc_a'] = round(alloc_a, 1); s['alloc_b'] = round(alloc_b, 1)
-
-        # 9. Update pipes
-        mat_pipe = mat_pipe[1:] + [shipped]
-        semi_pipe = semi_pipe[1:] + [si]
-        fp_pipe = fp_pipe[1:] + [fi]
-        dist_pipe_a = dist_pipe_a[1:] + [alloc_a]
-        dist_pipe_b = dist_pipe_b[1:] + [alloc_b]
-
-        s['mat_pipe'] = [round(x, 1) for x in mat_pipe]
-        s['semi_pipe'] = [round(x, 1) for x in semi_pipe]
-        s['fp_pipe'] = [round(x, 1) for x in fp_pipe]
-        s['dist_pipe_a'] = [round(x, 1) for x in dist_pipe_a]
-        s['dist_pipe_b'] = [round(x, 1) for x in dist_pipe_b]
-
-        # RM cost: anticipated 1 week — book cost of what will arrive NEXT week
-        s['cost_mat'] = round(mat_pipe[0] * var_cost * VALOR_RAW_MAT, 1)
-        # Semi cost: anticipated 1 week — what will arrive at Semi stage NEXT week
-        s['cost_semi'] = round(semi_pipe[0] * var_cost * (VALOR_SEMI - VALOR_RAW_MAT), 1)
-        # FP cost: anticipated 1 week — what will arrive at CW NEXT week
-        s['cost_fp'] = round(fp_pipe[0] * var_cost * (VALOR_FINISHED - VALOR_SEMI), 1)
-
-        # 10. Post-processing WIP (for display)
-        total_wip = (sum(mat_pipe) + sum(semi_pipe) + sum(fp_pipe)
-                     + sum(dist_pipe_a) + sum(dist_pipe_b)
-                     + raw_mat + semi + cw + pb)
-        s['wip_total'] = round(total_wip, 1)
-        s['pending'] = round(co - cas, 0); s['backlog'] = round(pb, 0)
-        s['coverage'] = coverage
-
-        # Commentary
-        parts = []
-        if missed_a > 0.5:
-            parts.append(f"A: lost {missed_a:.0f}/{dem_a:.0f}.")
-        else:
-            parts.append(f"A: sold {sales_a:.0f}/{dem_a:.0f}, stk {store_a:.0f}.")
-        if missed_b > 0.5:
-            parts.append(f"B: lost {missed_b:.0f}/{dem_b:.0f}.")
-        else:
-            parts.append(f"B: sold {sales_b:.0f}/{dem_b:.0f}, stk {store_b:.0f}.")
-        if s['order'] > 0:
-            parts.append(f"ORDER {od:.0f}.")
-        if shipped > 0.5:
-            parts.append(f"Supplier {shipped:.0f}.")
-        if ship_out > 0.5:
-            if smart_distrib and smart_discovered:
-                mode = "smart"
-            else:
-                mode = "push 50/50"
-            parts.append(f"WH\u2192A:{alloc_a:.0f} B:{alloc_b:.0f} ({mode}).")
-        s['comment'] = " ".join(parts)
-        states.append(s)
-
-    return states
-
-
-def compute_kpis(states, price, var_cost, fixed_pct, base_forecast, weeks,
-                 init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
-    ts = sum(s['sales'] for s in states)
-    tm = sum(s['missed'] for s in states)
-    td = sum(s['demand'] for s in states)
-    tfp = sum(s['fp_input'] for s in states)
-
-    # Initial stock: valorized at its stage rate (already invested)
-    init_stock_value = (init_store * var_cost * VALOR_FINISHED
-                       + init_cw * var_cost * VALOR_FINISHED
-                       + init_semi * var_cost * VALOR_SEMI
-                       + init_rawmat * var_cost * VALOR_RAW_MAT)
-
-    # Production cost = SUM OF INCREMENTAL costs at each stage (no double counting)
-    # Supplier ships RM: +50% per unit
-    # Semi processing:   +25% per unit (50%→75%)
-    # Finishing:          +25% per unit (75%→100%)
-    cost_mat_total = sum(s.get('cost_mat', 0) for s in states)
-    cost_semi_total = sum(s.get('cost_semi', 0) for s in states)
-    cost_fp_total = sum(s.get('cost_fp', 0) for s in states)
-    prod_cost = cost_mat_total + cost_semi_total + cost_fp_total
-
-    vc = init_stock_value + prod_cost
-
-    rev = ts * price
-    gm = rev - vc
-    fx = base_forecast * weeks * price * fixed_pct
-    mg = gm - fx
-
-    # End stock
-    last = states[-1] if states else {}
-    end_store = last.get('store_a', 0) + last.get('store_b', 0)
-    end_cw = last.get('cw_stock', 0)
-    end_semi = last.get('semi_stock', 0)
-    end_rawmat = last.get('raw_mat_stock', 0)
-    end_stock_units = end_store + end_cw + end_semi + end_rawmat
-
-    end_stock_value = (end_store * var_cost * VALOR_FINISHED
-                      + end_cw * var_cost * VALOR_FINISHED
-                      + end_semi * var_cost * VALOR_SEMI
-                      + end_rawmat * var_cost * VALOR_RAW_MAT)
-
-    end_pipe_units = (sum(last.get('mat_pipe', [0]))
-                     + sum(last.get('semi_pipe', [0]))
-                     + sum(last.get('fp_pipe', [0]))
-                     + sum(last.get('dist_pipe_a', [0]))
-                     + sum(last.get('dist_pipe_b', [0])))
-
-    # Pipeline value (valorized by position)
-    end_pipe_value = (sum(last.get('mat_pipe', [0])) * var_cost * VALOR_RAW_MAT
-                     + sum(last.get('semi_pipe', [0])) * var_cost * VALOR_SEMI
-                     + sum(last.get('fp_pipe', [0])) * var_cost * VALOR_FINISHED
-                     + sum(last.get('dist_pipe_a', [0])) * var_cost * VALOR_FINISHED
-                     + sum(last.get('dist_pipe_b', [0])) * var_cost * VALOR_FINISHED)
-
-    total_system_units = ts + end_stock_units + end_pipe_units
-    useful_pct = (ts / total_system_units * 100) if total_system_units > 0 else 0
-    useless_units = end_stock_units + end_pipe_units
-    useless_pct = (useless_units / total_system_units * 100) if total_system_units > 0 else 0
-
-    # P&L: cost of sold = sold units * full cost; cost of unsold = total VC - cost of sold
-    cost_of_sold = ts * var_cost
-    cost_of_unsold = max(0, vc - cost_of_sold)
-
-    return {
-        'total_demand': td, 'total_sales': ts, 'total_missed': tm,
-        'svc_level': ts / td if td > 0 else 0,
-        'stockout_weeks': sum(1 for s in states if s['missed'] > 0.5),
-        'revenue': rev, 'var_cost': vc, 'gm': gm, 'fixed': fx,
-        'margin': mg, 'margin_pct': mg / rev if rev > 0 else 0,
-        'produced': tfp,
-        'init_stock_value': init_stock_value,
-        'prod_cost': prod_cost,
-        'cost_mat_total': cost_mat_total,
-        'cost_semi_total': cost_semi_total,
-        'cost_fp_total': cost_fp_total,
-        'end_stock_value': end_stock_value,
-        'end_pipe_value': end_pipe_value,
-        'end_stock_units': end_stock_units,
-        'end_pipe_units': end_pipe_units,
-        'store_end': end_store,
-        'lost_rev': tm * price,
-        'missed_a': sum(s['missed_a'] for s in states),
-        'missed_b': sum(s['missed_b'] for s in states),
-        'sales_a': sum(s['sales_a'] for s in states),
-        'sales_b': sum(s['sales_b'] for s in states),
-        'useful_pct': useful_pct, 'useless_pct': useless_pct,
-        'useful_units': ts, 'useless_units': useless_units,
-        'total_system_units': total_system_units,
-        'cost_of_sold': cost_of_sold, 'cost_of_unsold': cost_of_unsold,
-        'leftover_value': end_stock_value + end_pipe_value,
-    }
-
-
-def cumulative_kpis(states, week, price, var_cost, fixed_pct, base_forecast, total_weeks,
-                    init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
-    sub = states[:week]
-    ts = sum(s['sales'] for s in sub); tm = sum(s['missed'] for s in sub)
-    td = sum(s['demand'] for s in sub); tfp = sum(s['fp_input'] for s in sub)
-    init_stock_value = (init_store * var_cost * VALOR_FINISHED
-                       + init_cw * var_cost * VALOR_FINISHED
-                       + init_semi * var_cost * VALOR_SEMI
-                       + init_rawmat * var_cost * VALOR_RAW_MAT)
-    # Incremental production costs (no double counting)
-    prod_cost = (sum(s.get('cost_mat', 0) for s in sub)
-                + sum(s.get('cost_semi', 0) for s in sub)
-                + sum(s.get('cost_fp', 0) for s in sub))
-    vc = init_stock_value + prod_cost
-    rev = ts * price; gm = rev - vc
-    fx = base_forecast * week * price * fixed_pct
-    mg = gm - fx
-
-    init_total = init_store + init_cw + init_semi + init_rawmat
-    total_in = init_total + tfp
-    useful_pct = (ts / total_in * 100) if total_in > 0 else 0
-
-    return {'sales': ts, 'missed': tm, 'demand': td, 'revenue': rev,
-            'svc_level': ts / td if td > 0 else 0, 'margin': mg,
-            'stockout_wks': sum(1 for s in sub if s['missed'] > 0.5),
-            'missed_a': sum(s['missed_a'] for s in sub),
-            'missed_b': sum(s['missed_b'] for s in sub),
-            'useful_pct': useful_pct, 'useless_pct': 100 - useful_pct}
-
-
-def make_sc_html(state, params):
-    var_cost = params.get('var_cost', 200)
-    mat_lt = params['mat_lt']; semi_lt = params['semi_lt']
-    fp_lt = params['fp_lt']; dist_lt = params['dist_lt']
-    total_lt = mat_lt + semi_lt + fp_lt + dist_lt
-
-    # Grey-blue LVMH palette
-    C_TXT = '#2a3a4e'; C_TXT_L = '#5a6a7e'; C_ARR = '#a0aab8'
-    C_HEADER_BG = '#c8d4e6'; C_HEADER_BDR = '#5a6a7e'; C_HEADER_FG = '#1a2a3e'
-    C_BOX_BG = '#f2f4f8'; C_BOX_BDR = '#8a96a8'
-    C_BOX_FILL = '#4a6280'; C_BOX_FILL_FG = '#ffffff'
-    C_WIP_BG = '#f8f9fb'; C_WIP_BDR = '#b0b8c4'
-    C_SUP_BG = '#1a2744'; C_SUP_FG = '#ffffff'
-    C_LOST_BG = '#f8e8e8'; C_LOST_BDR = '#c05050'; C_LOST_FG = '#8a2020'
-
-    # Box sizing: compute based on available width
-    # Supplier + 2 store cards have a FIXED minimum width for readability
-    max_stage = max(mat_lt, semi_lt, fp_lt, dist_lt)
-    total_boxes_row = min(mat_lt, 8) + min(semi_lt, 8) + min(fp_lt, 8) + min(dist_lt, 8)
-
-    CARD_W = 98  # fixed width for supplier/store cards
-    available_width = 1300
-    # Remaining width for boxes after subtracting 3 cards + gaps
-    box_budget = available_width - 3 * CARD_W - 60
-    gap = 3
-    target_bw = (box_budget / total_boxes_row) - gap
-    box_w = max(44, min(110, int(target_bw)))
-    box_h = max(50, min(74, box_w - 8))
-
-    def week_box(qty, is_proc=False):
-        """Render one week slot with quantity (or empty). Modern flat style, no harsh borders."""
-        if qty > 0.5:
-            bg = C_BOX_FILL; fg = C_BOX_FILL_FG; weight = "700"
-            content = f'{qty:.0f}'
-            bdr = 'none'
-        else:
-            bg = '#e8ecf2'; fg = '#8a96a6'; weight = "400"
-            content = ''
-            bdr = 'none'
-        # Processing week: subtle accent — left border strip instead of dashed contour
-        proc_style = 'box-shadow: inset 3px 0 0 #2a4058;' if is_proc else ''
-        return (f'<div style="width:{box_w}px;height:{box_h}px;background:{bg};'
-                f'border:{bdr};border-radius:6px;display:flex;align-items:center;'
-                f'justify-content:center;font-size:15px;font-weight:{weight};color:{fg};'
-                f'{proc_style}box-sizing:border-box;">{content}</div>')
-
-    def band_header(label, width_px):
-        """Colored band above a group of week boxes. Softer, modern."""
-        return (f'<div style="width:{width_px}px;background:#dce3ed;'
-                f'border-radius:6px;padding:6px 4px;text-align:center;font-size:12px;'
-                f'font-weight:600;color:#2a3a4e;box-sizing:border-box;">{label}</div>')
-
-    def wip_label(label, value, width_px):
-        """WIP total below a band — visible accent to link it to its stage."""
-        return (f'<div style="width:{width_px}px;background:#e4e9f0;'
-                f'border-left:3px solid #4a6280;border-radius:4px;padding:5px 8px;'
-                f'display:flex;justify-content:space-between;align-items:center;'
-                f'font-size:11px;color:{C_TXT};box-sizing:border-box;">'
-                f'<span style="font-weight:600;color:#4a6280;">{label}</span>'
-                f'<span style="font-weight:800;color:#1a2a3e;font-size:12px;">{value:.0f}</span></div>')
-
-    # === BUILD WEEK-BY-WEEK CONTENT ===
-    # Map pipes to weeks (W1 = leftmost/upstream, W_last = rightmost/downstream)
-    # Material band: mat_pipe, oldest (just entered) at index n-1, newest (about to exit) at index 0
-    # So for display: mat_pipe reversed → W1 = mat_pipe[-1], W_mat = mat_pipe[0]
-    mat_pipe = state.get('mat_pipe', [])
-    semi_pipe = state.get('semi_pipe', [])
-    fp_pipe = state.get('fp_pipe', [])
-    dist_pipe_a = state.get('dist_pipe_a', [])
-    dist_pipe_b = state.get('dist_pipe_b', [])
-    raw_mat = state.get('raw_mat_stock', 0)
-    semi = state.get('semi_stock', 0)
-    cw = state.get('cw_stock', 0)
-
-    # Each stage's weeks: reversed pipe shows W1 (upstream) to W_last (downstream)
-    # Material: W1..W_mat = mat_pipe reversed (mat_pipe[-1] is W1, mat_pipe[0] is W_mat)
-    # The "last week" of a stage = the processing week (where material is transformed)
-    # Buffer stocks (raw_mat, semi) are inserted at the END of their corresponding stage's last week
-    #   — they represent material that has been processed but is waiting.
-    # But simplest mapping: pipe[0] = last week of stage (about to exit/arrive next)
-    #                       pipe[-1] = first week of stage (just entered)
-
-    # Per user: initial stock goes in the LAST week of each stage (ready to exit next)
-    # At W0 of simulation, we expect:
-    #   mat band last week (W_mat) = initial RM position
-    #   semi band last week (W_mat+W_semi) = initial Semi position
-    #   finish+CW band = initial CW position
-    #   dist band → stores directly
-    # At runtime this happens naturally: mat_pipe[-1] is first week, mat_pipe[0] is last week.
-    # The stage "buffer" (raw_mat, semi, cw) sits AT the last week of its band
-    # (after processing but before moving to next stage).
-
-    # For visual: we merge pipe + stage buffer into the band.
-    # Material band (mat_lt weeks):
-    #   W1 (entered first) = mat_pipe[-1] ... W_mat_lt (exiting) = raw_mat (the buffer)
-    #   Actually the pipe already represents the "in transit" weeks.
-    #   Let's say Material band = mat_lt boxes showing mat_pipe[::-1]
-    #   Then raw_mat buffer sits BETWEEN material and semi bands → we merge it into
-    #   the last slot of Material band (add raw_mat to the last box).
-
-    def reversed_list(lst):
-        return list(reversed(lst)) if lst else []
-
-    mat_weeks = reversed_list(mat_pipe)   # W1...W_mat
-    semi_weeks = reversed_list(semi_pipe) # first semi week...last semi week
-    fp_weeks = reversed_list(fp_pipe)
-
-    # Put buffer at end of each band (downstream position)
-    # Material band: last week gets + raw_mat
-    if mat_weeks:
-        mat_weeks[-1] = mat_weeks[-1] + raw_mat
-    # Semi band: last week gets + semi stock
-    if semi_weeks:
-        semi_weeks[-1] = semi_weeks[-1] + semi
-    # Finish band: last week gets + cw stock
-    if fp_weeks:
-        fp_weeks[-1] = fp_weeks[-1] + cw
-
-    # Distribution band: dist_lt weeks per store, combined view shows A+B total flow
-    # Each dist week slot = sum(a[i] + b[i]) at that pipe position
-    dist_a_weeks = reversed_list(dist_pipe_a)
-    dist_b_weeks = reversed_list(dist_pipe_b)
-
-    # === LAYOUT ===
-    # Row structure:
-    #   [Order card | Stage headers ... | Store labels]
-    #   [Supplier card | Week boxes ... | Store cards]
-    #   [Capa/Cost | WIP labels ... | (blank)]
-
-    # Compute widths (band width capped at MAX_PER_ROW for wrapped stages)
-    gap_px = 3
-    MAX_PER_ROW_PRELIM = 8  # must match MAX_PER_ROW below
-    def band_width(n):
-        cols = min(n, MAX_PER_ROW_PRELIM)
-        return cols * box_w + (cols - 1) * gap_px + 8
-
-    mat_band_w = band_width(mat_lt)
-    semi_band_w = band_width(semi_lt)
-    fp_band_w = band_width(fp_lt)
-    dist_band_w = band_width(dist_lt)
-
-    # === WIP per band ===
-    wip_mat = sum(mat_pipe) + raw_mat
-    wip_semi = sum(semi_pipe) + semi
-    wip_fp = sum(fp_pipe) + cw
-    wip_dist_a = sum(dist_pipe_a)
-    wip_dist_b = sum(dist_pipe_b)
-
-    # === Build week box rows with wrap within stage ===
-    MAX_PER_ROW = 8  # wrap after 8 boxes within a stage
-
-    def boxes_row(weeks, proc_last=True, weeks_labels_start=1):
-        """Generate rows of week boxes with labels above. Wraps if > MAX_PER_ROW weeks."""
-        n = len(weeks)
-        if n == 0:
-            return ''
-        # Split into chunks of MAX_PER_ROW
-        chunks = []
-        for i in range(0, n, MAX_PER_ROW):
-            chunk_start = i
-            chunk_end = min(i + MAX_PER_ROW, n)
-            chunks.append((chunk_start, chunk_end))
-
-        rows_html = []
-        for ci, (start, end) in enumerate(chunks):
-            chunk_weeks = weeks[start:end]
-            labels_html = ''.join(
-                f'<div style="width:{box_w}px;text-align:center;font-size:10px;'
-                f'color:{C_TXT_L};font-weight:600;margin-bottom:2px;">W{weeks_labels_start + start + i}</div>'
-                for i in range(len(chunk_weeks))
-            )
-            boxes_html = ''.join(
-                week_box(chunk_weeks[i], is_proc=(proc_last and (start + i) == n - 1))
-                for i in range(len(chunk_weeks))
-            )
-            rows_html.append(
-                f'<div style="display:flex;gap:{gap_px}px;">{labels_html}</div>'
-                f'<div style="display:flex;gap:{gap_px}px;margin-top:2px;margin-bottom:4px;">{boxes_html}</div>'
-            )
-        return ''.join(rows_html)
-
-    def stage_band_width(n_weeks):
-        """Band header width = width of one row of boxes (capped at MAX_PER_ROW)."""
-        cols = min(n_weeks, MAX_PER_ROW)
-        return cols * box_w + (cols - 1) * gap_px + 8
-
-    # Bands with integrated week boxes
-    def stage_col(label, weeks, band_w_px, wip_value, wip_label_txt, weeks_start):
-        """Full stage column: header band, week labels, week boxes, WIP."""
-        return (
-            f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
-            f'{band_header(label, band_w_px)}'
-            f'<div>{boxes_row(weeks, proc_last=True, weeks_labels_start=weeks_start)}</div>'
-            f'{wip_label(wip_label_txt, wip_value, band_w_px)}'
-            f'</div>'
-        )
-
-    # Left: Supplier card — modern, no harsh border
-    sup_qty = state.get('backlog', 0)
-    sup_cap = state.get('supplier_cap', 0)
-    sup_html = (
-        f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
-        f'{band_header("Order", CARD_W)}'
-        f'<div style="width:{CARD_W}px;height:{box_h + 20}px;background:#2a3a52;'
-        f'border-radius:6px;padding:4px 6px;'
-        f'display:flex;flex-direction:column;align-items:center;justify-content:center;'
-        f'color:#fff;box-sizing:border-box;">'
-        f'<div style="font-size:10px;font-weight:500;color:#9aaec6;text-transform:uppercase;letter-spacing:0.5px;">Supplier</div>'
-        f'<div style="font-size:20px;font-weight:700;">{sup_qty:.0f}</div>'
-        f'</div>'
-        f'<div style="width:{CARD_W}px;background:#f4f6f9;'
-        f'border-radius:5px;padding:5px 8px;font-size:10px;color:{C_TXT};'
-        f'display:flex;justify-content:space-between;box-sizing:border-box;">'
-        f'<span style="color:{C_TXT_L};font-weight:500;">Cap</span>'
-        f'<span style="font-weight:700;color:#2a3a4e;">{sup_cap:.0f}</span></div>'
-        f'</div>'
-    )
-
-    # Stage columns
-    mat_label = f"Mat ({mat_lt}wk)" if mat_lt <= 2 else f"Material ({mat_lt}wk)"
-    semi_label = f"Semi ({semi_lt}wk)"
-    fp_label = f"Finish ({fp_lt}wk)" if fp_lt <= 2 else f"Finish+CW ({fp_lt}wk)"
-    mat_col = stage_col(mat_label, mat_weeks, mat_band_w,
-                        wip_mat, "WIP", 1)
-    semi_col = stage_col(semi_label, semi_weeks, semi_band_w,
-                         wip_semi, "WIP", mat_lt + 1)
-    fp_col = stage_col(fp_label, fp_weeks, fp_band_w,
-                       wip_fp, "WIP", mat_lt + semi_lt + 1)
-
-    # Distribution band: show combined total per week (A+B)
-    dist_combined = [dist_a_weeks[i] + dist_b_weeks[i] for i in range(len(dist_a_weeks))] if dist_a_weeks else []
-    # Shorter label when band is narrow (few boxes)
-    dist_label = f"Dist ({dist_lt}wk)" if dist_lt <= 2 else f"Distribution ({dist_lt}wk)"
-    dist_col = (
-        f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
-        f'{band_header(dist_label, dist_band_w)}'
-        f'<div>{boxes_row(dist_combined, proc_last=True, weeks_labels_start=mat_lt + semi_lt + fp_lt + 1)}</div>'
-        f'<div style="display:flex;flex-direction:column;gap:3px;width:{dist_band_w}px;">'
-        f'{wip_label("WIP A", wip_dist_a, dist_band_w)}'
-        f'{wip_label("WIP B", wip_dist_b, dist_band_w)}'
-        f'</div></div>'
-    )
-
-    # Store cards — modern, borderless except when LOST
-    def store_card(letter, stock, dem, sales, lost):
-        is_alert = lost > 0.5
-        bg = '#fef0f0' if is_alert else '#f4f6f9'
-        accent = '#c05050' if is_alert else 'transparent'
-        return (
-            f'<div style="display:flex;flex-direction:column;gap:3px;">'
-            f'{band_header(f"Store {letter}", CARD_W)}'
-            f'<div style="width:{CARD_W}px;background:{bg};'
-            f'{"box-shadow: inset 3px 0 0 "+accent+";" if is_alert else ""}'
-            f'border-radius:6px;padding:8px 6px;text-align:center;box-sizing:border-box;'
-            f'color:{C_TXT};">'
-            f'<div style="color:{C_TXT_L};font-weight:500;font-size:9px;text-transform:uppercase;letter-spacing:0.3px;">Stock</div>'
-            f'<div style="font-size:20px;font-weight:700;color:{C_TXT};line-height:1.1;margin:2px 0 6px;">{stock:.0f}</div>'
-            f'<div style="display:flex;justify-content:space-between;padding:0 6px;gap:8px;font-size:9px;">'
-            f'<div style="text-align:center;"><div style="color:{C_TXT_L};text-transform:uppercase;letter-spacing:0.3px;">Dem</div><div style="font-size:13px;font-weight:600;color:{C_TXT};line-height:1.1;margin-top:2px;">{dem:.0f}</div></div>'
-            f'<div style="text-align:center;"><div style="color:{C_TXT_L};text-transform:uppercase;letter-spacing:0.3px;">Sold</div><div style="font-size:13px;font-weight:600;color:#2a5a3a;line-height:1.1;margin-top:2px;">{sales:.0f}</div></div>'
-            f'</div>'
-            f'{"<div style=margin-top:5px;background:#c05050;color:#fff;padding:1px 5px;border-radius:3px;font-size:9px;font-weight:700;letter-spacing:0.3px;display:inline-block;>LOST "+str(int(lost))+"</div>" if is_alert else ""}'
-            f'</div></div>'
-        )
-
-    store_a_html = store_card("A", state.get('store_a', 0), state.get('demand_a', 0),
-                              state.get('sales_a', 0), state.get('missed_a', 0))
-    store_b_html = store_card("B", state.get('store_b', 0), state.get('demand_b', 0),
-                              state.get('sales_b', 0), state.get('missed_b', 0))
-
-    stores_html = (
-        f'<div style="display:flex;flex-direction:column;gap:6px;justify-content:center;align-self:stretch;">'
-        f'{store_a_html}{store_b_html}</div>'
-    )
-
-    # === ASSEMBLE ===
-    # Stages on row, stores centered vertically against the pipe
-    main = (
-        f'<div style="display:flex;align-items:center;gap:10px;">'
-        f'<div style="display:flex;align-items:flex-start;gap:10px;">'
-        f'{sup_html}{mat_col}{semi_col}{fp_col}{dist_col}</div>'
-        f'{stores_html}</div>'
-    )
-
-    # Info bar (top)
-    order_html = (
-        f'<b style="color:#2a5a3a;font-size:13px;">ORDER {state["order"]:.0f}</b>'
-        if state.get('order', 0) > 0 else f'<span style="color:{C_TXT_L};">No order</span>'
-    )
-    info_bar = (
-        f'<div style="display:flex;justify-content:space-between;align-items:center;'
-        f'padding:8px 16px;background:linear-gradient(90deg,#f4f6f9,#eef1f6);'
-        f'border:1px solid #dde2ea;border-radius:8px;margin-bottom:10px;'
-        f'font-family:Arial,Helvetica,sans-serif;">'
-        f'<span style="font-size:12px;color:{C_TXT};">Backlog <b style="color:#8a3030;">{state.get("backlog", 0):.0f}</b></span>'
-        f'<span style="font-size:12px;color:{C_TXT};">Pending <b style="color:#8a6a20;">{state.get("pending", 0):.0f}</b></span>'
-        f'<span style="font-size:12px;color:{C_TXT};">WIP <b style="color:#2a5a8a;">{state.get("wip_total", 0):.0f}</b></span>'
-        f'<span style="font-size:12px;">{order_html}</span>'
-        f'<span style="font-size:12px;color:{C_TXT};">Forecast <b style="color:#1a2a40;">{state.get("forecast", 0):.0f}</b>/wk</span>'
-        f'<span style="font-size:12px;color:{C_TXT};">A:{params.get("store_a_pct", 60)}% B:{100 - params.get("store_a_pct", 60)}%</span>'
-        f'</div>'
-    )
-
-    # Comment
-    comment = state.get('comment', '')
-    comment_html = (
-        f'<div style="padding:8px 16px;font-size:11px;color:{C_TXT};line-height:1.5;'
-        f'background:#f8f9fb;border:1px solid #e8ecf0;border-radius:6px;margin-top:10px;">{comment}</div>'
-        if comment else ''
-    )
-
-    physical_flow = (
-        f'<div style="text-align:center;padding:8px 0;">'
-        f'<span style="font-size:10px;color:{C_TXT_L};letter-spacing:2px;font-weight:700;">'
-        f'- - - PHYSICAL FLOW (GOODS) - - -</span></div>'
-    )
-
-    # Calculate the intrinsic width of the diagram (approx)
-    # total_boxes_row * (bw + 3) + 3 cards (supplier + 2 stores) + gaps
-    intrinsic_w = (min(mat_lt,8) + min(semi_lt,8) + min(fp_lt,8) + min(dist_lt,8)) * (box_w + 3)
-    intrinsic_w += 3 * (CARD_W) + 60  # cards + gaps
-
-    container = (
-        f'<div style="font-family:Arial,Helvetica,sans-serif;padding:8px;'
-        f'background:linear-gradient(90deg,#f6f8fa,#f0f2f6);'
-        f'border:1px solid #dde2ea;border-radius:12px;'
-        f'width:100%;box-sizing:border-box;overflow:hidden;">'
-        f'<div id="sc-scaler" style="transform-origin:top left;width:{intrinsic_w}px;">'
-        f'{main}</div>'
-        f'</div>'
-        f'<script>'
-        f'(function(){{'
-        f'  var scaler=document.getElementById("sc-scaler");'
-        f'  if(!scaler) return;'
-        f'  var natural={intrinsic_w};'
-        f'  var wrapper=scaler.parentElement;'
-        f'  function fit(){{'
-        f'    var avail=wrapper.clientWidth - 16;'
-        f'    var scale=Math.min(1, avail/natural);'
-        f'    scaler.style.transform="scale("+scale+")";'
-        f'    wrapper.style.height=(scaler.offsetHeight*scale + 16)+"px";'
-        f'  }}'
-        f'  fit();'
-        f'  window.addEventListener("resize",fit);'
-        f'  setTimeout(fit,100);setTimeout(fit,500);'
-        f'}})();'
-        f'</script>'
-    )
-
-    return f'<div style="font-family:Arial,Helvetica,sans-serif;">{info_bar}{container}{physical_flow}{comment_html}</div>'
 
 # ════════════════════════════════════════════════════════════════
 # SIDEBAR
 # ════════════════════════════════════════════════════════════════
+prof.phase("sidebar")
 with st.sidebar:
     st.markdown("## \u2699\ufe0f Supply Chain Setup")
     weeks = st.select_slider("Simulation Length (weeks)", options=[13, 26, 39, 52], value=26)
@@ -850,47 +173,27 @@ with st.sidebar:
         # We use a unique internal key that mirrors demand_shape via callback
         pass  # No early widget; use existing session_state values directly.
 
+    prof.phase("recommended_stock")
     # Smart recommendation: cover demand during the first LT+freq weeks of sim.
     # For seasonal profiles, compute sum of first N weeks of the curve (not just avg × N).
     _ds = st.session_state.get("demand_shape", DEMAND_SHAPES[0])
     _first_n = min(coverage, weeks)
-    if "Seasonal" in _ds:
-        from math import gamma as _gf, exp as _exp
+    _hist = file_history()[0] if "Demand file" in _ds else None
+    if _hist is not None:
+        recommended_stock = int(file_demand(_hist, weeks)[1:_first_n + 1].sum())
+        _reco_detail = f"first {_first_n} wks of the demand file"
+    elif "Seasonal" in _ds:
         _sub = st.session_state.get("seas_sub", "Steep")
         _avg = st.session_state.get("seas_avg", 100)
-        _params = {"Very Steep": (3.0/26.0, 2.5), "Steep": (6.0/26.0, 3.0), "~Flat": (6.0/26.0, 1.8)}
-        _ratio, _k = _params.get(_sub, (6.0/26.0, 3.0))
-        _theta = (_ratio * weeks) / max(_k - 1, 0.1)
-        def _gp(x, kk, tt):
-            if x <= 0: return 0.0
-            return (x ** (kk - 1)) * _exp(-x / tt) / ((tt ** kk) * _gf(kk))
-        _pdf = [_gp(w, _k, _theta) for w in range(1, weeks + 1)]
-        _psum = sum(_pdf) or 1
-        _scaled = [v * _avg * weeks / _psum for v in _pdf]
-        recommended_stock = int(round(sum(_scaled[:_first_n])))
+        recommended_stock = demand_over("seasonal", weeks, _first_n, base_forecast,
+                                        avg=_avg, profile=SEASONAL_PROFILES.get(_sub, "steep"))
         _reco_detail = f"sum of first {_first_n} wks of {_sub} curve (avg {_avg}/wk)"
-    elif "ramp" in _ds.lower():
-        _end = st.session_state.get("lr_end", base_forecast * 3)
-        _rw = st.session_state.get("lr_wks", min(weeks // 3, 8))
-        _total = 0
-        for w in range(1, _first_n + 1):
-            if w <= _rw:
-                _total += base_forecast + (_end - base_forecast) * w / _rw
-            else:
-                _total += _end
-        recommended_stock = int(round(_total))
-        _reco_detail = f"first {_first_n} wks of ramp curve"
-    elif "drop" in _ds.lower():
-        _floor = st.session_state.get("ld_end", max(0, base_forecast // 3))
-        _dw = st.session_state.get("ld_wks", 1)
-        _total = 0
-        for w in range(1, _first_n + 1):
-            if w <= _dw:
-                _total += base_forecast + (_floor - base_forecast) * w / _dw
-            else:
-                _total += _floor
-        recommended_stock = int(round(_total))
-        _reco_detail = f"first {_first_n} wks of drop curve"
+    elif "ramp" in _ds.lower() or "drop" in _ds.lower():
+        # Slider values once they exist, else the sliders' starting values
+        _kind, _end_key, _wks_key = ("ramp", "lr_end", "lr_wks") if "ramp" in _ds.lower() else ("drop", "ld_end", "ld_wks")
+        _opts = {k: st.session_state[s] for k, s in (("end", _end_key), ("over", _wks_key)) if s in st.session_state}
+        recommended_stock = demand_over(_kind, weeks, _first_n, base_forecast, **_opts)
+        _reco_detail = f"first {_first_n} wks of {_kind} curve"
     else:
         recommended_stock = base_forecast * _first_n
         _reco_detail = f"{base_forecast}/wk \u00d7 {_first_n} wks coverage"
@@ -900,6 +203,7 @@ with st.sidebar:
         f'[Recommended: <b>{recommended_stock:,.0f}</b> pcs = '
         f'{_reco_detail}] <span style="color:#a8b4c4;">— based on demand profile "{_ds}"</span></div>',
         unsafe_allow_html=True)
+    prof.phase("sidebar")
     total_stock = st.slider("Total Initial Stock (pcs)", min_value=0, max_value=10000, step=50, key="total_stock")
 
     st.caption("Distribution (% of total):")
@@ -952,9 +256,10 @@ with st.sidebar:
 
     bf = base_forecast
     preset_shape = st.selectbox("Demand shape", DEMAND_SHAPES, key="demand_shape")
+    prof.phase("demand_curve")
 
     if "Flat" in preset_shape:
-        init_demand = [0] + [bf] * weeks
+        init_demand = demand_vector("flat", weeks, bf)
         demand_description = f"Flat {bf}/wk for {weeks} wks"
 
     elif "Linear ramp" in preset_shape:
@@ -964,13 +269,7 @@ with st.sidebar:
             st.session_state["lr_wks"] = min(weeks // 3, 8)
         end_dem = st.slider("Target demand (pcs/wk)", min_value=bf, max_value=1000, step=10, key="lr_end")
         ramp_wks = st.slider("Ramp duration (weeks)", min_value=1, max_value=weeks, step=1, key="lr_wks")
-        init_demand = [0]
-        for w in range(1, weeks + 1):
-            if w <= ramp_wks:
-                val = bf + (end_dem - bf) * w / ramp_wks
-            else:
-                val = end_dem
-            init_demand.append(max(0, int(round(val))))
+        init_demand = demand_vector("ramp", weeks, bf, end=end_dem, over=ramp_wks)
         demand_description = f"Ramp {bf}\u2192{end_dem} in {ramp_wks}wk"
 
     elif "Linear drop" in preset_shape:
@@ -980,15 +279,38 @@ with st.sidebar:
             st.session_state["ld_wks"] = 1
         drop_dem = st.slider("Floor demand (pcs/wk)", min_value=0, max_value=bf, step=10, key="ld_end")
         drop_wks = st.slider("Drop duration (weeks)", min_value=1, max_value=weeks, step=1, key="ld_wks")
-        init_demand = [0]
-        for w in range(1, weeks + 1):
-            if w <= drop_wks:
-                val = bf + (drop_dem - bf) * w / drop_wks
-            else:
-                val = drop_dem
-            init_demand.append(max(0, int(round(val))))
+        init_demand = demand_vector("drop", weeks, bf, end=drop_dem, over=drop_wks)
         demand_description = f"Drop {bf}\u2192{drop_dem} in {drop_wks}wk"
 
+    elif "Demand file" in preset_shape:
+        st.file_uploader("Columns: week (or date), demand, optional store and sku",
+                         type=["csv", "parquet"], key="demand_file")
+        history, file_error = file_history()
+        if file_error:
+            st.error(file_error)
+        if history is None:
+            init_demand = demand_vector("flat", weeks, bf)
+            demand_description = f"Flat {bf}/wk until a demand file is loaded"
+        else:
+            f1, f2 = st.columns(2)
+            with f1:
+                st.selectbox("Store", [ALL] + history.stores, key="demand_file_store",
+                             disabled=not history.stores)
+            with f2:
+                st.selectbox("SKU", [ALL] + history.skus, key="demand_file_sku",
+                             disabled=not history.skus)
+            file_start = st.number_input("First week", min_value=1, max_value=history.weeks,
+                                         step=1, key="demand_file_start")
+            init_demand = file_demand(history, weeks)
+            last_week = file_start + len(init_demand) - 2
+            demand_description = (f"File {st.session_state['demand_file'].name}: "
+                                  f"weeks {file_start}-{last_week} of {history.weeks}")
+            st.caption(f"{history.stats['rows']:,} rows, {len(history.keys):,} store/SKU series. "
+                       f"Dropped {history.stats['bad_week']:,} without a valid week, "
+                       f"zeroed {history.stats['missing']:,} blank and clipped {history.stats['clipped']:,} "
+                       f"out-of-range demands."
+                       + (" Past the file's end the last week repeats." if last_week - file_start + 1 < weeks else ""))
+
     else:  # Seasonal
         if "seas_sub" not in st.session_state:
             st.session_state["seas_sub"] = "Steep"
@@ -1000,66 +322,39 @@ with st.sidebar:
         seas_avg = st.slider("Average weekly demand", min_value=0, max_value=1000,
                              step=10, key="seas_avg")
 
-        # Gamma params — all sub-profiles: (peak_position_ratio, shape_k)
-        # scale theta is computed from peak position and sim length
-        # Very Steep: early peak W3 (4x avg), fast decay
-        # Steep:      peak W6 (2x avg), moderate decay
-        # ~Flat:      peak W6 but very wide shape (k=1.8) → gentle dome, tail ~35
-        seas_params = {
-            "Very Steep": (3.0/26.0, 2.5),
-            "Steep":      (6.0/26.0, 3.0),
-            "~Flat":      (6.0/26.0, 1.8),
-        }
-
-        from math import gamma as gamma_fn, exp as math_exp
-        def gamma_pdf(x, kk, tt):
-            if x <= 0: return 0.0
-            return (x ** (kk - 1)) * math_exp(-x / tt) / ((tt ** kk) * gamma_fn(kk))
-
-        ratio, k = seas_params[seas_sub]
-        scaled_theta = (ratio * weeks) / max(k - 1, 0.1)
-        pdf_vals = [gamma_pdf(w, k, scaled_theta) for w in range(1, weeks + 1)]
-
-        pdf_sum = sum(pdf_vals)
-
+        # Gamma curve scaled to avg x weeks (profiles: scsim.demand.SEASONAL)
         total_units = seas_avg * weeks
-        init_demand = [0]
-        if pdf_sum > 0 and total_units > 0:
-            scale_factor = total_units / pdf_sum
-            for v in pdf_vals:
-                init_demand.append(max(0, int(round(v * scale_factor))))
-        else:
-            for _ in range(weeks):
-                init_demand.append(0)
-
+        init_demand = demand_vector("seasonal", weeks, bf, avg=seas_avg, profile=SEASONAL_PROFILES[seas_sub])
         demand_description = f"Seasonal {seas_sub} (avg {seas_avg}/wk, total {total_units})"
 
     st.caption(f"**{demand_description}**")
 
-    # Editable table
-    st.caption("\u270f\ufe0f Edit demand per week:")
-    demand_df = pd.DataFrame({
-        "Week": list(range(1, weeks + 1)),
-        "Demand (pcs)": init_demand[1:weeks + 1],
-    })
-    edited = st.data_editor(
-        demand_df,
-        column_config={
-            "Week": st.column_config.NumberColumn(disabled=True, width="small"),
-            "Demand (pcs)": st.column_config.NumberColumn(min_value=0, max_value=9999, step=10, width="medium"),
-        },
-        hide_index=True, use_container_width=True, height=min(300, weeks * 35 + 40),
-        key="demand_editor",
-    )
-
-    custom_demand = [0]
-    for _, row in edited.iterrows():
-        custom_demand.append(int(row["Demand (pcs)"]))
+    if "Demand file" in preset_shape:
+        # Files can hold years of weeks: they feed the engine directly, no row editor
+        custom_demand = init_demand.tolist()
+    else:
+        # Editable table
+        st.caption("\u270f\ufe0f Edit demand per week:")
+        demand_df = pd.DataFrame({
+            "Week": list(range(1, weeks + 1)),
+            "Demand (pcs)": init_demand[1:weeks + 1],
+        })
+        edited = st.data_editor(
+            demand_df,
+            column_config={
+                "Week": st.column_config.NumberColumn(disabled=True, width="small"),
+                "Demand (pcs)": st.column_config.NumberColumn(min_value=0, max_value=9999, step=10, width="medium"),
+            },
+            hide_index=True, use_container_width=True, height=min(300, weeks * 35 + 40),
+            key="demand_editor",
+        )
+        custom_demand = [0] + [int(d) for d in edited["Demand (pcs)"].tolist()]
 
     total_dem = sum(custom_demand[1:])
     avg_dem = total_dem / max(weeks, 1)
     peak_val = max(custom_demand[1:]) if weeks > 0 else 0
     peak_wk_idx = custom_demand[1:].index(peak_val) + 1 if peak_val > 0 else 0
+    prof.phase("sidebar")
 
     # 6. CAPACITY
     st.markdown("### \U0001f3ed Capacity")
@@ -1166,9 +461,17 @@ params = {
     'custom_demand': tuple(custom_demand) if custom_demand is not None else None,
 }
 
-states = run_simulation(**params)
-final_kpis = compute_kpis(states[1:], price, var_cost, fixed_pct, base_forecast, weeks,
+prof.phase("simulate")
+prof.note("flows", "memory hit")  # overwritten when the cached function runs
+flow_params = {k: v for k, v in params.items() if k not in ECON_ARGS}
+flows = simulate_flows(st.session_state.get("_last_flows"), **flow_params)
+st.session_state["_last_flows"] = ({k: v for k, v in flow_params.items() if k not in RESUME_ARGS}, flows)
+states = valuate(flows, var_cost)
+sim_weeks = states[1:]  # weeks 1..N; its running totals serve every week lookup
+prof.phase("kpis")
+final_kpis = compute_kpis(sim_weeks, price, var_cost, fixed_pct, base_forecast, weeks,
                           init_store, init_cw, init_semi, init_rawmat)
+prof.phase("page")
 
 # ════════════════════════════════════════════════════════════════
 # STYLES
@@ -1213,81 +516,12 @@ def _nav_minus(): st.session_state.week_num = max(0, st.session_state.week_num -
 def _nav_plus(): st.session_state.week_num = min(weeks, st.session_state.week_num + 1)
 def _nav_end(): st.session_state.week_num = weeks
 
-b1, b2, b3, b4, info = st.columns([1, 1, 1, 1, 2])
-with b1: st.button("\u23ee W0", use_container_width=True, disabled=st.session_state.week_num == 0, on_click=_nav_w0)
-with b2: st.button("\u25c0 \u22121", use_container_width=True, disabled=st.session_state.week_num <= 0, on_click=_nav_minus)
-with b3: st.button("+1 \u25b6", use_container_width=True, disabled=st.session_state.week_num >= weeks, on_click=_nav_plus)
-with b4: st.button(f"W{weeks} \u23ed", use_container_width=True, disabled=st.session_state.week_num >= weeks, on_click=_nav_end)
-with info:
-    pct = st.session_state.week_num / max(weeks, 1)
-    bar_w = int(pct * 100)
-    st.markdown(
-        f"<div style='padding:8px 0;'>"
-        f"<div style='font-size:24px;font-weight:800;color:#1a2a40;text-align:center;'>Week {st.session_state.week_num} <span style='font-size:13px;color:#7a8a9e;'>/ {weeks}</span></div>"
-        f"<div style='background:#e0e4ea;border-radius:4px;height:6px;margin-top:4px;'>"
-        f"<div style='background:#4a90d9;height:6px;border-radius:4px;width:{bar_w}%;'></div></div></div>",
-        unsafe_allow_html=True)
-
-week = st.session_state.week_num
-state = states[week]
-cum = cumulative_kpis(states[1:], week, price, var_cost, fixed_pct, base_forecast, weeks,
-                      init_store, init_cw, init_semi, init_rawmat)
-
-# ════════════════════════════════════════════════════════════════
-# KPI CARDS (point 11: no margin here, just operational KPIs)
-# ════════════════════════════════════════════════════════════════
-def kpi_card(label, value, color="#1a2a40"):
-    return f'<div class="kpi-card"><div class="kpi-label">{label}</div><div class="kpi-value" style="color:{color};">{value}</div></div>'
-
-k1, k2, k3, k4, k5, k6, k7 = st.columns(7)
-with k1:
-    svc = cum['svc_level']
-    c = "#c0392b" if svc < 0.6 else ("#d4850a" if svc < 0.85 else "#1a8a4a")
-    st.markdown(kpi_card("Service Level", f"{svc*100:.1f}%", c), unsafe_allow_html=True)
-with k2:
-    st.markdown(kpi_card("Cumul. Sales", f"{round(cum['sales'], -1):,.0f}", "#2c5f8a"), unsafe_allow_html=True)
-with k3:
-    st.markdown(kpi_card("Missed Total", f"{round(cum['missed'], -1):,.0f}", "#c0392b"), unsafe_allow_html=True)
-with k4:
-    st.markdown(kpi_card("Missed A", f"{round(cum['missed_a'], -1):,.0f}", "#c0392b"), unsafe_allow_html=True)
-with k5:
-    st.markdown(kpi_card("Missed B", f"{round(cum['missed_b'], -1):,.0f}", "#7b2d8e"), unsafe_allow_html=True)
-with k6:
-    sc = "#c0392b" if cum['stockout_wks'] > 0 else "#1a8a4a"
-    st.markdown(kpi_card("Stockout Wks", f"{cum['stockout_wks']}/{week}", sc), unsafe_allow_html=True)
-with k7:
-    uf = cum['useful_pct']
-    uc = "#1a8a4a" if uf > 80 else ("#d4850a" if uf > 50 else "#c0392b")
-    st.markdown(kpi_card("Useful Prod.", f"{uf:.0f}%", uc), unsafe_allow_html=True)
-
-# ════════════════════════════════════════════════════════════════
-# SC FLOW VISUALIZATION
-# ════════════════════════════════════════════════════════════════
-st.markdown("")
-_max_stage = max(params['mat_lt'], params['semi_lt'], params['fp_lt'], params['dist_lt'])
-import math as _m
-_rows_needed = _m.ceil(_max_stage / 8)
-# Tight height calculation:
-#   Per stage row: ~145px (header + labels + boxes + wip + gaps)
-#   Store card: ~118px each (with LOST badge) × 2 + 10 gap + 28 header = 274px
-_stage_h = _rows_needed * 145
-_stores_h = 2 * 118 + 10 + 28  # stores with LOST badge
-_content_h = max(_stage_h, _stores_h)
-_viz_h = 48 + 16 + _content_h + 28 + 32  # info + padding + content + phys + comment
-st.components.v1.html(make_sc_html(state, params), height=_viz_h, scrolling=False)
-
-# ════════════════════════════════════════════════════════════════
-# DEMAND CHART (point 7: hidden by default in expander)
-# ════════════════════════════════════════════════════════════════
-import altair as alt
-
-with st.expander("\U0001f4c8 Charts: Demand, Fulfillment, Stocks", expanded=False):
-    dem_chart_data = pd.DataFrame({
-        "Week": list(range(1, weeks + 1)),
-        "Demand": [states[i]["demand"] for i in range(1, weeks + 1)],
-        "Sales": [states[i]["sales"] for i in range(1, weeks + 1)],
-        "Missed": [states[i]["missed"] for i in range(1, weeks + 1)],
-    })
+# Charts are built once per simulation; a week step only moves the week marker
+@st.cache_data(show_spinner=False, max_entries=32)
+def chart_specs(flow_params, _states):
+    """Vega-Lite specs of the three week charts, without the week marker."""
+    frames = chart_frames(_states)
+    dem_chart_data = pd.DataFrame(frames["demand"])
     y_max = max(dem_chart_data["Demand"].max(), 1) * 1.15
     y_scale = alt.Scale(domain=[0, y_max])
 
@@ -1304,50 +538,142 @@ with st.expander("\U0001f4c8 Charts: Demand, Fulfillment, Stocks", expanded=Fals
         x=alt.X("Week:O"), y=alt.Y("Demand:Q", scale=y_scale))
     demand_dots = alt.Chart(dem_chart_data).mark_circle(color="#4a90d9", size=40).encode(
         x="Week:O", y=alt.Y("Demand:Q", scale=y_scale))
-    rule_dc = alt.Chart(pd.DataFrame({"Week": [week]})).mark_rule(
-        color="#d4850a", strokeWidth=2, strokeDash=[4,2]).encode(x="Week:O")
-
-    st.markdown("#### Demand vs Sales vs Missed")
-    st.altair_chart((stacked_bars + demand_line + demand_dots + rule_dc).properties(height=300), use_container_width=True)
-
-    # Store-level charts
-    ch1, ch2 = st.columns(2)
-    with ch1:
-        st.markdown("#### Demand vs Fulfillment (per store)")
-        rows = []
-        for s in states[1:]:
-            rows.append({'Week': s['week'], 'Group': 'Fill A', 'Component': 'Sales A', 'Value': s['sales_a']})
-            rows.append({'Week': s['week'], 'Group': 'Fill A', 'Component': 'Lost A', 'Value': s['missed_a']})
-            rows.append({'Week': s['week'], 'Group': 'Fill B', 'Component': 'Sales B', 'Value': s['sales_b']})
-            rows.append({'Week': s['week'], 'Group': 'Fill B', 'Component': 'Lost B', 'Value': s['missed_b']})
-        df_bars = pd.DataFrame(rows)
-        bars = alt.Chart(df_bars).mark_bar(cornerRadiusTopLeft=2, cornerRadiusTopRight=2).encode(
-            x=alt.X('Week:O'), y=alt.Y('Value:Q', title='Units', stack=True),
-            color=alt.Color('Component:N',
-                scale=alt.Scale(domain=['Sales A','Lost A','Sales B','Lost B'],
-                                range=['#2c5f8a','#c0392b','#6a3d9a','#e74c8c']),
-                legend=alt.Legend(orient='top', title=None, columns=2)),
-            xOffset='Group:N',
-        ).properties(height=260)
-        rule = alt.Chart(pd.DataFrame({'Week': [week]})).mark_rule(color='#d4850a', strokeWidth=2, strokeDash=[4,2]).encode(x='Week:O')
-        st.altair_chart(bars + rule, use_container_width=True)
-
-    with ch2:
-        st.markdown("#### Store Stocks & Orders")
-        stock_data = pd.DataFrame({
-            'Week': [s['week'] for s in states], 'Store A': [s['store_a'] for s in states],
-            'Store B': [s['store_b'] for s in states], 'Order': [s['order'] for s in states],
-        })
-        melted = stock_data.melt('Week', ['Store A','Store B'], var_name='Store', value_name='Stock')
-        lines = alt.Chart(melted).mark_area(opacity=0.25).encode(
-            x=alt.X('Week:O'), y=alt.Y('Stock:Q', title='Units', stack=False),
-            color=alt.Color('Store:N', scale=alt.Scale(domain=['Store A','Store B'], range=['#2c5f8a','#6a3d9a']),
-                legend=alt.Legend(orient='top', title=None)),
-        ).properties(height=260)
-        order_bars = alt.Chart(stock_data[stock_data['Order'] > 0]).mark_bar(
-            color='#1a8a4a', opacity=0.4, cornerRadiusTopLeft=2, cornerRadiusTopRight=2).encode(x='Week:O', y='Order:Q')
-        rule2 = alt.Chart(pd.DataFrame({'Week': [week]})).mark_rule(color='#d4850a', strokeWidth=2, strokeDash=[4,2]).encode(x='Week:O')
-        st.altair_chart(lines + order_bars + rule2, use_container_width=True)
+
+    df_bars = pd.DataFrame(frames["fulfillment"])
+    bars = alt.Chart(df_bars).mark_bar(cornerRadiusTopLeft=2, cornerRadiusTopRight=2).encode(
+        x=alt.X('Week:O'), y=alt.Y('Value:Q', title='Units', stack=True),
+        color=alt.Color('Component:N',
+            scale=alt.Scale(domain=['Sales A','Lost A','Sales B','Lost B'],
+                            range=['#2c5f8a','#c0392b','#6a3d9a','#e74c8c']),
+            legend=alt.Legend(orient='top', title=None, columns=2)),
+        xOffset='Group:N',
+    )
+
+    stock_data = pd.DataFrame(frames["stocks"])
+    melted = stock_data.melt('Week', ['Store A','Store B'], var_name='Store', value_name='Stock')
+    lines = alt.Chart(melted).mark_area(opacity=0.25).encode(
+        x=alt.X('Week:O'), y=alt.Y('Stock:Q', title='Units', stack=False),
+        color=alt.Color('Store:N', scale=alt.Scale(domain=['Store A','Store B'], range=['#2c5f8a','#6a3d9a']),
+            legend=alt.Legend(orient='top', title=None)),
+    )
+    order_bars = alt.Chart(stock_data[stock_data['Order'] > 0]).mark_bar(
+        color='#1a8a4a', opacity=0.4, cornerRadiusTopLeft=2, cornerRadiusTopRight=2).encode(x='Week:O', y='Order:Q')
+
+    return {
+        "demand": alt.layer(stacked_bars, demand_line, demand_dots).properties(height=300).to_dict(),
+        "fulfillment": alt.layer(bars).properties(height=260).to_dict(),
+        "stocks": alt.layer(lines, order_bars).properties(height=260).to_dict(),
+    }
+
+
+def with_week_rule(spec, week):
+    """Chart spec with the dashed current-week marker layered on top."""
+    rule = {"mark": {"type": "rule", "color": "#d4850a", "strokeWidth": 2, "strokeDash": [4, 2]},
+            "data": {"values": [{"Week": week}]}, "encoding": {"x": {"field": "Week", "type": "ordinal"}}}
+    return {**spec, "layer": spec["layer"] + [rule]}
+
+
+@fragment
+def week_view(states, params, flow_params):
+    """Navigation, KPI cards, flow view and charts: the only part a week step reruns."""
+    vt = PhaseTimer("week_view")
+    vt.phase("kpi_cards")
+    b1, b2, b3, b4, info = st.columns([1, 1, 1, 1, 2])
+    with b1: st.button("\u23ee W0", use_container_width=True, disabled=st.session_state.week_num == 0, on_click=_nav_w0)
+    with b2: st.button("\u25c0 \u22121", use_container_width=True, disabled=st.session_state.week_num <= 0, on_click=_nav_minus)
+    with b3: st.button("+1 \u25b6", use_container_width=True, disabled=st.session_state.week_num >= weeks, on_click=_nav_plus)
+    with b4: st.button(f"W{weeks} \u23ed", use_container_width=True, disabled=st.session_state.week_num >= weeks, on_click=_nav_end)
+    with info:
+        pct = st.session_state.week_num / max(weeks, 1)
+        bar_w = int(pct * 100)
+        st.markdown(
+            f"<div style='padding:8px 0;'>"
+            f"<div style='font-size:24px;font-weight:800;color:#1a2a40;text-align:center;'>Week {st.session_state.week_num} <span style='font-size:13px;color:#7a8a9e;'>/ {weeks}</span></div>"
+            f"<div style='background:#e0e4ea;border-radius:4px;height:6px;margin-top:4px;'>"
+            f"<div style='background:#4a90d9;height:6px;border-radius:4px;width:{bar_w}%;'></div></div></div>",
+            unsafe_allow_html=True)
+
+    week = st.session_state.week_num
+    state = states[week]
+    cum = cumulative_kpis(sim_weeks, week, price, var_cost, fixed_pct, base_forecast, weeks,
+                          init_store, init_cw, init_semi, init_rawmat)
+
+    # ════════════════════════════════════════════════════════════════
+    # KPI CARDS (point 11: no margin here, just operational KPIs)
+    # ════════════════════════════════════════════════════════════════
+    def kpi_card(label, value, color="#1a2a40"):
+        return f'<div class="kpi-card"><div class="kpi-label">{label}</div><div class="kpi-value" style="color:{color};">{value}</div></div>'
+
+    k1, k2, k3, k4, k5, k6, k7 = st.columns(7)
+    with k1:
+        svc = cum['svc_level']
+        c = "#c0392b" if svc < 0.6 else ("#d4850a" if svc < 0.85 else "#1a8a4a")
+        st.markdown(kpi_card("Service Level", f"{svc*100:.1f}%", c), unsafe_allow_html=True)
+    with k2:
+        st.markdown(kpi_card("Cumul. Sales", f"{round(cum['sales'], -1):,.0f}", "#2c5f8a"), unsafe_allow_html=True)
+    with k3:
+        st.markdown(kpi_card("Missed Total", f"{round(cum['missed'], -1):,.0f}", "#c0392b"), unsafe_allow_html=True)
+    with k4:
+        st.markdown(kpi_card("Missed A", f"{round(cum['missed_a'], -1):,.0f}", "#c0392b"), unsafe_allow_html=True)
+    with k5:
+        st.markdown(kpi_card("Missed B", f"{round(cum['missed_b'], -1):,.0f}", "#7b2d8e"), unsafe_allow_html=True)
+    with k6:
+        sc = "#c0392b" if cum['stockout_wks'] > 0 else "#1a8a4a"
+        st.markdown(kpi_card("Stockout Wks", f"{cum['stockout_wks']}/{week}", sc), unsafe_allow_html=True)
+    with k7:
+        uf = cum['useful_pct']
+        uc = "#1a8a4a" if uf > 80 else ("#d4850a" if uf > 50 else "#c0392b")
+        st.markdown(kpi_card("Useful Prod.", f"{uf:.0f}%", uc), unsafe_allow_html=True)
+
+    # ════════════════════════════════════════════════════════════════
+    # SC FLOW VISUALIZATION
+    # ════════════════════════════════════════════════════════════════
+    st.markdown("")
+    _max_stage = max(params['mat_lt'], params['semi_lt'], params['fp_lt'], params['dist_lt'])
+    import math as _m
+    _rows_needed = _m.ceil(_max_stage / 8)
+    # Tight height calculation:
+    #   Per stage row: ~145px (header + labels + boxes + wip + gaps)
+    #   Store card: ~118px each (with LOST badge) × 2 + 10 gap + 28 header = 274px
+    _stage_h = _rows_needed * 145
+    _stores_h = 2 * 118 + 10 + 28  # stores with LOST badge
+    _content_h = max(_stage_h, _stores_h)
+    _viz_h = 48 + 16 + _content_h + 28 + 32  # info + padding + content + phys + comment
+    # All weeks ship once: the slider and autoplay scrub in the browser, no rerun
+    vt.phase("flow_html")
+    flow_html = make_playback_html(states, params, week)
+    vt.note("html_bytes", len(flow_html.encode()))
+    st.components.v1.html(flow_html, height=_viz_h + 44, scrolling=False)
+
+    # ════════════════════════════════════════════════════════════════
+    # DEMAND CHART (point 7: hidden by default in expander)
+    # ════════════════════════════════════════════════════════════════
+    vt.phase("charts")
+    with st.expander("\U0001f4c8 Charts: Demand, Fulfillment, Stocks", expanded=False):
+        specs = chart_specs(flow_params, states)
+        st.markdown("#### Demand vs Sales vs Missed")
+        st.vega_lite_chart(with_week_rule(specs["demand"], week), use_container_width=True)
+
+        # Store-level charts
+        ch1, ch2 = st.columns(2)
+        with ch1:
+            st.markdown("#### Demand vs Fulfillment (per store)")
+            st.vega_lite_chart(with_week_rule(specs["fulfillment"], week), use_container_width=True)
+
+        with ch2:
+            st.markdown("#### Store Stocks & Orders")
+            st.vega_lite_chart(with_week_rule(specs["stocks"], week), use_container_width=True)
+
+    step = vt.finish()
+    profile_log.add(step)
+    last_run = profile_log.last("run")
+    if last_run is not None:
+        st.caption(f"Week step {step['total_ms']:.0f} ms (full rerun {last_run['total_ms']:.0f} ms)")
+
+
+prof.phase("week_view")
+week_view(states, params, flow_params)
+prof.phase("pnl")
 
 # ════════════════════════════════════════════════════════════════
 # P&L SUMMARY (point 12: at end, like a proper P&L)
@@ -1417,50 +743,23 @@ with st.expander("\U0001f4cb P&L Summary (end of simulation)", expanded=False):
     with u3:
         st.metric("\u274c Remaining WIP + stock", f"{fk['useless_units']:,.0f} pcs ({fk['useless_pct']:.0f}%)")
 
+prof.phase("week_table")
+
 # ════════════════════════════════════════════════════════════════
 # WEEK-BY-WEEK TABLE (points 5, 6: add RM, Semi in W0; add revenue/cost/margin cols)
 # ════════════════════════════════════════════════════════════════
+@st.cache_data(show_spinner=False, max_entries=32)
+def week_table_df(params, _states):
+    return pd.DataFrame(week_table(_states, params["price"]))
+
+
 with st.expander("\U0001f4ca Detailed Week-by-Week Data", expanded=False):
-    table_data = []
-    for s in states:
-        wk_rev = s['sales'] * price
-        wk_vc = s.get('cost_mat', 0) + s.get('cost_semi', 0) + s.get('cost_fp', 0)
-        wk_margin = wk_rev - wk_vc
-        in_mat_pipe = sum(s.get('mat_pipe', []))
-        in_semi_pipe = sum(s.get('semi_pipe', []))
-        in_fp_pipe = sum(s.get('fp_pipe', []))
-        table_data.append({
-            'Week': s['week'],
-            'Demand': s['demand'], 'Dem A': s['demand_a'], 'Dem B': s['demand_b'],
-            'Sales': s['sales'], 'Sales A': s['sales_a'], 'Sales B': s['sales_b'],
-            'Missed': s['missed'], 'Miss A': s['missed_a'], 'Miss B': s['missed_b'],
-            # Stores
-            'Stk A': s['store_a'], 'Stk B': s['store_b'],
-            'Alloc A': s['alloc_a'], 'Alloc B': s['alloc_b'],
-            # CW stage
-            'CW Wait': s.get('cw_stock', 0), 'CW Pipe': s.get('cw_shipped', 0),
-            # FP pipe
-            'FP Pipe': round(in_fp_pipe, 1),
-            # Semi stage
-            'Semi Wait': s.get('semi_stock', 0), 'Semi Pipe': round(in_semi_pipe, 1),
-            # RM stage
-            'RM Wait': s.get('raw_mat_stock', 0), 'Mat Pipe': round(in_mat_pipe, 1),
-            # Totals
-            'WIP': s.get('wip_total', 0),
-            'Order': s['order'], 'Pending': s['pending'],
-            'Sup Cap': s.get('supplier_cap', 0),
-            # Financials
-            'Revenue': round(wk_rev),
-            'Cost RM': round(s.get('cost_mat', 0)),
-            'Cost Semi': round(s.get('cost_semi', 0)),
-            'Cost FP': round(s.get('cost_fp', 0)),
-            'Tot VC': round(wk_vc),
-            'Margin': round(wk_margin),
-        })
-    st.dataframe(pd.DataFrame(table_data), use_container_width=True, height=500)
+    st.dataframe(week_table_df(params, states), use_container_width=True, height=500)
     st.caption("**CW Wait** = stock sitting in CW. **CW Pipe** = units shipped from CW toward stores this week. "
                "**Costs**: all anticipated 1wk before arrival (RM @50%, Semi +25%, FP +25%).")
 
+prof.phase("scenarios")
+
 # ════════════════════════════════════════════════════════════════
 # SAVE SCENARIO (point 4: include demand description)
 # ════════════════════════════════════════════════════════════════
@@ -1503,3 +802,241 @@ with st.expander("\U0001f4be Save Scenario for Comparison", expanded=False):
         if st.button("Clear All"):
             st.session_state.saved_scenarios = {}
             st.rerun()
+
+prof.phase("sweep")
+
+# ════════════════════════════════════════════════════════════════
+# PARAMETER SWEEP (grid over two levers, everything else = sidebar)
+# ════════════════════════════════════════════════════════════════
+with st.expander("\U0001f5fa\ufe0f Parameter Sweep (heatmap)", expanded=False):
+    st.caption("Evaluates every combination of the two levers below, all other settings as in the sidebar, "
+               "on all CPU cores.")
+    sw1, sw2, sw3 = st.columns(3)
+    labels = list(SWEEP_AXES)
+    with sw1:
+        x_label = st.selectbox("X axis", labels, index=1, key="sweep_x")
+    with sw2:
+        y_label = st.selectbox("Y axis", [l for l in labels if l != x_label], index=0, key="sweep_y")
+    with sw3:
+        metric_label = st.selectbox("Metric", list(SWEEP_METRICS), key="sweep_metric")
+
+    ranges = {}
+    rc1, rc2 = st.columns(2)
+    for col, label in ((rc1, x_label), (rc2, y_label)):
+        name, lo, hi, step, default = SWEEP_AXES[label]
+        with col:
+            r_lo, r_hi = st.slider(label, lo, hi, default, step, key=f"sweep_rng_{name}")
+        values = list(range(r_lo, r_hi + 1, step))
+        ranges[name] = [v / 100 for v in values] if name == "cap_ramp" else values
+
+    if st.button("Run sweep", key="sweep_run"):
+        sweep_base = dict(params, total_stock=total_stock, store_pct=store_pct,
+                          wh_pct=warehouse_pct, semi_pct=semi_pct)
+        st.session_state.sweep_table = run_sweep_cached(sweep_base, ranges)
+        st.session_state.sweep_axes = (x_label, y_label)
+
+    if "sweep_table" in st.session_state:
+        sweep_df = pd.DataFrame(st.session_state.sweep_table)
+        sx_label, sy_label = st.session_state.sweep_axes
+        sx, sy = SWEEP_AXES[sx_label][0], SWEEP_AXES[sy_label][0]
+        metric = SWEEP_METRICS[metric_label]
+        cell = sweep_df.groupby([sx, sy], as_index=False)[metric].mean()
+        heat = alt.Chart(cell).mark_rect().encode(
+            x=alt.X(f"{sx}:O", title=sx_label), y=alt.Y(f"{sy}:O", title=sy_label, sort="descending"),
+            color=alt.Color(f"{metric}:Q", title=metric_label,
+                            scale=alt.Scale(scheme="redyellowgreen",
+                                            reverse=metric in ("total_missed", "stockout_weeks"))),
+            tooltip=[sx, sy, alt.Tooltip(f"{metric}:Q", format=",.3f")],
+        ).properties(height=360)
+        st.altair_chart(heat, use_container_width=True)
+        st.caption(f"{len(sweep_df):,} scenarios evaluated.")
+        st.download_button("Download results (CSV)", sweep_df.to_csv(index=False),
+                           file_name="sweep_results.csv", mime="text/csv")
+
+prof.phase("solver")
+
+# ════════════════════════════════════════════════════════════════
+# TARGET SOLVER (minimum stock / capacity for a service or margin target)
+# ════════════════════════════════════════════════════════════════
+def _apply_solved_stock(total, split):
+    st.session_state["total_stock"] = int(total)
+    for k, v in split.items():
+        st.session_state[k] = int(v)
+
+
+with st.expander("\U0001f3af Target Solver", expanded=False):
+    solver_base = dict(params, total_stock=total_stock, store_pct=store_pct,
+                       wh_pct=warehouse_pct, semi_pct=semi_pct)
+    reco_kpis = kpis_at_cached(solver_base, total_stock=recommended_stock)
+    st.caption(f"Sidebar recommendation ({recommended_stock:,} pcs, current split) simulates to "
+               f"**{reco_kpis['svc_level']*100:.1f}%** service and **\u20ac{reco_kpis['margin']:,.0f}** margin.")
+
+    t1, t2, t3 = st.columns(3)
+    with t1:
+        solve_for = st.radio("Solve for", ["Total stock", "Stock split + total", "Starting capacity",
+                                           "Capacity ramp-up"], key="solve_for")
+    with t2:
+        solve_metric = st.radio("Target", ["Service level", "Net margin"], key="solve_metric", horizontal=True)
+        if solve_metric == "Service level":
+            solve_target = st.slider("Minimum service level (%)", 50, 100, 95, 1, key="solve_svc") / 100
+            metric_key = "svc_level"
+        else:
+            solve_target = st.number_input("Minimum net margin (\u20ac)", value=0, step=50000, key="solve_margin")
+            metric_key = "margin"
+    with t3:
+        st.markdown("")
+        run_solver = st.button("Solve", key="solve_run", use_container_width=True)
+
+    if run_solver:
+        if solve_for == "Total stock":
+            sol = min_stock_for_target(solver_base, solve_target, metric_key)
+        elif solve_for == "Stock split + total":
+            sol = cheapest_split_for_target(solver_base, solve_target, metric_key)
+        elif solve_for == "Starting capacity":
+            sol = min_capacity_for_target(solver_base, solve_target, metric_key, "cap_start")
+        else:
+            sol = min_capacity_for_target(solver_base, solve_target, metric_key, "cap_ramp")
+        st.session_state.solver_result = (solve_for, sol)
+
+    if "solver_result" in st.session_state:
+        solved_for, sol = st.session_state.solver_result
+        if not sol["feasible"]:
+            st.warning(f"Target not reachable within the search range ({sol['runs']} simulations).")
+        else:
+            k = sol["kpis"]
+            if solved_for == "Starting capacity":
+                answer = f"Starting capacity **{sol['cap_start']:,} pcs/wk**"
+            elif solved_for == "Capacity ramp-up":
+                answer = f"Ramp-up **{sol['cap_ramp']*100:.0f}%/wk**"
+            else:
+                answer = f"Total stock **{sol['total_stock']:,} pcs**"
+                if solved_for == "Stock split + total":
+                    answer += (f" split Store {sol['store_pct']}% / WH {sol['wh_pct']}% / "
+                               f"Semi {sol['semi_pct']}% (stock value \u20ac{sol['init_stock_value']:,.0f})")
+            st.success(f"{answer} \u2192 service **{k['svc_level']*100:.1f}%**, "
+                       f"margin **\u20ac{k['margin']:,.0f}** ({sol['runs']} simulations).")
+            if solved_for in ("Total stock", "Stock split + total"):
+                split = ({key: sol[key] for key in ("store_pct", "wh_pct", "semi_pct")}
+                         if solved_for == "Stock split + total" else {})
+                st.button("Apply to sidebar", key="solve_apply", on_click=_apply_solved_stock,
+                          args=(sol["total_stock"], split))
+
+prof.phase("sensitivity")
+
+# ════════════════════════════════════════════════════════════════
+# SENSITIVITY (each lever moved down and up, as a tornado chart)
+# ════════════════════════════════════════════════════════════════
+with st.expander("\U0001f32a\ufe0f Sensitivity (tornado)", expanded=False):
+    se1, se2 = st.columns(2)
+    with se1:
+        sens_label = st.selectbox("KPI", ["Net margin (\u20ac)", "Service level"], key="sens_metric")
+    with se2:
+        sens_step = st.slider("Relative step for stock / capacity (%)", 5, 50, 20, 5, key="sens_step") / 100
+    sens_metric = SWEEP_METRICS[sens_label]
+    sens_other = "svc_level" if sens_metric == "margin" else "margin"
+    sens_base = dict(params, total_stock=total_stock, store_pct=store_pct,
+                     wh_pct=warehouse_pct, semi_pct=semi_pct)
+    sens_rows, sens_kpis = sensitivity_cached(sens_base, metrics=(sens_metric, sens_other), rel_step=sens_step)
+
+    sens_k0 = sens_kpis[sens_metric]
+    sens_fmt = (lambda v: f"{v*100:.1f}%") if sens_metric == "svc_level" else (lambda v: f"\u20ac{v:,.0f}")
+    bars = []
+    for r in sens_rows:
+        for move in ("low", "high"):
+            bars.append({"Lever": SENS_LEVERS[r["lever"]], "Move": f"{move} ({r[move]:g})",
+                         "Side": move, "Delta": r[f"{sens_metric}_{move}"] - sens_k0})
+    tornado = alt.Chart(pd.DataFrame(bars)).mark_bar().encode(
+        x=alt.X("Delta:Q", title=f"{sens_label} vs current ({sens_fmt(sens_k0)})"),
+        y=alt.Y("Lever:N", sort=[SENS_LEVERS[r["lever"]] for r in sens_rows], title=None),
+        color=alt.Color("Side:N", title="Lever moved", scale=alt.Scale(domain=["low", "high"],
+                                                                      range=["#e74c3c", "#27ae60"])),
+        tooltip=["Lever", "Move", alt.Tooltip("Delta:Q", format=",.3f")],
+    ).properties(height=32 * len(sens_rows) + 40)
+    st.altair_chart(tornado, use_container_width=True)
+
+    st.dataframe(pd.DataFrame([{
+        "Lever": SENS_LEVERS[r["lever"]], "Current": r["base"], "Low": r["low"], "High": r["high"],
+        f"{sens_label} low": sens_fmt(r[f"{sens_metric}_low"]), f"{sens_label} high": sens_fmt(r[f"{sens_metric}_high"]),
+        f"Elasticity ({sens_metric})": round(r[f"{sens_metric}_elasticity"], 3),
+        f"Elasticity ({sens_other})": round(r[f"{sens_other}_elasticity"], 3),
+    } for r in sens_rows]), use_container_width=True, hide_index=True)
+    st.caption(f"{1 + 2 * len(sens_rows)} simulations in one batch. Lead times, order frequency and splits "
+               f"move by one step; stock and capacity by the relative step. Elasticity = % change of the "
+               f"KPI / % change of the lever, between its low and high value.")
+
+prof.phase("monte_carlo")
+
+# ════════════════════════════════════════════════════════════════
+# MONTE CARLO (stochastic demand around the chosen profile)
+# ════════════════════════════════════════════════════════════════
+MC_NOISE = {"Poisson": "poisson", "Negative binomial": "negbin", "Lognormal (multiplicative)": "lognormal"}
+
+with st.expander("\U0001f3b2 Monte Carlo: Stochastic Demand", expanded=False):
+    mc1, mc2, mc3, mc4 = st.columns(4)
+    with mc1:
+        mc_noise = st.selectbox("Noise model", list(MC_NOISE), index=1, key="mc_noise")
+    with mc2:
+        mc_cv = st.slider("Demand CV", 0.05, 1.0, 0.3, 0.05, key="mc_cv",
+                          disabled=mc_noise == "Poisson")
+    with mc3:
+        mc_n = st.select_slider("Replications", [1000, 2000, 5000, 10000, 20000], 10000, key="mc_n")
+    with mc4:
+        mc_seed = st.number_input("Seed", 0, 10**9, 42, key="mc_seed")
+    mc_svc_floor = st.slider("Service level threshold (%)", 50, 100, 90, 1, key="mc_floor") / 100
+
+    if st.button("Run Monte Carlo", key="mc_run"):
+        st.session_state.mc_result = run_monte_carlo_cached(params, mc_n, MC_NOISE[mc_noise], mc_cv, mc_seed)
+
+    if "mc_result" in st.session_state:
+        mc = st.session_state.mc_result
+        m_pct = mc.percentiles("margin")
+        s_pct = mc.percentiles("svc_level")
+        q1, q2, q3, q4 = st.columns(4)
+        with q1:
+            st.metric(f"P(service < {mc_svc_floor*100:.0f}%)", f"{mc.prob('svc_level', mc_svc_floor)*100:.1f}%")
+        with q2:
+            st.metric("Service P5 / P50", f"{s_pct[5]*100:.1f}% / {s_pct[50]*100:.1f}%")
+        with q3:
+            st.metric("Margin P5", f"\u20ac{m_pct[5]:,.0f}")
+        with q4:
+            st.metric("Margin P50 / P95", f"\u20ac{m_pct[50]:,.0f} / \u20ac{m_pct[95]:,.0f}")
+
+        st.markdown("#### Weekly sales fan chart")
+        fan = mc.fan("sales")[1:]
+        dem_mid = mc.fan("demand")[1:, 2]
+        fan_df = pd.DataFrame({"Week": list(range(1, len(fan) + 1)), "p05": fan[:, 0], "p25": fan[:, 1],
+                               "p50": fan[:, 2], "p75": fan[:, 3], "p95": fan[:, 4], "Demand p50": dem_mid})
+        outer = alt.Chart(fan_df).mark_area(opacity=0.2, color="#2c5f8a").encode(
+            x=alt.X("Week:Q"), y=alt.Y("p05:Q", title="Units/week"), y2="p95:Q")
+        inner = alt.Chart(fan_df).mark_area(opacity=0.35, color="#2c5f8a").encode(
+            x="Week:Q", y="p25:Q", y2="p75:Q")
+        mid = alt.Chart(fan_df).mark_line(color="#1a2a40", strokeWidth=2).encode(x="Week:Q", y="p50:Q")
+        dem_l = alt.Chart(fan_df).mark_line(color="#4a90d9", strokeDash=[6, 3]).encode(x="Week:Q", y="Demand p50:Q")
+        st.altair_chart((outer + inner + mid + dem_l).properties(height=280), use_container_width=True)
+        st.caption("Bands: 5-95% and 25-75% of replications; dark line = median sales, dashed = median demand.")
+
+        h1, h2 = st.columns(2)
+        dist_df = pd.DataFrame({"Service level (%)": mc.kpis["svc_level"] * 100, "Net margin": mc.kpis["margin"]})
+        with h1:
+            st.altair_chart(alt.Chart(dist_df).mark_bar(color="#1a8a4a").encode(
+                x=alt.X("Service level (%):Q", bin=alt.Bin(maxbins=40)), y=alt.Y("count():Q", title="Replications")
+            ).properties(height=220), use_container_width=True)
+        with h2:
+            st.altair_chart(alt.Chart(dist_df).mark_bar(color="#2c5f8a").encode(
+                x=alt.X("Net margin:Q", bin=alt.Bin(maxbins=40)), y=alt.Y("count():Q", title="Replications")
+            ).properties(height=220), use_container_width=True)
+
+profile_log.add(prof.finish())
+
+# ════════════════════════════════════════════════════════════════
+# PROFILING (debug only: ?debug=1 or SCSIM_PROFILE=1)
+# ════════════════════════════════════════════════════════════════
+if st.query_params.get("debug") == "1" or os.environ.get("SCSIM_PROFILE") == "1":
+    with st.expander("\u23f1\ufe0f Profiling", expanded=False):
+        st.caption(f"Last {len(profile_log.records)} runs of this session. 'run' is a full script run, "
+                   f"'week_view' the week view alone (a week step reruns only that).")
+        st.dataframe(pd.DataFrame(profile_log.summary()).round(1), use_container_width=True, hide_index=True)
+        flows_seen = profile_log.note_counts("flows")
+        last_step = profile_log.last("week_view")
+        st.caption("Flow cache: " + ", ".join(f"{k} {n}" for k, n in flows_seen.most_common())
+                   + (f" | flow view HTML {last_step['notes']['html_bytes'] / 1024:,.0f} KiB" if last_step else ""))
@@ -0,0 +1,153 @@
+"""Benchmark suite for the engine, the KPI layer and the HTML renderer.
+
+    python benchmarks/bench.py run --out benchmarks/baseline.json
+    python benchmarks/bench.py run --compare benchmarks/baseline.json
+    python benchmarks/bench.py compare old.json new.json --tolerance 0.25
+
+Each target is timed `--repeat` times on every fixture in scenarios.py
+(median and best wall time), then run once more under tracemalloc for the
+memory it allocates and keeps (alloc_kib / alloc_blocks, result included)
+and its peak. `compare` exits with status 1 when any metric regresses by
+more than the tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from scsim import run_simulation, compute_kpis, cumulative_kpis, make_sc_html  # noqa: E402
+from scenarios import SCENARIOS  # noqa: E402
+
+# Metrics checked by compare, with the absolute change below which a
+# relative slowdown is treated as noise
+THRESHOLDS = {'wall_ms': 0.05, 'peak_kib': 4.0, 'alloc_kib': 4.0}
+
+
+def _econ(p):
+    return (p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'], p['weeks'],
+            p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat'])
+
+
+def _targets(p):
+    """(name, setup, call) per benchmarked function; setup runs untimed."""
+    states = run_simulation(**p)
+
+    def scrub(sim_weeks):
+        return [cumulative_kpis(sim_weeks, w, *_econ(p)) for w in range(1, p['weeks'] + 1)]
+
+    return [
+        ('run_simulation', lambda: p, lambda a: run_simulation(**a)),
+        # Fresh slices so memoized running totals are rebuilt every time
+        ('compute_kpis', lambda: states[1:], lambda s: compute_kpis(s, *_econ(p))),
+        ('cumulative_kpis_all_weeks', lambda: states[1:], scrub),
+        ('make_sc_html', lambda: states[p['weeks']], lambda s: make_sc_html(s, p)),
+    ]
+
+
+def measure(setup, call, repeat):
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        call(arg)
+        times.append((time.perf_counter() - t0) * 1000)
+    arg = setup()
+    gc.collect()
+    tracemalloc.start()
+    out = call(arg)
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del out
+    return {'wall_ms': statistics.median(times), 'wall_min_ms': min(times),
+            'alloc_kib': current / 1024, 'alloc_blocks': blocks, 'peak_kib': peak / 1024}
+
+
+def run(repeat=5, only=None):
+    results = {}
+    for scen, p in SCENARIOS.items():
+        if only and only not in scen:
+            continue
+        for name, setup, call in _targets(p):
+            results[f"{scen}/{name}"] = measure(setup, call, repeat)
+    return {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__,
+                 'machine': platform.machine(), 'system': platform.system(),
+                 'repeat': repeat},
+        'results': results,
+    }
+
+
+def compare(base, new, tolerance):
+    """Rows of (key, metric, base, new, ratio, regressed) for keys in both runs."""
+    rows = []
+    for key in sorted(set(base['results']) & set(new['results'])):
+        b, n = base['results'][key], new['results'][key]
+        for metric, floor in THRESHOLDS.items():
+            ratio = n[metric] / b[metric] if b[metric] > 0 else float('inf') if n[metric] > 0 else 1.0
+            bad = ratio > 1 + tolerance and n[metric] - b[metric] > floor
+            rows.append((key, metric, b[metric], n[metric], ratio, bad))
+    return rows
+
+
+def print_results(doc):
+    print(f"{'benchmark':58s} {'median ms':>10s} {'best ms':>9s} {'alloc KiB':>10s} {'blocks':>8s} {'peak KiB':>9s}")
+    for key, r in doc['results'].items():
+        print(f"{key:58s} {r['wall_ms']:10.3f} {r['wall_min_ms']:9.3f} {r['alloc_kib']:10.1f} "
+              f"{r['alloc_blocks']:8d} {r['peak_kib']:9.1f}")
+
+
+def print_comparison(rows, tolerance):
+    bad = [r for r in rows if r[5]]
+    for key, metric, b, n, ratio, _ in bad:
+        print(f"REGRESSION {key} {metric}: {b:.3f} -> {n:.3f} (x{ratio:.2f})")
+    print(f"{len(bad)} regression(s) over {len(rows)} checks at tolerance {tolerance:.0%}")
+    return 1 if bad else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('run', help='run the suite')
+    r.add_argument('--repeat', type=int, default=5)
+    r.add_argument('--only', help='only scenarios whose name contains this')
+    r.add_argument('--out', help='write results as JSON to this file')
+    r.add_argument('--compare', metavar='BASELINE', help='compare against a saved run')
+    r.add_argument('--tolerance', type=float, default=0.25)
+    c = sub.add_parser('compare', help='compare two saved runs')
+    c.add_argument('base')
+    c.add_argument('new')
+    c.add_argument('--tolerance', type=float, default=0.25)
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'compare':
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        return print_comparison(compare(base, new, args.tolerance), args.tolerance)
+
+    doc = run(args.repeat, args.only)
+    print_results(doc)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(doc, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        return print_comparison(compare(base, doc, args.tolerance), args.tolerance)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Fixed scenario fixtures for the benchmark suite.
+
+PRESETS mirrors the sidebar's Quick Scenarios (3 lead-time profiles x 3
+demand shapes, 26 weeks, A=60% with smart allocation). STRESS stretches the
+horizon and the pipes well past anything the UI allows.
+"""
+from scsim import BASE_FORECAST, LT_PROFILES
+
+WEEKS = 26
+# Initial stock split (store / WH / semi %) per lead-time profile, as in apply_preset
+STOCK_SPLIT = {"Agile": (60, 20, 10), "Medium": (80, 20, 0), "Push": (100, 0, 0)}
+
+
+def linear_demand(weeks, start, end, over):
+    """Editor demand for the ramp / drop shapes: start -> end over `over` weeks, then flat."""
+    out = [0]
+    for w in range(1, weeks + 1):
+        val = start + (end - start) * w / over if w <= over else end
+        out.append(max(0, int(round(val))))
+    return out
+
+
+DEMANDS = {
+    "Flat": lambda weeks: [0] + [BASE_FORECAST] * weeks,
+    "Growth": lambda weeks: linear_demand(weeks, BASE_FORECAST, 300, 5),
+    "Drop": lambda weeks: linear_demand(weeks, BASE_FORECAST, 40, 1),
+}
+
+
+def preset_params(lt_name, dem_name, weeks=WEEKS):
+    """run_simulation arguments for one Quick Scenario button."""
+    lt = LT_PROFILES[lt_name]
+    total_lt = lt["mat_lt"] + lt["semi_lt"] + lt["fp_lt"] + lt["dist_lt"]
+    total_stock = min(BASE_FORECAST * (total_lt + lt["order_freq"]), 10000)
+    store_pct, wh_pct, semi_pct = STOCK_SPLIT[lt_name]
+    init_store = int(round(total_stock * store_pct / 100))
+    init_cw = int(round(total_stock * wh_pct / 100))
+    init_semi = int(round(total_stock * semi_pct / 100))
+    return {
+        'weeks': weeks, 'init_store': init_store, 'init_cw': init_cw,
+        'init_semi': init_semi,
+        'init_rawmat': total_stock - init_store - init_cw - init_semi,
+        'order_freq': lt["order_freq"], 'mat_lt': lt["mat_lt"],
+        'semi_lt': lt["semi_lt"], 'fp_lt': lt["fp_lt"], 'dist_lt': lt["dist_lt"],
+        'cap_start': 100, 'cap_ramp': 0.2, 'base_forecast': BASE_FORECAST,
+        'demand_mult': 1.0, 'ramp_start': 1, 'ramp_end': 1,
+        'price': 1000, 'var_cost': 200, 'fixed_pct': 0.45,
+        'store_a_pct': 60, 'smart_distrib': True,
+        'custom_demand': tuple(DEMANDS[dem_name](weeks)),
+    }
+
+
+PRESETS = {f"{lt}-{dem}": preset_params(lt, dem)
+           for lt in LT_PROFILES for dem in DEMANDS}
+
+
+def _stress(weeks, scale, dem_name="Growth"):
+    p = preset_params("Push", dem_name, weeks)
+    for k in ('mat_lt', 'semi_lt', 'fp_lt', 'dist_lt'):
+        p[k] *= scale
+    return p
+
+
+STRESS = {
+    "long-horizon-520w": preset_params("Medium", "Growth", 520),
+    "long-horizon-5200w": preset_params("Agile", "Drop", 5200),
+    "long-pipes-x10": _stress(520, 10),
+    "long-pipes-x50": _stress(2600, 50),
+}
+
+SCENARIOS = {**PRESETS, **STRESS}
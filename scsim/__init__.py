@@ -0,0 +1,15 @@
+"""Headless supply chain simulation core.
+
+Importing this package pulls in no UI dependency (no Streamlit, pandas or
+Altair); the only third-party import is NumPy.
+"""
+from .constants import (BASE_FORECAST, LT_PROFILES,
+                        VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED)
+from .engine import (run_simulation, simulate_flows, stream_simulation,
+                     resume_flows, checkpoint, EngineState)
+from .valuation import valuate
+from .batch import run_simulation_batch, BatchResult
+from .network import run_network_simulation, NetworkResult
+from .result import SimResult
+from .kpis import compute_kpis, cumulative_kpis, compute_network_kpis, RunningKpis
+from .render import make_sc_html, make_playback_html
@@ -0,0 +1,278 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+from .result import COLUMNS, PIPES, ROUND0_COLUMNS, SimResult, round1
+
+# ════════════════════════════════════════════════════════════════
+# BATCH ENGINE — same logic as run_simulation, all scenarios advanced together
+# ════════════════════════════════════════════════════════════════
+
+
+def _batch_demand(weeks, n, base_forecast, demand_mult, ramp_start, ramp_end, custom_demand):
+    """Demand matrix (n, weeks+1), same rules as run_simulation."""
+    w = np.arange(weeks + 1)
+    if custom_demand is not None:
+        cd = np.asarray(custom_demand, dtype=float)
+        if cd.ndim == 1:
+            cd = cd[None, :]
+        # Short vectors repeat their last value, like the scalar engine
+        idx = np.minimum(w, cd.shape[1] - 1)
+        dem = np.trunc(cd[:, idx])
+        return np.broadcast_to(dem, (n, weeks + 1)).astype(float)
+    bf = np.broadcast_to(np.asarray(base_forecast, dtype=float), (n,))[:, None]
+    mult = np.broadcast_to(np.asarray(demand_mult, dtype=float), (n,))[:, None]
+    rs = np.broadcast_to(np.asarray(ramp_start, dtype=float), (n,))[:, None]
+    re = np.broadcast_to(np.asarray(ramp_end, dtype=float), (n,))[:, None]
+    target = np.rint(bf * mult)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = (w - rs) / (re - rs)
+        ramp = np.rint(bf + (bf * mult - bf) * p)
+    dem = np.where(w < rs, bf,
+          np.where(rs == re, target,
+          np.where(w <= re, ramp, target)))
+    return dem
+
+
+def run_simulation_batch(weeks, init_store, init_cw, init_semi, init_rawmat,
+                         order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                         cap_start, cap_ramp, base_forecast,
+                         demand_mult, ramp_start, ramp_end,
+                         price, var_cost, fixed_pct, store_a_pct, smart_distrib,
+                         custom_demand=None, shared_capacity=None):
+    """Vectorized run_simulation over many parameter sets.
+
+    Every argument except ``weeks`` may be a scalar or a 1-D array (one entry
+    per scenario). ``custom_demand`` is either one demand vector shared by all
+    scenarios or a 2-D array with one row per scenario. Pipes are kept as
+    arrival schedules: a unit pushed at week w with lead time L arrives at w+L.
+
+    ``shared_capacity`` (see scsim.portfolio.SharedCapacity) couples the
+    scenarios: each stage's output is further limited by a pool all of them
+    draw from, granted by its rule after the per-scenario capacity.
+    """
+    args = [init_store, init_cw, init_semi, init_rawmat, order_freq,
+            mat_lt, semi_lt, fp_lt, dist_lt, cap_start, cap_ramp, base_forecast,
+            demand_mult, ramp_start, ramp_end, price, var_cost, fixed_pct,
+            store_a_pct, smart_distrib]
+    n = int(np.broadcast(*[np.asarray(a) for a in args]).size)
+    if custom_demand is not None and np.ndim(custom_demand) == 2:
+        n = max(n, len(custom_demand))
+
+    def vec(x, dtype=float):
+        return np.broadcast_to(np.asarray(x, dtype=dtype), (n,)).copy()
+
+    order_freq = vec(order_freq, int)
+    lts = [np.maximum(1, vec(x, int)) for x in (mat_lt, semi_lt, fp_lt, dist_lt)]
+    l_mat, l_semi, l_fp, l_dist = lts
+    cap_start = vec(cap_start); cap_ramp = vec(cap_ramp)
+    base_forecast = vec(base_forecast); var_cost = vec(var_cost)
+    smart = vec(smart_distrib, bool)
+    pct_a = vec(store_a_pct) / 100.0
+    pct_b = 1.0 - pct_a
+    coverage = (vec(mat_lt, int) + vec(semi_lt, int) + vec(fp_lt, int)
+                + vec(dist_lt, int) + order_freq)
+
+    demand = _batch_demand(weeks, n, base_forecast, demand_mult, ramp_start, ramp_end,
+                           custom_demand)
+
+    # Arrival schedules: column t holds what arrives at week t
+    horizon = weeks + 2 + int(max(l.max() for l in lts))
+    mat_s = np.zeros((n, horizon)); semi_s = np.zeros((n, horizon))
+    fp_s = np.zeros((n, horizon))
+    dist_sa = np.zeros((n, horizon)); dist_sb = np.zeros((n, horizon))
+    rows = np.arange(n)
+
+    store_a = vec(init_store) / 2.0
+    store_b = vec(init_store) / 2.0
+    raw_mat = vec(init_rawmat); semi = vec(init_semi); cw = vec(init_cw)
+    # Running in-transit totals per pipe
+    mat_wip = np.zeros(n); semi_wip = np.zeros(n); fp_wip = np.zeros(n)
+    dist_wip_a = np.zeros(n); dist_wip_b = np.zeros(n)
+
+    pb = np.zeros(n); pn = np.zeros(n)
+    co = np.zeros(n); cas = np.zeros(n)
+    discovered = np.zeros(n, dtype=bool)
+    first_order_week = np.full(n, np.inf)
+    ff = base_forecast.copy()
+
+    cols = {k: np.zeros((n, weeks + 1)) for k in COLUMNS + ('coverage',)}
+    cols['forecast'][:, 0] = base_forecast
+    cols['store_a'][:, 0] = store_a; cols['store_b'][:, 0] = store_b
+    cols['store_stock'][:, 0] = store_a + store_b
+    for k in ('supplier_cap', 'semi_cap', 'fp_cap'):
+        cols[k][:, 0] = cap_start
+    cols['raw_mat_before_prod'][:, 0] = raw_mat; cols['raw_mat_stock'][:, 0] = raw_mat
+    cols['semi_stock'][:, 0] = semi; cols['cw_stock'][:, 0] = cw
+    cols['coverage'][:] = coverage[:, None]
+    smart_mode = np.zeros((n, weeks + 1), dtype=bool)
+
+    cap_max = cap_start * 10
+    for w in range(1, weeks + 1):
+        dem_total = demand[:, w]
+        dem_a = np.rint(dem_total * pct_a)
+        dem_b = dem_total - dem_a
+
+        review = (w % order_freq) == 0
+        ff = np.where(review, dem_total, ff)
+        discovered |= review & smart
+
+        # 1. Arrivals
+        m_arr = mat_s[:, w]; sm_arr = semi_s[:, w]; fp_arr = fp_s[:, w]
+        da_arr = dist_sa[:, w]; db_arr = dist_sb[:, w]
+        mat_wip -= m_arr; semi_wip -= sm_arr; fp_wip -= fp_arr
+        dist_wip_a -= da_arr; dist_wip_b -= db_arr
+        d_arr_total = da_arr + db_arr
+        cas += d_arr_total
+
+        # 2-3. Stores sell
+        avail_a = store_a + da_arr
+        sales_a = np.minimum(dem_a, avail_a)
+        missed_a = np.maximum(0, dem_a - sales_a)
+        store_a = avail_a - sales_a
+        avail_b = store_b + db_arr
+        sales_b = np.minimum(dem_b, avail_b)
+        missed_b = np.maximum(0, dem_b - sales_b)
+        store_b = avail_b - sales_b
+        store_total = store_a + store_b
+
+        # 4. Supplier
+        pc = np.minimum(cap_start * (1 + pn * cap_ramp), cap_max)
+        shipped = np.where(pb > 0.01, np.ceil(np.minimum(pb, pc)), 0.0)
+        if shared_capacity is not None:
+            shipped = shared_capacity.grant('supplier', w, shipped)
+        pb -= shipped
+        pn += w > first_order_week
+
+        # 5. Arrivals update stocks
+        raw_mat = raw_mat + m_arr
+        raw_before = raw_mat
+        semi = semi + sm_arr
+        cw = cw + fp_arr
+
+        # 5b. Order decision
+        pre_wip = (mat_wip + semi_wip + fp_wip + dist_wip_a + dist_wip_b
+                   + raw_mat + semi + cw + pb)
+        od = np.where(review, np.ceil(np.maximum(0, ff * coverage - (store_total + pre_wip))), 0.0)
+        co += od; pb += od
+        first_order_week = np.where(review & (od > 0) & np.isinf(first_order_week),
+                                    w, first_order_week)
+        started = ~np.isinf(first_order_week)
+
+        # 6-7. Semi and FP processing (sn == fn == w - 1)
+        sc_ = np.minimum(cap_start * (1 + (w - 1) * cap_ramp), cap_max)
+        si = np.where((raw_mat > 0.01) & started, np.ceil(np.minimum(raw_mat, sc_)), 0.0)
+        if shared_capacity is not None:
+            si = shared_capacity.grant('semi', w, si)
+        raw_mat = raw_mat - si
+        fi = np.where((semi > 0.01) & started, np.ceil(np.minimum(semi, sc_)), 0.0)
+        if shared_capacity is not None:
+            fi = shared_capacity.grant('fp', w, fi)
+        semi = semi - fi
+
+        # 8. CW push + allocation
+        ship_out = np.where(cw > 0.01, np.ceil(cw), 0.0)
+        cw = cw - ship_out
+        smart_on = smart & discovered
+        dem_a_wk = np.maximum(ff * pct_a, 0.01)
+        dem_b_wk = np.maximum(ff * pct_b, 0.01)
+        cover_a = (store_a + dist_wip_a) / dem_a_wk
+        cover_b = (store_b + dist_wip_b) / dem_b_wk
+        pri_a = np.minimum(ship_out, np.ceil(np.maximum(0, (cover_b - cover_a) * dem_a_wk)))
+        fill_a = pri_a + np.rint((ship_out - pri_a) * pct_a)
+        pri_b = np.minimum(ship_out, np.ceil(np.maximum(0, (cover_a - cover_b) * dem_b_wk)))
+        fill_b = ship_out - (pri_b + np.rint((ship_out - pri_b) * pct_b))
+        alloc_a = np.select(
+            [~smart_on, cover_a < cover_b, cover_b < cover_a],
+            [np.rint(ship_out * 0.5), fill_a, fill_b],
+            np.rint(ship_out * pct_a))
+        alloc_a = np.where(ship_out > 0, alloc_a, 0.0)
+        alloc_b = ship_out - alloc_a
+
+        # 9. Push into pipes
+        mat_s[rows, w + l_mat] = shipped; mat_wip += shipped
+        semi_s[rows, w + l_semi] = si; semi_wip += si
+        fp_s[rows, w + l_fp] = fi; fp_wip += fi
+        dist_sa[rows, w + l_dist] = alloc_a; dist_wip_a += alloc_a
+        dist_sb[rows, w + l_dist] = alloc_b; dist_wip_b += alloc_b
+
+        # 10. Post-processing WIP
+        total_wip = (mat_wip + semi_wip + fp_wip + dist_wip_a + dist_wip_b
+                     + raw_mat + semi + cw + pb)
+
+        for k, v in (('demand', dem_total), ('demand_a', dem_a), ('demand_b', dem_b),
+                     ('forecast', ff), ('mat_arr', m_arr), ('semi_arr', sm_arr),
+                     ('fp_arr', fp_arr), ('dist_arr_a', da_arr), ('dist_arr_b', db_arr),
+                     ('dist_arr', d_arr_total), ('sales_a', sales_a), ('sales_b', sales_b),
+                     ('sales', sales_a + sales_b), ('missed_a', missed_a),
+                     ('missed_b', missed_b), ('missed', missed_a + missed_b),
+                     ('store_a', store_a), ('store_b', store_b), ('store_stock', store_total),
+                     ('supplier_shipped', shipped), ('supplier_cap', pc),
+                     ('raw_mat_before_prod', raw_before), ('raw_mat_stock', raw_mat),
+                     ('semi_input', si), ('semi_cap', sc_), ('semi_stock', semi),
+                     ('fp_input', fi), ('fp_cap', sc_), ('cw_shipped', ship_out),
+                     ('cw_stock', cw), ('alloc_a', alloc_a), ('alloc_b', alloc_b),
+                     ('order', od), ('pending', co - cas), ('backlog', pb),
+                     ('wip_total', total_wip)):
+            cols[k][:, w] = v
+        smart_mode[:, w] = smart_on
+
+    # Costs are booked one week ahead: what arrives at week w+1
+    vc = var_cost[:, None]
+    cols['cost_mat'][:, 1:] = mat_s[:, 2:weeks + 2] * vc * VALOR_RAW_MAT
+    cols['cost_semi'][:, 1:] = semi_s[:, 2:weeks + 2] * vc * (VALOR_SEMI - VALOR_RAW_MAT)
+    cols['cost_fp'][:, 1:] = fp_s[:, 2:weeks + 2] * vc * (VALOR_FINISHED - VALOR_SEMI)
+
+    return BatchResult(weeks, cols, smart_mode,
+                       dict(zip(PIPES, (mat_s, semi_s, fp_s, dist_sa, dist_sb))),
+                       dict(zip(PIPES, (l_mat, l_semi, l_fp, l_dist, l_dist))))
+
+
+class BatchResult:
+    """Output of run_simulation_batch: one (n_scenarios, weeks+1) array per metric."""
+
+    def __init__(self, weeks, cols, smart_mode, schedules, pipe_lens):
+        self.weeks = weeks
+        self.cols = cols
+        self.smart_mode = smart_mode
+        self.schedules = schedules
+        self.pipe_lens = pipe_lens
+        self._memo = {}
+
+    def __len__(self):
+        return self.cols['demand'].shape[0]
+
+    def __getitem__(self, key):
+        return self.cols[key]
+
+    def rounded(self, name):
+        """Column rounded the way run_simulation reports it (memoized).
+
+        Weeks 1..N go through round1 (Python's round(v, 1)) or to whole units;
+        week 0, the initial state, is reported as given.
+        """
+        key = ('rounded', name)
+        if key not in self._memo:
+            col = self.cols[name]
+            out = col.copy()
+            out[:, 1:] = np.round(col[:, 1:]) if name in ROUND0_COLUMNS else round1(col[:, 1:])
+            self._memo[key] = out
+        return self._memo[key]
+
+    def pipe_totals(self, name, week):
+        """Units in transit in a pipe after `week`, one value per scenario."""
+        cum = np.cumsum(self.schedules[name], axis=1)
+        lens = self.pipe_lens[name]
+        rows = np.arange(len(self))
+        return cum[rows, week + lens] - cum[rows, week]
+
+    def states(self, i):
+        """SimResult for scenario i, identical to run_simulation's output."""
+        cols = {k: self.rounded(k)[i] for k in COLUMNS}
+        cols['week'] = np.arange(self.weeks + 1)
+        cols['coverage'] = self.cols['coverage'][i].astype(int)
+        # Schedule column t holds arrivals at week t, so the pipe after
+        # week w is the next L columns starting at w+1
+        pipes = {k: sliding_window_view(self.schedules[k][i, 1:], int(self.pipe_lens[k][i]))[:self.weeks + 1]
+                 for k in PIPES}
+        return SimResult(cols, pipes, self.smart_mode[i])
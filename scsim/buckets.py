@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+from .engine import FlowState, TwoStores, _demand_stream
+from .pipes import Pipe
+from .result import COLUMNS, SimResult, round_reported
+
+# ════════════════════════════════════════════════════════════════
+# TIME-BUCKET ENGINE — run_simulation with each week split into
+# `buckets_per_week` steps (7 = daily, 1 = the weekly engine)
+# ════════════════════════════════════════════════════════════════
+
+# Stock levels: a week reports its last bucket; every other column is a flow
+# and a week reports the sum of its buckets
+LEVEL_COLUMNS = ('forecast', 'store_a', 'store_b', 'store_stock', 'raw_mat_before_prod',
+                 'raw_mat_stock', 'semi_stock', 'cw_stock', 'pending', 'backlog', 'wip_total')
+COST_COLUMNS = ('cost_mat', 'cost_semi', 'cost_fp')
+CAP_COLUMNS = ('supplier_cap', 'semi_cap', 'fp_cap')
+
+
+def _cum_split(qty, cum_weights):
+    """Whole units per bucket: bucket k gets round(qty x cum_k) - round(qty x cum_k-1)."""
+    out = []
+    prev = 0
+    for cw in cum_weights:
+        edge = round(qty * cw)
+        out.append(edge - prev)
+        prev = edge
+    return out
+
+
+def run_bucketed_simulation(weeks, init_store, init_cw, init_semi, init_rawmat,
+                            order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                            cap_start, cap_ramp, base_forecast,
+                            demand_mult, ramp_start, ramp_end,
+                            price, var_cost, fixed_pct, store_a_pct, smart_distrib,
+                            custom_demand=None, buckets_per_week=7, order_bucket=None,
+                            bucket_weights=None):
+    """run_simulation on sub-weekly time buckets.
+
+    Parameters keep their weekly meaning. Lead times are in weeks and may be
+    fractional (dist_lt=2/7 is two days). Weekly demand is spread over the
+    buckets by `bucket_weights` (equal by default). Weekly capacity is spread
+    so that each week's buckets add up to the weekly whole units. Ramps still
+    step once a week. The planner reviews in `order_bucket` of every
+    order_freq-th week; the default is the last bucket, i.e. Friday evening
+    on a 5-day week. With buckets_per_week=1, weekly() reproduces
+    run_simulation exactly.
+    """
+    bpw = max(1, int(buckets_per_week))
+    order_bucket = bpw - 1 if order_bucket is None else int(order_bucket)
+    if not 0 <= order_bucket < bpw:
+        raise ValueError(f"order_bucket must be in 0..{bpw - 1}")
+    wts = np.ones(bpw) if bucket_weights is None else np.asarray(bucket_weights, dtype=float)
+    if wts.shape != (bpw,) or (wts < 0).any() or wts.sum() <= 0:
+        raise ValueError(f"bucket_weights needs {bpw} non-negative weights with a positive sum")
+    cum_w = (np.cumsum(wts) / wts.sum()).tolist()
+    cum_w[-1] = 1.0
+    cap_edges = [k / bpw for k in range(1, bpw + 1)]
+
+    phys_lt = mat_lt + semi_lt + fp_lt + dist_lt
+    coverage = phys_lt + order_freq
+    lead = {k: max(1, round(lt * bpw)) for k, lt in
+            (('mat', mat_lt), ('semi', semi_lt), ('fp', fp_lt), ('dist', dist_lt))}
+
+    demand = _demand_stream(base_forecast, demand_mult, ramp_start, ramp_end,
+                            custom_demand, repeat_last=True)
+    next(demand, None)  # week 0 is the initial state
+
+    # Initial store stock: ALWAYS 50/50 (push reality — planner hasn't reviewed yet)
+    stores = TwoStores(float(init_store) / 2.0, float(init_store) / 2.0,
+                       Pipe(lead['dist']), Pipe(lead['dist']), store_a_pct / 100.0)
+    flow = FlowState(stores, Pipe(lead['mat']), Pipe(lead['semi']), Pipe(lead['fp']),
+                     init_rawmat, init_semi, init_cw, base_forecast, smart_distrib,
+                     cap_start, cap_ramp, coverage)
+
+    steps = weeks * bpw
+    c = {k: [0.0] * (steps + 1) for k in COLUMNS}
+    c['forecast'][0] = base_forecast
+    c['store_a'][0] = stores.store_a; c['store_b'][0] = stores.store_b
+    c['store_stock'][0] = stores.store_a + stores.store_b
+    c['supplier_cap'][0] = cap_start; c['semi_cap'][0] = cap_start; c['fp_cap'][0] = cap_start
+    c['raw_mat_before_prod'][0] = flow.raw_mat; c['raw_mat_stock'][0] = flow.raw_mat
+    c['semi_stock'][0] = flow.semi; c['cw_stock'][0] = flow.cw
+    smart_mode = [False] * (steps + 1)
+    # Weekly capacities, for weekly()
+    week_caps = {k: [cap_start] * (weeks + 1) for k in CAP_COLUMNS}
+
+    t = 0
+    for w in range(1, weeks + 1):
+        week_dem = next(demand)
+        bucket_dem = _cum_split(week_dem, cum_w)
+        review = order_freq <= 1 or w % order_freq == 0
+        # Weekly capacities, split into whole units per bucket; the ramp
+        # counters move once per week
+        caps = flow.capacities()
+        for k, cap in zip(CAP_COLUMNS, caps):
+            week_caps[k][w] = cap
+        pc_b, sc_b, fpc_b = (_cum_split(math.ceil(cap), cap_edges) for cap in caps)
+
+        for d in range(bpw):
+            t += 1
+            # The planner reviews in order_bucket, at the weekly rate of the
+            # current demand curve
+            planning = review and d == order_bucket
+            flow.step(c, t, w, bucket_dem[d], week_dem if planning else None,
+                      pc_b[d], sc_b[d], fpc_b[d])
+            smart_mode[t] = flow.smart
+            # Costs booked one bucket ahead
+            c['cost_mat'][t] = flow.mat_pipe.front * var_cost * VALOR_RAW_MAT
+            c['cost_semi'][t] = flow.semi_pipe.front * var_cost * (VALOR_SEMI - VALOR_RAW_MAT)
+            c['cost_fp'][t] = flow.fp_pipe.front * var_cost * (VALOR_FINISHED - VALOR_SEMI)
+        flow.end_week(w)
+
+    # Levels and costs are reported rounded per bucket; flows stay exact so
+    # that weekly() sums them before rounding
+    cols = {k: np.asarray(v, dtype=float) for k, v in c.items()}
+    cols.update(round_reported({k: c[k] for k in LEVEL_COLUMNS + COST_COLUMNS}, first=1))
+    week_caps = {k: np.asarray(v, dtype=float) for k, v in week_caps.items()}
+    return BucketResult(weeks, bpw, cols, np.asarray(smart_mode, dtype=bool), lead, coverage,
+                        week_caps)
+
+
+class BucketResult:
+    """Per-bucket columns (index = bucket, 0 = initial state) of a bucketed run."""
+
+    def __init__(self, weeks, buckets_per_week, cols, smart_mode, lead_buckets, coverage,
+                 week_caps):
+        self.weeks = weeks
+        self.buckets_per_week = buckets_per_week
+        self.cols = cols
+        self.smart_mode = smart_mode
+        self.lead_buckets = lead_buckets
+        self.coverage = coverage
+        # Capacity of each week (index = week); a bucket's cap is its whole-unit share
+        self.week_caps = week_caps
+
+    def __len__(self):
+        return len(self.smart_mode)
+
+    def __getitem__(self, name):
+        return self.cols[name]
+
+    def weekly(self):
+        """Weekly SimResult for compute_kpis, the charts and make_sc_html.
+
+        Flows are summed over each week's buckets, levels taken at its last
+        bucket; the capacities are the weekly ones. The pipes hold the pushes
+        of the last L weeks, with the lead time rounded up to whole weeks,
+        which is exact when it is one.
+        """
+        bpw = self.buckets_per_week
+        out = {}
+        for k, v in self.cols.items():
+            by_week = v[1:].reshape(self.weeks, bpw)
+            agg = by_week[:, -1] if k in LEVEL_COLUMNS else by_week.sum(axis=1)
+            out[k] = np.concatenate([v[:1], agg])
+        out.update(self.week_caps)
+        out = round_reported(out, first=1)
+        out['week'] = np.arange(self.weeks + 1)
+        out['coverage'] = np.full(self.weeks + 1, self.coverage)
+        smart = np.concatenate([self.smart_mode[:1], self.smart_mode[bpw::bpw]])
+        lt = {k: -(-v // bpw) for k, v in self.lead_buckets.items()}
+        return SimResult.from_pushes(
+            out, smart,
+            {'mat_pipe': (out['supplier_shipped'], lt['mat']),
+             'semi_pipe': (out['semi_input'], lt['semi']),
+             'fp_pipe': (out['fp_input'], lt['fp']),
+             'dist_pipe_a': (out['alloc_a'], lt['dist']),
+             'dist_pipe_b': (out['alloc_b'], lt['dist'])})
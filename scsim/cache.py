@@ -0,0 +1,239 @@
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .batch import _batch_demand
+from .result import SimResult
+from .sweep import SIM_ARGS
+
+# Bump when engine output changes so stale entries stop matching
+CACHE_VERSION = 2
+DEMAND_ARGS = ('base_forecast', 'demand_mult', 'ramp_start', 'ramp_end')
+# Lookups are plain reads; their LRU touches and hit / miss counts are written
+# in one batch every FLUSH_EVERY lookups or FLUSH_SECONDS, and with every put
+FLUSH_EVERY = 64
+FLUSH_SECONDS = 5.0
+
+
+def _plain(v):
+    """JSON-ready scalar; integral floats become ints so 1.0 and 1 hash alike."""
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    v = v.item() if isinstance(v, np.generic) else v
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def normalize_params(params):
+    """Canonical form of run_simulation arguments.
+
+    The demand is resolved to the per-week vector the engine would use, so a
+    custom vector and a ramp giving the same weeks share a key, and ramp
+    settings that a custom vector overrides do not split it. Arguments that
+    are absent (e.g. the economic ones for simulate_flows) are left out.
+    """
+    weeks = int(params['weeks'])
+    demand = _batch_demand(weeks, 1, params['base_forecast'], params['demand_mult'],
+                           params['ramp_start'], params['ramp_end'],
+                           params.get('custom_demand'))[0]
+    out = {k: _plain(params[k]) for k in SIM_ARGS if k in params and k not in DEMAND_ARGS[1:]}
+    out['weeks'] = weeks
+    out['demand'] = [int(d) for d in demand[1:weeks + 1]]
+    return out
+
+
+def params_key(params):
+    """sha256 of the normalized parameters (hex)."""
+    blob = json.dumps({'v': CACHE_VERSION, 'p': normalize_params(params)},
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def pack(result):
+    """SimResult -> compact bytes: a JSON header, then one zlib-compressed float64 block.
+
+    Columns, pipe push series (see SimResult.__getstate__) and the smart-mode
+    flags are laid end to end; the header records names and lengths.
+    """
+    state = result.__getstate__()
+    names = list(state['cols'])
+    pipes = [(k, len(series), n) for k, (series, n) in state['pipes'].items()]
+    header = json.dumps({'cols': names, 'pipes': pipes}).encode()
+    data = np.concatenate([np.asarray(state['cols'][k], dtype=float).ravel() for k in names]
+                          + [np.asarray(s, dtype=float).ravel() for s, _ in state['pipes'].values()]
+                          + [np.asarray(state['smart_mode'], dtype=float)])
+    return len(header).to_bytes(4, 'little') + header + zlib.compress(data.tobytes())
+
+
+def unpack(blob):
+    size = int.from_bytes(blob[:4], 'little')
+    header = json.loads(blob[4:4 + size])
+    data = np.frombuffer(zlib.decompress(blob[4 + size:]), dtype=float)
+    names = header['cols']
+    rows = (len(data) - sum(n for _, n, _ in header['pipes'])) // (len(names) + 1)
+    cols = {k: data[i * rows:(i + 1) * rows] for i, k in enumerate(names)}
+    for k in ('week', 'coverage'):
+        if k in cols:
+            cols[k] = cols[k].astype(int)
+    pos = len(names) * rows
+    pipes = {}
+    for k, n, window in header['pipes']:
+        pipes[k] = (data[pos:pos + n], window)
+        pos += n
+    state = {'cols': cols, 'pipes': pipes, 'smart_mode': data[pos:pos + rows].astype(bool)}
+    result = SimResult.__new__(SimResult)
+    result.__setstate__(state)
+    return result
+
+
+class DiskCache:
+    """Content-addressed simulation cache in one SQLite file.
+
+    Results are stored as compressed blobs (see pack) under the hash of their
+    normalized parameters. When the blobs exceed `max_bytes`, the least
+    recently used entries are evicted. SQLite's locking makes the cache safe
+    to share between threads, worker processes and app replicas on one
+    filesystem. Hit, miss and eviction counts persist in the file.
+
+    get() only reads, so lookups run concurrently under WAL; the access
+    times it records (and its counters) reach the file in batches, which
+    makes the LRU order approximate between flushes.
+    """
+
+    def __init__(self, path, max_bytes=256 * 2**20, timeout=30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}                      # key -> last lookup time, not yet written
+        self._pending = collections.Counter()   # counter -> increments not yet written
+        self._flushed_at = time.monotonic()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = self._connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, "
+                       "data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            db.executemany("INSERT OR IGNORE INTO stats VALUES (?, 0)",
+                           [('hits',), ('misses',), ('evictions',), ('writes',)])
+
+    def _connect(self):
+        """This thread's connection (SQLite connections must not be shared)."""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            # WAL stays consistent without an fsync per commit
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Write transaction, taking the lock up front so readers never upgrade."""
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _bump(db, name, n=1):
+        db.execute("UPDATE stats SET value = value + ? WHERE name = ?", (n, name))
+
+    def get(self, key):
+        """Cached SimResult for `key`, or None."""
+        row = self._connect().execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self._pending['misses'] += 1
+            else:
+                self._pending['hits'] += 1
+                self._touched[key] = time.time()
+            due = (sum(self._pending.values()) >= FLUSH_EVERY
+                   or time.monotonic() - self._flushed_at >= FLUSH_SECONDS)
+        if due:
+            self.flush()
+        return None if row is None else unpack(row[0])
+
+    def flush(self):
+        """Write the access times and counters recorded since the last flush."""
+        with self._transaction() as db:
+            self._write_pending(db)
+
+    def _write_pending(self, db):
+        with self._lock:
+            touched, pending = self._touched, self._pending
+            self._touched, self._pending = {}, collections.Counter()
+            self._flushed_at = time.monotonic()
+        db.executemany("UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+                       [(t, key) for key, t in touched.items()])
+        for name, n in pending.items():
+            self._bump(db, name, n)
+
+    def put(self, key, result):
+        blob = pack(result)
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                       (key, blob, len(blob), time.time()))
+            self._bump(db, 'writes')
+            # Recent lookups count before anything is evicted
+            self._write_pending(db)
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self._bump(db, 'evictions', len(doomed))
+
+    def run(self, fn, **params):
+        """fn(**params) through the cache (run_simulation, simulate_flows or a drop-in)."""
+        key = params_key(params)
+        result = self.get(key)
+        if result is None:
+            result = fn(**params)
+            self.put(key, result)
+        return result
+
+    def stats(self):
+        """Counters plus current entries and stored bytes."""
+        self.flush()
+        db = self._connect()
+        out = dict(db.execute("SELECT name, value FROM stats"))
+        out['entries'], out['bytes'] = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = out['hits'] + out['misses']
+        out['hit_rate'] = out['hits'] / lookups if lookups else 0.0
+        return out
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._touched, self._pending = {}, collections.Counter()
+        with self._transaction() as db:
+            db.execute("DELETE FROM entries")
+            db.execute("UPDATE stats SET value = 0")
+        self._connect().execute("VACUUM")
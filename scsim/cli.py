@@ -0,0 +1,269 @@
+"""Batch scenario runs from the command line.
+
+    python -m scsim scenarios.json -o results.jsonl
+    python -m scsim scenarios.jsonl -o results.parquet --trace --workers 8
+
+The input is a JSON list of scenarios, a JSON object {"defaults": {...},
+"scenarios": [...]}, or JSON lines (one scenario per line, "-" for stdin).
+A scenario takes the keys of the app's params dict; missing ones come from
+the app's defaults. Initial stock may be given as all four init_* or as
+total_stock with store_pct / wh_pct / semi_pct. The demand is either custom_demand
+(index = week, as in the app) or "demand": a shape name ("flat"), a shape
+with options ({"shape": "ramp", "end": 300, "over": 5}), a demand file
+({"file": "history.csv", "store": "S01", "start": 53}, see scsim.ingest) or
+a list of weekly values for weeks 1..N. Each output row holds the scenario name, its resolved
+parameters and its KPIs, plus its weekly columns with --trace.
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import numbers
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .constants import BASE_FORECAST
+from .demand import demand_vector
+from .engine import run_simulation
+from .ingest import load_demand
+from .kpis import compute_kpis
+from .sweep import SIM_ARGS, split_stock
+
+# The sidebar's starting values
+DEFAULTS = {
+    'weeks': 26, 'mat_lt': 6, 'semi_lt': 3, 'fp_lt': 1, 'dist_lt': 1, 'order_freq': 4,
+    'total_stock': 1500, 'store_pct': 60, 'wh_pct': 20, 'semi_pct': 10,
+    'cap_start': 100, 'cap_ramp': 0.2, 'base_forecast': BASE_FORECAST,
+    'demand_mult': 1.0, 'ramp_start': 1, 'ramp_end': 1,
+    'price': 1000, 'var_cost': 200, 'fixed_pct': 0.45,
+    'store_a_pct': 50, 'smart_distrib': False,
+}
+INIT_KEYS = ('init_store', 'init_cw', 'init_semi', 'init_rawmat')
+# Whole numbers (weeks, pipe lengths, review period); every other parameter is
+# a number, except the smart_distrib flag
+INT_ARGS = ('weeks', 'order_freq', 'mat_lt', 'semi_lt', 'fp_lt', 'dist_lt', 'ramp_start', 'ramp_end')
+
+
+def _number(key, v, integer=False):
+    """v checked to be a finite number (a whole one if `integer`); ValueError otherwise."""
+    if isinstance(v, bool) or not isinstance(v, numbers.Real) or not math.isfinite(v):
+        raise ValueError(f"{key} must be a number, got {v!r}")
+    if integer:
+        if v != int(v):
+            raise ValueError(f"{key} must be a whole number, got {v!r}")
+        return int(v)
+    return v
+
+
+def _checked(p):
+    """Scenario values type-checked, so a bad one fails here and not in a worker."""
+    out = {}
+    for k, v in p.items():
+        if k == 'smart_distrib':
+            if v not in (True, False):
+                raise ValueError(f"smart_distrib must be true or false, got {v!r}")
+            out[k] = bool(v)
+        elif k in ('demand', 'custom_demand'):
+            out[k] = v
+        else:
+            out[k] = _number(k, v, k in INT_ARGS)
+    if out['weeks'] < 1:
+        raise ValueError(f"weeks must be at least 1, got {out['weeks']}")
+    return out
+
+
+def resolve(spec, defaults=None):
+    """run_simulation arguments for one scenario spec (see the module docstring).
+
+    Raises ValueError for an unknown key or a value of the wrong type.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"a scenario must be a JSON object, got {spec!r}")
+    spec = dict(spec)
+    spec.pop('name', None)
+    known = set(DEFAULTS) | set(SIM_ARGS) | {'custom_demand', 'demand'}
+    unknown = set(spec) - known
+    if unknown:
+        raise ValueError(f"unknown scenario keys {sorted(unknown)}")
+    given = {**(defaults or {}), **spec}
+    p = _checked({**DEFAULTS, **given})
+    init = [k for k in INIT_KEYS if k in given]
+    if init and len(init) < len(INIT_KEYS):
+        missing = [k for k in INIT_KEYS if k not in given]
+        raise ValueError(f"initial stock needs all of init_* or none (then total_stock is split); "
+                         f"missing {missing}")
+    if not init:
+        split = split_stock(p['total_stock'], p['store_pct'], p['wh_pct'], p['semi_pct'])
+        p.update({k: int(v) for k, v in zip(INIT_KEYS, split)})
+    demand = p.pop('demand', None)
+    if demand is not None:
+        if isinstance(demand, str):
+            demand = {'shape': demand}
+        if isinstance(demand, dict) and 'file' in demand:
+            opts = dict(demand)
+            with open(opts.pop('file'), 'rb') as f:
+                history = load_demand(f.read())
+            p['custom_demand'] = history.window(weeks=int(p['weeks']), **opts).tolist()
+        elif isinstance(demand, dict):
+            opts = dict(demand)
+            p['custom_demand'] = demand_vector(opts.pop('shape'), int(p['weeks']), p['base_forecast'],
+                                               **opts).tolist()
+        elif isinstance(demand, list):
+            p['custom_demand'] = [0] + demand
+        else:
+            raise ValueError(f"demand must be a shape, a demand file or a list, got {demand!r}")
+    out = {'weeks': p['weeks'], **{k: p[k] for k in SIM_ARGS}}
+    cd = p.get('custom_demand')
+    if cd is not None and not isinstance(cd, (list, tuple)):
+        raise ValueError(f"custom_demand must be a list of weekly values, got {cd!r}")
+    # Whole units, as the engine reads them
+    out['custom_demand'] = [int(_number('demand', d)) for d in cd] if cd is not None else None
+    return out
+
+
+def load_scenarios(path):
+    """[(name, params)] from a JSON / JSON-lines file, or stdin for '-'."""
+    text = sys.stdin.read() if path == '-' else open(path).read()
+    try:
+        doc = json.loads(text)
+    except json.JSONDecodeError:
+        doc = [json.loads(line) for line in text.splitlines() if line.strip()]
+    defaults = {}
+    if isinstance(doc, dict):
+        defaults, doc = (doc.get('defaults', {}), doc['scenarios']) if 'scenarios' in doc else ({}, [doc])
+    out = []
+    if not isinstance(defaults, dict) or not isinstance(doc, list):
+        raise ValueError("expected a list of scenarios or {\"defaults\": {...}, \"scenarios\": [...]}")
+    for i, spec in enumerate(doc):
+        name = spec.get('name', i) if isinstance(spec, dict) else i
+        try:
+            out.append((str(name), resolve(spec, defaults)))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"scenario {name!r}: {e}") from None
+    return out
+
+
+def _plain(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def run_one(task):
+    """Worker: one scenario -> output row (KPIs, and the weekly columns if trace)."""
+    name, params, trace = task
+    states = run_simulation(**params)
+    kpis = compute_kpis(states[1:], params['price'], params['var_cost'], params['fixed_pct'],
+                        params['base_forecast'], params['weeks'], params['init_store'],
+                        params['init_cw'], params['init_semi'], params['init_rawmat'])
+    row = {'name': name, **params}
+    # The 'var_cost' KPI (total variable cost) would shadow the unit cost, as in run_sweep
+    row.update({'var_cost_total' if k == 'var_cost' else k: _plain(v) for k, v in kpis.items()})
+    if trace:
+        row['trace'] = {k: v.tolist() for k, v in states.cols.items()}
+    return row
+
+
+def run_scenarios(scenarios, trace=False, workers=None):
+    """Output rows in input order, yielded as soon as each one is ready."""
+    tasks = [(name, params, trace) for name, params in scenarios]
+    workers = min(workers or os.cpu_count() or 1, len(tasks) or 1)
+    if workers == 1:
+        yield from map(run_one, tasks)
+        return
+    # spawn: same reasoning as run_sweep
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        yield from ex.map(run_one, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+
+
+def write_jsonl(rows, f):
+    n = 0
+    for row in rows:
+        f.write(json.dumps(row, separators=(',', ':')) + '\n')
+        f.flush()
+        n += 1
+    return n
+
+
+def _arrow_type(pa, key):
+    """Column type of an output row key, fixed by the key alone so every row group agrees."""
+    if key == 'name':
+        return pa.string()
+    if key == 'custom_demand' or key in ('trace.week', 'trace.coverage'):
+        return pa.list_(pa.int64())
+    if key.startswith('trace.'):
+        return pa.list_(pa.float64())
+    if key in INT_ARGS or key == 'stockout_weeks':
+        return pa.int64()
+    if key == 'smart_distrib':
+        return pa.bool_()
+    return pa.float64()
+
+
+def write_parquet(rows, path, batch_rows=256):
+    """Rows to Parquet in row groups of `batch_rows`; trace columns become 'trace.<name>' lists.
+
+    The schema comes from the column names (see _arrow_type), not from the
+    first rows' values, so e.g. custom_demand may be null in one row group
+    and a list in the next.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)") from None
+    writer = None
+    n = 0
+    rows = iter(rows)
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_rows))
+            if not batch:
+                break
+            for row in batch:
+                for k, v in row.pop('trace', {}).items():
+                    row[f'trace.{k}'] = v
+            if writer is None:
+                schema = pa.schema([(k, _arrow_type(pa, k)) for k in batch[0]])
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pylist(batch, schema=writer.schema))
+            n += len(batch)
+    finally:
+        # Whatever was written stays a readable file
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m scsim', description=__doc__.splitlines()[0])
+    ap.add_argument('scenarios', help="JSON or JSON-lines scenario file ('-' for stdin)")
+    ap.add_argument('-o', '--out', default='-', help="output file, .jsonl or .parquet ('-' for stdout)")
+    ap.add_argument('--format', choices=('jsonl', 'parquet'),
+                    help='output format (default: from the --out extension, else jsonl)')
+    ap.add_argument('--trace', action='store_true', help='include every weekly column')
+    ap.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    args = ap.parse_args(argv)
+
+    try:
+        scenarios = load_scenarios(args.scenarios)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    fmt = args.format or ('parquet' if args.out.endswith('.parquet') else 'jsonl')
+    rows = run_scenarios(scenarios, args.trace, args.workers)
+    if fmt == 'parquet':
+        if args.out == '-':
+            print("error: Parquet output needs a file (-o results.parquet)", file=sys.stderr)
+            return 2
+        n = write_parquet(rows, args.out)
+    elif args.out == '-':
+        n = write_jsonl(rows, sys.stdout)
+    else:
+        with open(args.out, 'w') as f:
+            n = write_jsonl(rows, f)
+    print(f"{n} scenario(s) -> {args.out}", file=sys.stderr)
+    return 0
@@ -0,0 +1,18 @@
+BASE_FORECAST = 100  # Fixed (point 3)
+
+# ════════════════════════════════════════════════════════════════
+# PRESET SCENARIOS (3 Lead Time × 3 Demand)
+# ════════════════════════════════════════════════════════════════
+LT_PROFILES = {
+    "Agile": {"mat_lt": 4, "semi_lt": 2, "fp_lt": 1, "dist_lt": 1, "order_freq": 1},
+    "Medium": {"mat_lt": 8, "semi_lt": 4, "fp_lt": 2, "dist_lt": 2, "order_freq": 2},
+    "Push":   {"mat_lt": 12, "semi_lt": 6, "fp_lt": 3, "dist_lt": 3, "order_freq": 4},
+}
+
+
+# ════════════════════════════════════════════════════════════════
+# VALORIZATION CONSTANTS
+# ════════════════════════════════════════════════════════════════
+VALOR_RAW_MAT = 0.50
+VALOR_SEMI    = 0.75
+VALOR_FINISHED = 1.00
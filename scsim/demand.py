@@ -0,0 +1,101 @@
+import functools
+import math
+
+import numpy as np
+
+# ════════════════════════════════════════════════════════════════
+# DEMAND PROFILES — the sidebar's demand shapes as NumPy vectors
+# ════════════════════════════════════════════════════════════════
+
+# Seasonal profiles: (peak position as a share of the horizon, gamma shape k).
+# Very steep: early peak (W3 of 26, ~4x avg), fast decay; steep: peak W6 (~2x
+# avg); flat: peak W6 but a wide shape, a gentle dome
+SEASONAL = {'very_steep': (3.0 / 26.0, 2.5), 'steep': (6.0 / 26.0, 3.0), 'flat': (6.0 / 26.0, 1.8)}
+SHAPES = ('flat', 'ramp', 'drop', 'seasonal', 'step', 'pulse')
+
+
+def _shape_defaults(shape, weeks, base_forecast):
+    """Options of a shape when not given, as the sidebar initializes its sliders."""
+    return {
+        'flat': {},
+        'ramp': {'end': min(base_forecast * 3, 1000), 'over': min(weeks // 3, 8)},
+        'drop': {'end': max(0, base_forecast // 3), 'over': 1},
+        'seasonal': {'avg': 100, 'profile': 'steep'},
+        'step': {'at': weeks // 2 + 1, 'end': base_forecast * 2},
+        'pulse': {'start': weeks // 2 + 1, 'length': 2, 'mult': 2.0},
+    }[shape]
+
+
+@functools.lru_cache(maxsize=64)
+def gamma_weights(weeks, profile):
+    """Gamma pdf of a seasonal profile at weeks 1..N (not normalized)."""
+    ratio, k = SEASONAL[profile]
+    theta = (ratio * weeks) / max(k - 1, 0.1)
+    w = np.arange(1, weeks + 1)
+    out = (w ** (k - 1)) * np.exp(-w / theta) / ((theta ** k) * math.gamma(k))
+    out.flags.writeable = False
+    return out
+
+
+@functools.lru_cache(maxsize=256)
+def _curve(shape, weeks, base_forecast, opts):
+    if shape not in SHAPES:
+        raise ValueError(f"unknown demand shape {shape!r}; expected one of {', '.join(SHAPES)}")
+    o = _shape_defaults(shape, weeks, base_forecast)
+    unknown = set(dict(opts)) - set(o)
+    if unknown:
+        raise ValueError(f"unknown {shape} options {sorted(unknown)}; expected {sorted(o)}")
+    o.update(opts)
+    w = np.arange(1, weeks + 1)
+    bf = base_forecast
+    if shape == 'flat':
+        out = np.full(weeks, bf, dtype=float)
+    elif shape in ('ramp', 'drop'):
+        # bf -> end in `over` weeks, then flat
+        end, over = o['end'], max(int(o['over']), 1)
+        out = np.where(w <= over, bf + (end - bf) * w / over, end).astype(float)
+    elif shape == 'seasonal':
+        # Gamma curve scaled so the horizon totals avg x weeks
+        pdf = gamma_weights(weeks, o['profile'])
+        total = o['avg'] * weeks
+        pdf_sum = pdf.sum()
+        out = pdf * (total / pdf_sum) if pdf_sum > 0 and total > 0 else np.zeros(weeks)
+    elif shape == 'step':
+        out = np.where(w < o['at'], bf, o['end']).astype(float)
+    else:  # pulse
+        # bf, times `mult` for `length` weeks from `start` (a promotion)
+        hot = (w >= o['start']) & (w < o['start'] + o['length'])
+        out = np.where(hot, bf * o['mult'], bf).astype(float)
+    out.flags.writeable = False
+    return out
+
+
+def demand_curve(shape, weeks, base_forecast, **opts):
+    """Unrounded demand of weeks 1..N for a shape (memoized, read-only).
+
+    flat; ramp / drop (end, over: base_forecast -> end in `over` weeks, then
+    flat); seasonal (avg, profile: very_steep / steep / flat); step (at, end:
+    end from week `at` on); pulse (start, length, mult: base_forecast x mult
+    for `length` weeks). Missing options take the sidebar's defaults.
+    """
+    return _curve(shape, int(weeks), base_forecast, tuple(sorted(opts.items())))
+
+
+@functools.lru_cache(maxsize=256)
+def _vector(shape, weeks, base_forecast, opts):
+    out = np.zeros(weeks + 1, dtype=int)
+    out[1:] = np.maximum(0, np.rint(_curve(shape, weeks, base_forecast, opts)))
+    out.flags.writeable = False
+    return out
+
+
+def demand_vector(shape, weeks, base_forecast, **opts):
+    """Whole-unit demand vector (index = week, week 0 = 0) for a shape (memoized, read-only)."""
+    return _vector(shape, int(weeks), base_forecast, tuple(sorted(opts.items())))
+
+
+def demand_over(shape, weeks, n, base_forecast, **opts):
+    """Units the unrounded curve asks for over weeks 1..n, rounded (the stock recommendation)."""
+    curve = demand_curve(shape, weeks, base_forecast, **opts)
+    # cumsum adds left to right, like summing the weeks one by one
+    return int(round(float(np.cumsum(curve)[n - 1]))) if n > 0 else 0
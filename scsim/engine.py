@@ -0,0 +1,531 @@
+import hashlib
+import itertools
+import math
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .pipes import Pipe
+from .result import FLOW_COLUMNS, PIPES, SimResult, round_reported
+from .valuation import valuate
+
+
+def _demand_stream(base_forecast, demand_mult, ramp_start, ramp_end, custom_demand, repeat_last):
+    """Demand for weeks 0, 1, 2, ... computed lazily.
+
+    custom_demand may be any iterable (a list, a file reader, ...); once it
+    runs out its last value repeats, or the stream ends if not repeat_last.
+    """
+    if custom_demand is not None:
+        last = None
+        for d in custom_demand:
+            last = int(d)
+            yield last
+        while repeat_last:
+            yield last
+        return
+    for w in itertools.count():
+        if w < ramp_start:
+            yield base_forecast
+        elif ramp_start == ramp_end:
+            yield round(base_forecast * demand_mult)
+        elif w <= ramp_end:
+            p = (w - ramp_start) / (ramp_end - ramp_start)
+            yield round(base_forecast + (base_forecast * demand_mult - base_forecast) * p)
+        else:
+            yield round(base_forecast * demand_mult)
+
+
+class EngineState(NamedTuple):
+    """Everything week `week`+1 depends on: the engine state after week `week`.
+
+    Plain floats, ints and tuples, so it is hashable; its size grows only
+    with the lead times (pipe contents, front first, in PIPES order).
+    """
+    week: int
+    store_a: float
+    store_b: float
+    raw_mat: float
+    semi: float
+    cw: float
+    pb: float
+    pn: int
+    sn: int
+    fn: int
+    co: float
+    cas: float
+    ff: float
+    smart_discovered: bool
+    first_order_week: Optional[int]
+    pipes: tuple
+
+    def digest(self):
+        """Stable sha256 hex of the state, for cache keys."""
+        return hashlib.sha256(repr(tuple(self)).encode()).hexdigest()
+
+
+# Arguments a resume_flows call may change relative to its previous run
+RESUME_ARGS = ('weeks', 'demand_mult', 'ramp_start', 'ramp_end', 'custom_demand')
+# Column pushed into each pipe every week
+PIPE_PUSHES = {'mat_pipe': 'supplier_shipped', 'semi_pipe': 'semi_input',
+               'fp_pipe': 'fp_input', 'dist_pipe_a': 'alloc_a', 'dist_pipe_b': 'alloc_b'}
+
+
+def exact_checkpoints(init_store, init_cw, init_semi, init_rawmat, base_forecast):
+    """Whether checkpoint() is exact for a run with these initial stocks and base forecast.
+
+    All must be whole units: the forecast before the first review is the
+    base forecast, which the 0.1-rounded forecast column does not hold
+    exactly otherwise.
+    """
+    return all(float(x).is_integer()
+               for x in (init_store, init_cw, init_semi, init_rawmat, base_forecast))
+
+
+def checkpoint(flows, week):
+    """EngineState after `week` of a run, rebuilt from its SimResult.
+
+    With whole-unit initial stocks and base forecast every state variable
+    is exact in the reported columns (stocks move in half units, orders and
+    shipments in whole ones), so nothing extra is stored per week. The
+    capacity counters follow from the week and the first order. Raises
+    ValueError for a run with fractional initial stocks or base forecast,
+    which the 0.1-rounded columns do not hold exactly.
+    """
+    # Week 0 holds the initial stocks and the base forecast as given (the
+    # store stock split 50/50)
+    if not exact_checkpoints(flows['store_stock'][0], flows['cw_stock'][0],
+                             flows['semi_stock'][0], flows['raw_mat_stock'][0],
+                             flows['forecast'][0]):
+        raise ValueError("checkpoint() needs a run with whole-unit initial stocks "
+                         "and base forecast")
+    col = lambda k: flows[k][:week + 1]
+    ordered = (col('order')[1:] > 0).nonzero()[0]
+    first = int(ordered[0]) + 1 if len(ordered) else None
+    return EngineState(
+        week=week, store_a=float(col('store_a')[-1]), store_b=float(col('store_b')[-1]),
+        raw_mat=float(col('raw_mat_stock')[-1]), semi=float(col('semi_stock')[-1]),
+        cw=float(col('cw_stock')[-1]), pb=float(col('backlog')[-1]),
+        pn=max(0, week - first) if first is not None else 0, sn=week, fn=week,
+        co=float(col('order')[1:].sum()), cas=float(col('dist_arr')[1:].sum()),
+        ff=float(col('forecast')[-1]), smart_discovered=bool(flows.smart_mode[week]),
+        first_order_week=first,
+        pipes=tuple(tuple(float(x) for x in flows[k][week]) for k in PIPES))
+
+
+class TwoStores:
+    """Stores A and B of run_simulation: stock, demand split and distribution pipes."""
+    __slots__ = ('store_a', 'store_b', 'pipe_a', 'pipe_b', 'pct_a', 'pct_b')
+
+    def __init__(self, store_a, store_b, pipe_a, pipe_b, pct_a):
+        self.store_a = store_a
+        self.store_b = store_b
+        self.pipe_a = pipe_a
+        self.pipe_b = pipe_b
+        self.pct_a = pct_a
+        self.pct_b = 1.0 - pct_a
+
+    def in_transit(self):
+        return self.pipe_a.total + self.pipe_b.total
+
+    def sell(self, c, i, dem_total):
+        """Take this step's arrivals and sell; (arrived, demand, sales, missed, stock)."""
+        da_arr = self.pipe_a.pop(); db_arr = self.pipe_b.pop()
+        dem_a = round(dem_total * self.pct_a)
+        dem_b = dem_total - dem_a
+
+        # 2. Store A — sell
+        avail_a = self.store_a + da_arr
+        sales_a = min(dem_a, avail_a)
+        missed_a = max(0, dem_a - sales_a)
+        store_a = self.store_a = avail_a - sales_a
+
+        # 3. Store B — sell
+        avail_b = self.store_b + db_arr
+        sales_b = min(dem_b, avail_b)
+        missed_b = max(0, dem_b - sales_b)
+        store_b = self.store_b = avail_b - sales_b
+
+        c['demand_a'][i] = dem_a; c['demand_b'][i] = dem_b
+        c['dist_arr_a'][i] = da_arr; c['dist_arr_b'][i] = db_arr
+        c['store_a'][i] = store_a; c['store_b'][i] = store_b
+        c['sales_a'][i] = sales_a; c['sales_b'][i] = sales_b
+        c['missed_a'][i] = missed_a; c['missed_b'][i] = missed_b
+        return (da_arr + db_arr, dem_total, sales_a + sales_b, missed_a + missed_b,
+                store_a + store_b)
+
+    def ship(self, c, i, ship_out, ff, smart):
+        """Allocate the CW shipment to the stores and push it into their pipes."""
+        # Allocate: Before first planning review = 50/50 (blind)
+        # After first review: equalize weeks-of-cover, then split by demand rate
+        pct_a = self.pct_a; pct_b = self.pct_b
+        if ship_out > 0:
+            if smart:
+                dem_a_wk = max(ff * pct_a, 0.01)
+                dem_b_wk = max(ff * pct_b, 0.01)
+                cover_a = (self.store_a + self.pipe_a.total) / dem_a_wk
+                cover_b = (self.store_b + self.pipe_b.total) / dem_b_wk
+                # Priority: fill the worst-covered store first to equalize
+                if cover_a < cover_b:
+                    gap = math.ceil(max(0, (cover_b - cover_a) * dem_a_wk))
+                    priority_a = min(ship_out, gap)
+                    remaining = ship_out - priority_a
+                    alloc_a = priority_a + round(remaining * pct_a)
+                    alloc_b = ship_out - alloc_a
+                elif cover_b < cover_a:
+                    gap = math.ceil(max(0, (cover_a - cover_b) * dem_b_wk))
+                    priority_b = min(ship_out, gap)
+                    remaining = ship_out - priority_b
+                    alloc_b = priority_b + round(remaining * pct_b)
+                    alloc_a = ship_out - alloc_b
+                else:
+                    alloc_a = round(ship_out * pct_a)
+                    alloc_b = ship_out - alloc_a
+            else:
+                # Push / not yet discovered: 50/50 blind
+                alloc_a = round(ship_out * 0.5)
+                alloc_b = ship_out - alloc_a
+        else:
+            alloc_a = 0; alloc_b = 0
+        c['alloc_a'][i] = alloc_a; c['alloc_b'][i] = alloc_b
+        self.pipe_a.push(alloc_a)
+        self.pipe_b.push(alloc_b)
+
+
+class FlowState:
+    """State of the chain between two time steps, advanced by step().
+
+    The week step shared by run_simulation, run_network_simulation and
+    run_bucketed_simulation. The engine picks the demand, the planning steps
+    and the capacities; `stores` (TwoStores, or network.StoreArray) sells and
+    allocates. step() writes the raw values of its time step into row i of
+    the columns; the engine rounds them for output.
+    """
+    __slots__ = ('stores', 'mat_pipe', 'semi_pipe', 'fp_pipe', 'raw_mat', 'semi', 'cw',
+                 'pb', 'pn', 'sn', 'fn', 'co', 'cas', 'ff', 'smart_distrib',
+                 'smart_discovered', 'first_order_week', 'cap_start', 'cap_ramp', 'coverage')
+
+    def __init__(self, stores, mat_pipe, semi_pipe, fp_pipe, init_rawmat, init_semi, init_cw,
+                 base_forecast, smart_distrib, cap_start, cap_ramp, coverage):
+        self.stores = stores
+        self.mat_pipe = mat_pipe
+        self.semi_pipe = semi_pipe
+        self.fp_pipe = fp_pipe
+        self.raw_mat = float(init_rawmat)
+        self.semi = float(init_semi)
+        self.cw = float(init_cw)
+        self.pb = 0.0  # supplier backlog
+        self.pn = 0; self.sn = 0; self.fn = 0  # capacity ramp counters
+        self.co = 0.0; self.cas = 0.0
+        self.ff = float(base_forecast)  # forecast: starts at base, updates at planning steps only
+        self.smart_distrib = smart_distrib
+        self.smart_discovered = False
+        self.first_order_week = None  # capacity ramp starts the week AFTER first order
+        self.cap_start = cap_start
+        self.cap_ramp = cap_ramp
+        self.coverage = coverage
+
+    @property
+    def smart(self):
+        return self.smart_distrib and self.smart_discovered
+
+    def capacities(self):
+        """This week's supplier, semi and FP capacity (each ramps up to 10x cap_start)."""
+        cap_start, cap_ramp = self.cap_start, self.cap_ramp
+        return (min(cap_start * (1 + self.pn * cap_ramp), cap_start * 10),
+                min(cap_start * (1 + self.sn * cap_ramp), cap_start * 10),
+                min(cap_start * (1 + self.fn * cap_ramp), cap_start * 10))
+
+    def end_week(self, w):
+        """Move the capacity ramps on after week w."""
+        # The supplier ramps from the week AFTER the first order
+        if self.first_order_week is not None and w > self.first_order_week:
+            self.pn += 1
+        self.sn += 1
+        self.fn += 1
+
+    def step(self, c, i, w, demand, forecast, pc, sc_, fpc):
+        """One time step of week w with these capacities; row i of the columns.
+
+        `forecast` is the demand rate seen at a planning step (periodic
+        review), which also places the order; None between reviews, when the
+        system is blind to demand changes.
+        """
+        stores = self.stores
+        if forecast is not None:
+            self.ff = float(forecast)  # update forecast to current demand curve
+            if self.smart_distrib and not self.smart_discovered:
+                self.smart_discovered = True  # planner discovers demand imbalance
+        ff = self.ff
+        c['forecast'][i] = ff
+
+        # 1. Arrivals from pipes — popping clears the fronts, these units
+        # have arrived and are no longer in transit
+        m_arr = self.mat_pipe.pop(); sm_arr = self.semi_pipe.pop(); fp_arr = self.fp_pipe.pop()
+        c['mat_arr'][i] = m_arr; c['semi_arr'][i] = sm_arr; c['fp_arr'][i] = fp_arr
+
+        # 2-3. Stores — sell
+        d_arr_total, dem_total, sales, missed, store_total = stores.sell(c, i, demand)
+        self.cas += d_arr_total
+        c['demand'][i] = dem_total; c['dist_arr'][i] = d_arr_total
+        c['sales'][i] = sales; c['missed'][i] = missed; c['store_stock'][i] = store_total
+
+        # 4. Supplier — ships the backlog up to its capacity
+        pb = self.pb
+        if pb > 0.01:
+            shipped = math.ceil(min(pb, pc)); pb -= shipped
+        else:
+            shipped = 0.0
+        c['supplier_shipped'][i] = shipped; c['supplier_cap'][i] = pc
+
+        # 5. Arrivals update stocks
+        raw_mat = self.raw_mat + m_arr; c['raw_mat_before_prod'][i] = raw_mat
+        semi = self.semi + sm_arr
+        cw = self.cw + fp_arr
+
+        # 5b. ORDER DECISION (before processing, so factory sees the order)
+        # WIP calculated from pre-processing state
+        first_order_week = self.first_order_week
+        if forecast is not None:
+            pre_wip = (self.mat_pipe.total + self.semi_pipe.total + self.fp_pipe.total
+                       + stores.in_transit() + raw_mat + semi + cw + pb)
+            od = math.ceil(max(0, ff * self.coverage - (store_total + pre_wip)))
+            self.co += od; pb += od; c['order'][i] = od
+            if od > 0 and first_order_week is None:
+                first_order_week = self.first_order_week = w
+
+        # 6. Semi — process RM into semi (capacity-limited)
+        # Only starts processing after first order has been placed
+        if raw_mat > 0.01 and first_order_week is not None:
+            si = math.ceil(min(raw_mat, sc_))
+            raw_mat -= si
+        else:
+            si = 0.0
+        c['semi_input'][i] = si; c['semi_cap'][i] = sc_
+        c['raw_mat_stock'][i] = raw_mat
+
+        # 7. FP — process semi into finished (capacity-limited)
+        # Only starts processing after first order has been placed
+        if semi > 0.01 and first_order_week is not None:
+            fi = math.ceil(min(semi, fpc))
+            semi -= fi
+        else:
+            fi = 0.0
+        c['fp_input'][i] = fi; c['fp_cap'][i] = fpc
+        c['semi_stock'][i] = semi
+
+        # 8. CW — push everything to stores, allocate per store
+        ship_out = math.ceil(cw) if cw > 0.01 else 0.0
+        cw -= ship_out
+        c['cw_shipped'][i] = ship_out; c['cw_stock'][i] = cw
+        stores.ship(c, i, ship_out, ff, self.smart)
+
+        # 9. Update pipes
+        self.mat_pipe.push(shipped)
+        self.semi_pipe.push(si)
+        self.fp_pipe.push(fi)
+
+        # 10. Post-processing WIP (for display)
+        total_wip = (self.mat_pipe.total + self.semi_pipe.total + self.fp_pipe.total
+                     + stores.in_transit() + raw_mat + semi + cw + pb)
+        c['wip_total'][i] = total_wip
+        c['pending'][i] = self.co - self.cas; c['backlog'][i] = pb
+        self.raw_mat = raw_mat; self.semi = semi; self.cw = cw; self.pb = pb
+
+
+def _new_chunk(start, size, coverage):
+    c = {k: [0.0] * size for k in FLOW_COLUMNS}
+    c['week'] = list(range(start, start + size))
+    c['coverage'] = [coverage] * size
+    return c, [False] * size
+
+
+# ════════════════════════════════════════════════════════════════
+# SIMULATION ENGINE — with stage-specific push logic (points 9, 10)
+# ════════════════════════════════════════════════════════════════
+def run_simulation(weeks, init_store, init_cw, init_semi, init_rawmat,
+                   order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                   cap_start, cap_ramp, base_forecast,
+                   demand_mult, ramp_start, ramp_end,
+                   price, var_cost, fixed_pct, store_a_pct, smart_distrib,
+                   custom_demand=None):
+    flows = simulate_flows(weeks, init_store, init_cw, init_semi, init_rawmat,
+                           order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                           cap_start, cap_ramp, base_forecast, demand_mult, ramp_start, ramp_end,
+                           store_a_pct, smart_distrib, custom_demand)
+    return valuate(flows, var_cost)
+
+
+def simulate_flows(weeks, init_store, init_cw, init_semi, init_rawmat,
+                   order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                   cap_start, cap_ramp, base_forecast,
+                   demand_mult, ramp_start, ramp_end,
+                   store_a_pct, smart_distrib, custom_demand=None):
+    """Physical flow of run_simulation: no price or cost argument, no cost columns.
+
+    Cache this and valuation.valuate() it, so economic what-ifs never
+    re-simulate.
+    """
+    return next(stream_flows(
+        weeks, init_store, init_cw, init_semi, init_rawmat,
+        order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+        cap_start, cap_ramp, base_forecast, demand_mult, ramp_start, ramp_end,
+        store_a_pct, smart_distrib, custom_demand, chunk_weeks=weeks + 1))
+
+
+def resume_flows(prev, weeks, init_store, init_cw, init_semi, init_rawmat,
+                 order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                 cap_start, cap_ramp, base_forecast,
+                 demand_mult, ramp_start, ramp_end,
+                 store_a_pct, smart_distrib, custom_demand=None):
+    """simulate_flows, reusing `prev` up to the first week whose demand differs.
+
+    `prev` must be a run with the same arguments except the demand (and
+    possibly the horizon). The engine resumes from checkpoint(prev, w - 1),
+    so editing week w of a long horizon only re-simulates weeks w onwards.
+    With fractional initial stocks or base forecast it simulates the whole
+    run instead (see checkpoint).
+    """
+    if not exact_checkpoints(init_store, init_cw, init_semi, init_rawmat, base_forecast):
+        return simulate_flows(weeks, init_store, init_cw, init_semi, init_rawmat,
+                              order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                              cap_start, cap_ramp, base_forecast, demand_mult, ramp_start, ramp_end,
+                              store_a_pct, smart_distrib, custom_demand)
+    demand = list(itertools.islice(_demand_stream(base_forecast, demand_mult, ramp_start,
+                                                  ramp_end, custom_demand, True), weeks + 1))
+    old = prev['demand']
+    n = min(len(old), weeks + 1)
+    diff = (np.asarray(demand[1:n]) != old[1:n]).nonzero()[0]
+    changed = int(diff[0]) + 1 if len(diff) else n
+    if changed == weeks + 1:
+        return prev[:weeks + 1]
+    tail = next(stream_flows(
+        weeks, init_store, init_cw, init_semi, init_rawmat,
+        order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+        cap_start, cap_ramp, base_forecast, demand_mult, ramp_start, ramp_end,
+        store_a_pct, smart_distrib, demand, chunk_weeks=weeks + 1,
+        resume=checkpoint(prev, changed - 1)))
+    cols = {k: np.concatenate([prev.cols[k][:changed], v]) for k, v in tail.cols.items()}
+    lts = (mat_lt, semi_lt, fp_lt, dist_lt, dist_lt)
+    return SimResult.from_pushes(
+        cols, np.concatenate([prev.smart_mode[:changed], tail.smart_mode]),
+        {k: (cols[PIPE_PUSHES[k]], lt) for k, lt in zip(PIPES, lts)})
+
+
+def stream_simulation(weeks, init_store, init_cw, init_semi, init_rawmat,
+                      order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                      cap_start, cap_ramp, base_forecast,
+                      demand_mult, ramp_start, ramp_end,
+                      price, var_cost, fixed_pct, store_a_pct, smart_distrib,
+                      custom_demand=None, chunk_weeks=52):
+    """run_simulation as a generator of SimResult chunks of `chunk_weeks` weeks.
+
+    The first chunk starts at week 0; concatenated, the chunks are exactly
+    run_simulation's output. Only the current chunk and the pipes are held,
+    so memory does not grow with the horizon. With weeks=None the run lasts
+    as long as `custom_demand`, which may then be any iterable.
+    """
+    for chunk in stream_flows(weeks, init_store, init_cw, init_semi, init_rawmat,
+                              order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                              cap_start, cap_ramp, base_forecast,
+                              demand_mult, ramp_start, ramp_end,
+                              store_a_pct, smart_distrib, custom_demand, chunk_weeks):
+        yield valuate(chunk, var_cost)
+
+
+def stream_flows(weeks, init_store, init_cw, init_semi, init_rawmat,
+                 order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                 cap_start, cap_ramp, base_forecast,
+                 demand_mult, ramp_start, ramp_end,
+                 store_a_pct, smart_distrib, custom_demand=None, chunk_weeks=52,
+                 resume=None):
+    """stream_simulation without valuation: flow-only SimResult chunks.
+
+    With `resume` (an EngineState) the run continues from that state and
+    the first chunk starts at the week after it.
+    """
+    if weeks is None and custom_demand is None:
+        raise ValueError("an open-ended run (weeks=None) needs custom_demand")
+    chunk_weeks = max(1, int(chunk_weeks))
+    phys_lt = mat_lt + semi_lt + fp_lt + dist_lt
+    coverage = phys_lt + order_freq
+    pct_a = store_a_pct / 100.0
+
+    demand = _demand_stream(base_forecast, demand_mult, ramp_start, ramp_end,
+                            custom_demand, repeat_last=weeks is not None)
+    first_week = 1 if resume is None else resume.week + 1
+    for _ in range(first_week):
+        next(demand, None)  # week 0 is the initial state; resumed weeks are done
+
+    if resume is None:
+        # Initial store stock: ALWAYS 50/50 (push reality — planner hasn't reviewed yet)
+        stores = TwoStores(float(init_store) / 2.0, float(init_store) / 2.0,
+                           Pipe(dist_lt), Pipe(dist_lt), pct_a)
+        st = FlowState(stores, Pipe(mat_lt), Pipe(semi_lt), Pipe(fp_lt), init_rawmat, init_semi,
+                       init_cw, base_forecast, smart_distrib, cap_start, cap_ramp, coverage)
+    else:
+        mat_pipe, semi_pipe, fp_pipe, dist_pipe_a, dist_pipe_b = (Pipe.load(p) for p in resume.pipes)
+        stores = TwoStores(resume.store_a, resume.store_b, dist_pipe_a, dist_pipe_b, pct_a)
+        st = FlowState(stores, mat_pipe, semi_pipe, fp_pipe, resume.raw_mat, resume.semi,
+                       resume.cw, resume.ff, smart_distrib, cap_start, cap_ramp, coverage)
+        (st.pb, st.pn, st.sn, st.fn, st.co, st.cas) = resume[6:12]
+        st.smart_discovered = resume.smart_discovered
+        st.first_order_week = resume.first_order_week
+
+    def review(w):
+        # Planning weeks: every order_freq-th week (every week if <= 1)
+        return order_freq <= 1 or w % order_freq == 0
+
+    # One column per metric, index = week - start of the chunk
+    start = first_week - 1 if resume is None else first_week  # week of row 0
+    c, smart_mode = _new_chunk(start, chunk_weeks, coverage)
+    if resume is None:
+        c['forecast'][0] = base_forecast
+        c['store_a'][0] = stores.store_a; c['store_b'][0] = stores.store_b
+        c['store_stock'][0] = stores.store_a + stores.store_b
+        c['supplier_cap'][0] = cap_start; c['semi_cap'][0] = cap_start; c['fp_cap'][0] = cap_start
+        c['raw_mat_before_prod'][0] = st.raw_mat; c['raw_mat_stock'][0] = st.raw_mat
+        c['semi_stock'][0] = st.semi; c['cw_stock'][0] = st.cw
+        # W0 has no production costs (its pipes are empty) — initial stock is
+        # valorized separately via init_stock_value in compute_kpis
+
+    # Pipe histories need the pushes of the L-1 weeks before each chunk
+    pushed = {k: (PIPE_PUSHES[k], lt)
+              for k, lt in zip(PIPES, (mat_lt, semi_lt, fp_lt, dist_lt, dist_lt))}
+    if resume is None:
+        carry = {k: [] for k in pushed}
+    else:
+        # Pushes still in flight: the pipe contents behind the front
+        carry = {k: list(p[1:]) for k, p in zip(PIPES, resume.pipes)}
+
+    def emit(n_rows):
+        # Week 0 (the initial state) is reported as given
+        cols = round_reported({k: c[k][:n_rows] for k in FLOW_COLUMNS},
+                              first=1 if c['week'][0] == 0 else 0)
+        cols['week'] = c['week'][:n_rows]; cols['coverage'] = c['coverage'][:n_rows]
+        pipes = {k: (cols[src], lt, carry[k]) for k, (src, lt) in pushed.items()}
+        for k, (src, lt) in pushed.items():
+            keep = max(1, lt) - 1
+            carry[k] = (carry[k] + c[src][:n_rows])[-keep:] if keep else []
+        return SimResult.from_pushes(cols, smart_mode[:n_rows], pipes)
+
+    w = first_week - 1; dem_total = 0
+    for w in (range(first_week, weeks + 1) if weeks is not None else itertools.count(first_week)):
+        dem_total = next(demand, None)
+        if dem_total is None:
+            break  # custom demand exhausted (open-ended run)
+        i = w - start
+        if i == chunk_weeks:
+            yield emit(chunk_weeks)
+            start = w; i = 0
+            c, smart_mode = _new_chunk(start, chunk_weeks, coverage)
+
+        # Forecast: updates only at planning frequency (periodic review)
+        # Between reviews, system is blind to demand changes
+        pc, sc_, fpc = st.capacities()
+        st.step(c, i, w, dem_total, dem_total if review(w) else None, pc, sc_, fpc)
+        st.end_week(w)
+        smart_mode[i] = st.smart
+        # Costs (anticipated 1 week) are booked from the pipe fronts by valuate()
+
+    yield emit(w - start if dem_total is None else w - start + 1)
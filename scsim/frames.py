@@ -0,0 +1,82 @@
+import functools
+
+import numpy as np
+
+# ════════════════════════════════════════════════════════════════
+# TABLE AND CHART DATA — dicts of NumPy columns, ready for pandas.DataFrame
+# ════════════════════════════════════════════════════════════════
+
+# Week-by-week table: label -> result column (pipe totals and financials are added)
+TABLE_COLUMNS = (
+    ('Week', 'week'),
+    ('Demand', 'demand'), ('Dem A', 'demand_a'), ('Dem B', 'demand_b'),
+    ('Sales', 'sales'), ('Sales A', 'sales_a'), ('Sales B', 'sales_b'),
+    ('Missed', 'missed'), ('Miss A', 'missed_a'), ('Miss B', 'missed_b'),
+    ('Stk A', 'store_a'), ('Stk B', 'store_b'),
+    ('Alloc A', 'alloc_a'), ('Alloc B', 'alloc_b'),
+    ('CW Wait', 'cw_stock'), ('CW Pipe', 'cw_shipped'),
+    ('FP Pipe', 'fp_pipe'),
+    ('Semi Wait', 'semi_stock'), ('Semi Pipe', 'semi_pipe'),
+    ('RM Wait', 'raw_mat_stock'), ('Mat Pipe', 'mat_pipe'),
+    ('WIP', 'wip_total'),
+    ('Order', 'order'), ('Pending', 'pending'),
+    ('Sup Cap', 'supplier_cap'),
+)
+FILL_COMPONENTS = (('Fill A', 'Sales A', 'sales_a'), ('Fill A', 'Lost A', 'missed_a'),
+                   ('Fill B', 'Sales B', 'sales_b'), ('Fill B', 'Lost B', 'missed_b'))
+
+
+def long_format(week, values, labels, label_name='Component', value_name='Value'):
+    """(weeks, k) matrix -> long columns, one row per week and label (week-major)."""
+    values = np.asarray(values)
+    return {'Week': np.repeat(week, values.shape[1]),
+            label_name: np.tile(np.asarray(labels, dtype=object), len(week)),
+            value_name: values.ravel()}
+
+
+def _chart_frames(r):
+    c = r.cols
+    demand = {'Week': c['week'][1:], 'Demand': c['demand'][1:],
+              'Sales': c['sales'][1:], 'Missed': c['missed'][1:]}
+    fill = long_format(c['week'][1:], np.column_stack([c[k][1:] for _, _, k in FILL_COMPONENTS]),
+                       [label for _, label, _ in FILL_COMPONENTS])
+    groups = np.tile(np.array([g for g, _, _ in FILL_COMPONENTS], dtype=object), len(r) - 1)
+    fulfillment = {'Week': fill['Week'], 'Group': groups,
+                   'Component': fill['Component'], 'Value': fill['Value']}
+    stocks = {'Week': c['week'], 'Store A': c['store_a'], 'Store B': c['store_b'], 'Order': c['order']}
+    return {'demand': demand, 'fulfillment': fulfillment, 'stocks': stocks}
+
+
+def chart_frames(result):
+    """Data of the demand, fulfillment and stock charts, built once per result.
+
+    'demand' covers weeks 1..N; 'fulfillment' is long format with four rows
+    per week (sales and lost units per store); 'stocks' includes week 0.
+    """
+    return result.memo('chart_frames', _chart_frames)
+
+
+def _week_table(r, price):
+    out = {}
+    for label, key in TABLE_COLUMNS:
+        # Pipe histories are weeks x slots: their row sums are the units in transit
+        out[label] = np.round(r[key].sum(axis=1), 1) if key.endswith('_pipe') else r[key]
+    costs = {k: r.cols.get(k, np.zeros(len(r))) for k in ('cost_mat', 'cost_semi', 'cost_fp')}
+    revenue = r['sales'] * price
+    var_cost = costs['cost_mat'] + costs['cost_semi'] + costs['cost_fp']
+    whole = lambda x: np.round(x).astype(int)
+    out.update({'Revenue': whole(revenue), 'Cost RM': whole(costs['cost_mat']),
+                'Cost Semi': whole(costs['cost_semi']), 'Cost FP': whole(costs['cost_fp']),
+                'Tot VC': whole(var_cost), 'Margin': whole(revenue - var_cost)})
+    return out
+
+
+def week_table(result, price):
+    """The app's week-by-week table, built once per result and price."""
+    return result.memo(('week_table', price), functools.partial(_week_table, price=price))
+
+
+def store_frame(result, name='stock'):
+    """Long-format per-store series of a NetworkResult (`name` from STORE_COLUMNS)."""
+    labels = [f'Store {i + 1}' for i in range(result.n_stores)]
+    return long_format(result['week'], result.stores[name], labels, 'Store', name.capitalize())
@@ -0,0 +1,222 @@
+import collections
+import hashlib
+import io
+import os
+
+import numpy as np
+
+# ════════════════════════════════════════════════════════════════
+# DEMAND INGESTION — week x store x SKU histories from CSV / Parquet
+# ════════════════════════════════════════════════════════════════
+
+# Accepted column names (case-insensitive); week may be given as a date instead
+DEMAND_COLUMNS = ('demand', 'qty', 'quantity', 'units', 'sales')
+KEY_COLUMNS = ('store', 'sku')
+# Upper bound of one week's demand, as in the sidebar's week editor
+MAX_DEMAND = 9999
+# Longest history accepted (weeks), so e.g. yyyyww week numbers fail early
+MAX_WEEKS = 5200
+# Parsed histories kept in memory, keyed by content hash
+CACHE_ENTRIES = 8
+
+
+class DemandHistory:
+    """Demand per (store, SKU) and week, as one integer matrix.
+
+    `matrix[i, w]` is the demand of `keys[i]` in week w (column 0 is week 0,
+    always 0, as in custom_demand). A key element is None when the file has
+    no such column. `stats` counts the rows read, dropped and clipped.
+    """
+
+    def __init__(self, keys, matrix, stats, start_date=None):
+        self.keys = keys
+        self.matrix = matrix
+        self.stats = stats
+        self.start_date = start_date
+
+    @property
+    def weeks(self):
+        return self.matrix.shape[1] - 1
+
+    def _labels(self, pos):
+        return sorted({k[pos] for k in self.keys if k[pos] is not None})
+
+    @property
+    def stores(self):
+        return self._labels(0)
+
+    @property
+    def skus(self):
+        return self._labels(1)
+
+    def _rows(self, store=None, sku=None):
+        return np.array([(store is None or k[0] == store) and (sku is None or k[1] == sku)
+                         for k in self.keys], dtype=bool)
+
+    def series(self, store=None, sku=None):
+        """Demand vector (index = week) summed over the matching keys; custom_demand for run_simulation."""
+        return self.matrix[self._rows(store, sku)].sum(axis=0)
+
+    def _by(self, pos, **match):
+        labels = self._labels(pos)
+        rows = self._rows(**match)
+        idx = {label: i for i, label in enumerate(labels)}
+        out = np.zeros((len(labels), self.matrix.shape[1]), dtype=self.matrix.dtype)
+        sel = [i for i in np.flatnonzero(rows) if self.keys[i][pos] is not None]
+        np.add.at(out, [idx[self.keys[i][pos]] for i in sel], self.matrix[sel])
+        return labels, out
+
+    def window(self, start=1, weeks=None, store=None, sku=None):
+        """custom_demand (index = week, week 0 = 0) of weeks start..start+weeks-1 of series()."""
+        series = self.series(store, sku)
+        start = min(max(int(start), 1), self.weeks)
+        stop = len(series) if weeks is None else start + int(weeks)
+        return np.concatenate([[0], series[start:stop]])
+
+    def by_store(self, sku=None):
+        """(stores, (weeks+1, n_stores) matrix): per-store custom_demand for run_network_simulation."""
+        labels, out = self._by(0, sku=sku)
+        return labels, out.T
+
+    def by_sku(self, store=None):
+        """(skus, (n_skus, weeks+1) matrix): one demand row per SKU for run_portfolio."""
+        return self._by(1, store=store)
+
+
+def content_key(data):
+    """sha256 (hex) of file contents."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _find(columns, names):
+    lower = {str(c).strip().lower(): c for c in columns}
+    return next((lower[n] for n in names if n in lower), None)
+
+
+def _chunks(source, fmt, chunk_rows):
+    """pandas DataFrames of at most chunk_rows rows."""
+    import pandas as pd
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def _detect_format(source, fmt):
+    if fmt:
+        return fmt
+    if isinstance(source, (str, os.PathLike)):
+        return 'parquet' if str(source).lower().endswith(('.parquet', '.pq')) else 'csv'
+    head = source.read(4)
+    source.seek(0)
+    return 'parquet' if head == b'PAR1' else 'csv'
+
+
+def read_demand(source, fmt=None, chunk_rows=200_000, max_demand=MAX_DEMAND, max_weeks=MAX_WEEKS):
+    """Parse a demand file into a DemandHistory, `chunk_rows` rows at a time.
+
+    `source` is a path, a binary file object or bytes; `fmt` ('csv' or
+    'parquet') is guessed from the name or the contents. The file needs a
+    demand column (demand / qty / quantity / units / sales) and a week
+    column (whole weeks from 1) or a date column (weeks counted from the
+    earliest date); store and sku columns are optional. Rows with no valid
+    week are dropped, missing demand counts as 0, and demand is rounded to
+    whole units and clipped to [0, max_demand]. Duplicate rows add up.
+    Raises ValueError when a column is missing or weeks go past max_weeks.
+    Needs pandas, and pyarrow for Parquet.
+    """
+    import pandas as pd
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    fmt = _detect_format(source, fmt)
+    stats = collections.Counter()
+    index = {}                  # (store, sku) -> row of the matrix
+    parts = []                  # (key codes, week or day numbers, demand) per chunk
+    dated = None
+    for df in _chunks(source, fmt, chunk_rows):
+        stats['rows'] += len(df)
+        dem_col = _find(df.columns, DEMAND_COLUMNS)
+        week_col, date_col = _find(df.columns, ('week',)), _find(df.columns, ('date',))
+        if dem_col is None or (week_col is None and date_col is None):
+            raise ValueError(f"demand file needs a demand column ({', '.join(DEMAND_COLUMNS)}) "
+                             f"and a week or date column; found {list(df.columns)}")
+        if dated is None:
+            dated = week_col is None
+        if dated:
+            # Day numbers for now; weeks once the earliest date is known
+            when = pd.to_datetime(df[date_col], errors='coerce')
+            t = ((when - pd.Timestamp(0)) // pd.Timedelta(days=1)).to_numpy(dtype=float, na_value=np.nan)
+        else:
+            t = pd.to_numeric(df[week_col], errors='coerce').to_numpy(dtype=float)
+        ok = np.isfinite(t) & (t == np.floor(t))
+        if not dated:
+            ok &= t >= 1
+        stats['bad_week'] += int((~ok).sum())
+
+        d = pd.to_numeric(df[dem_col], errors='coerce').to_numpy(dtype=float)[ok]
+        missing = np.isnan(d)
+        stats['missing'] += int(missing.sum())
+        d = np.rint(np.where(missing, 0, d))
+        stats['clipped'] += int(((d < 0) | (d > max_demand)).sum())
+        d = np.clip(d, 0, max_demand).astype(np.int64)
+
+        # Codes per key column, combined into one integer per (store, sku)
+        combo = np.zeros(len(d), dtype=np.int64)
+        factors = []
+        for name in KEY_COLUMNS:
+            col = _find(df.columns, (name,))
+            if col is None:
+                factors.append(None)
+                continue
+            codes, uniq = pd.factorize(df[col].to_numpy()[ok], use_na_sentinel=False)
+            combo = combo * len(uniq) + codes
+            factors.append(uniq)
+        pairs, inverse = np.unique(combo, return_inverse=True)
+        keys = []
+        for p in pairs.tolist():
+            key = []
+            for uniq in reversed(factors):
+                if uniq is None:
+                    key.append(None)
+                else:
+                    p, i = divmod(p, len(uniq))
+                    key.append(str(uniq[i]))
+            keys.append(tuple(reversed(key)))
+        codes = np.array([index.setdefault(k, len(index)) for k in keys], dtype=np.int64)[inverse.ravel()]
+        parts.append((codes, t[ok].astype(np.int64), d))
+
+    codes, t, d = (np.concatenate([p[i] for p in parts]) if parts else np.zeros(0, dtype=np.int64)
+                   for i in range(3))
+    start_date = None
+    if dated and len(t):
+        start_date = np.datetime64(int(t.min()), 'D')
+        t = (t - t.min()) // 7 + 1
+    stats['rows_used'] = int(len(d))
+    if len(t) and t.max() > max_weeks:
+        raise ValueError(f"demand file reaches week {int(t.max())}; more than max_weeks={max_weeks}")
+    matrix = np.zeros((max(len(index), 1), int(t.max()) + 1 if len(t) else 1), dtype=np.int64)
+    np.add.at(matrix, (codes, t), d)
+    keys = list(index) or [(None, None)]
+    return DemandHistory(keys, matrix, dict(stats), start_date)
+
+
+_cache = collections.OrderedDict()
+
+
+def load_demand(data, fmt=None, **opts):
+    """read_demand for file contents, memoized by their sha256.
+
+    The last CACHE_ENTRIES histories stay in memory, so re-submitting the same
+    upload (e.g. on every Streamlit rerun) costs a hash, not a parse.
+    """
+    key = (content_key(data), fmt, tuple(sorted(opts.items())))
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    history = read_demand(bytes(data), fmt, **opts)
+    _cache[key] = history
+    while len(_cache) > CACHE_ENTRIES:
+        _cache.popitem(last=False)
+    return history
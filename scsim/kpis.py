@@ -0,0 +1,266 @@
+import numpy as np
+
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+
+
+# Columns compute_kpis sums over the weeks
+TOTALS = ('sales', 'missed', 'demand', 'fp_input', 'cost_mat', 'cost_semi', 'cost_fp',
+          'missed_a', 'missed_b', 'sales_a', 'sales_b')
+# Per-store totals compute_kpis reports alongside the network totals
+STORE_TOTALS = ('missed_a', 'missed_b', 'sales_a', 'sales_b')
+
+
+def compute_kpis(states, price, var_cost, fixed_pct, base_forecast, weeks,
+                 init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
+    totals = {k: float(states.prefix(k)[-1]) for k in TOTALS}
+    last = states[-1] if states else {}
+    return _kpis(totals, int(states.prefix('stockout')[-1]), _end_of(last),
+                 {k: totals[k] for k in STORE_TOTALS},
+                 price, var_cost, fixed_pct, base_forecast, weeks,
+                 init_store, init_cw, init_semi, init_rawmat)
+
+
+def _end_of(last):
+    """_kpis' end-of-run stocks from the last row of a 2-store run ({} if there is none)."""
+    units = lambda k: sum(last.get(k, [0]))
+    return {'store': last.get('store_a', 0) + last.get('store_b', 0),
+            'cw': last.get('cw_stock', 0), 'semi': last.get('semi_stock', 0),
+            'rawmat': last.get('raw_mat_stock', 0),
+            'mat_pipe': units('mat_pipe'), 'semi_pipe': units('semi_pipe'),
+            'fp_pipe': units('fp_pipe'),
+            'dist_pipes': (units('dist_pipe_a'), units('dist_pipe_b'))}
+
+
+def _ratio(num, den):
+    """num / den, or 0 where den is not positive (scalars or arrays)."""
+    if np.ndim(den) == 0:
+        return num / den if den > 0 else 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / den, 0.0)
+
+
+def _kpis(totals, stockout_weeks, end, per_store, price, var_cost, fixed_pct, base_forecast,
+          weeks, init_store, init_cw, init_semi, init_rawmat):
+    """The KPI dict from the run totals and end-of-run stocks.
+
+    Every value may be a scalar or an array with one entry per scenario
+    (compute_kpis_batch). `end` holds the end stocks and pipe units (see
+    _end_of), 'dist_pipes' one entry per distribution pipe; `per_store`
+    is reported as is after 'lost_rev'.
+    """
+    ts = totals['sales']
+    tm = totals['missed']
+    td = totals['demand']
+    tfp = totals['fp_input']
+
+    # Initial stock: valorized at its stage rate (already invested)
+    init_stock_value = (init_store * var_cost * VALOR_FINISHED
+                       + init_cw * var_cost * VALOR_FINISHED
+                       + init_semi * var_cost * VALOR_SEMI
+                       + init_rawmat * var_cost * VALOR_RAW_MAT)
+
+    # Production cost = SUM OF INCREMENTAL costs at each stage (no double counting)
+    # Supplier ships RM: +50% per unit
+    # Semi processing:   +25% per unit (50%→75%)
+    # Finishing:          +25% per unit (75%→100%)
+    cost_mat_total = totals['cost_mat']
+    cost_semi_total = totals['cost_semi']
+    cost_fp_total = totals['cost_fp']
+    prod_cost = cost_mat_total + cost_semi_total + cost_fp_total
+
+    vc = init_stock_value + prod_cost
+
+    rev = ts * price
+    gm = rev - vc
+    fx = base_forecast * weeks * price * fixed_pct
+    mg = gm - fx
+
+    # End stock
+    end_store = end['store']
+    end_cw = end['cw']
+    end_semi = end['semi']
+    end_rawmat = end['rawmat']
+    end_stock_units = end_store + end_cw + end_semi + end_rawmat
+
+    end_stock_value = (end_store * var_cost * VALOR_FINISHED
+                      + end_cw * var_cost * VALOR_FINISHED
+                      + end_semi * var_cost * VALOR_SEMI
+                      + end_rawmat * var_cost * VALOR_RAW_MAT)
+
+    end_pipe_units = end['mat_pipe'] + end['semi_pipe'] + end['fp_pipe']
+    # Pipeline value (valorized by position)
+    end_pipe_value = (end['mat_pipe'] * var_cost * VALOR_RAW_MAT
+                     + end['semi_pipe'] * var_cost * VALOR_SEMI
+                     + end['fp_pipe'] * var_cost * VALOR_FINISHED)
+    for units in end['dist_pipes']:
+        end_pipe_units = end_pipe_units + units
+        end_pipe_value = end_pipe_value + units * var_cost * VALOR_FINISHED
+
+    total_system_units = ts + end_stock_units + end_pipe_units
+    useful_pct = _ratio(ts, total_system_units) * 100
+    useless_units = end_stock_units + end_pipe_units
+    useless_pct = _ratio(useless_units, total_system_units) * 100
+
+    # P&L: cost of sold = sold units * full cost; cost of unsold = total VC - cost of sold
+    cost_of_sold = ts * var_cost
+    unsold = vc - cost_of_sold
+    cost_of_unsold = np.maximum(0, unsold) if np.ndim(unsold) else max(0, unsold)
+
+    return {
+        'total_demand': td, 'total_sales': ts, 'total_missed': tm,
+        'svc_level': _ratio(ts, td),
+        'stockout_weeks': stockout_weeks,
+        'revenue': rev, 'var_cost': vc, 'gm': gm, 'fixed': fx,
+        'margin': mg, 'margin_pct': _ratio(mg, rev),
+        'produced': tfp,
+        'init_stock_value': init_stock_value,
+        'prod_cost': prod_cost,
+        'cost_mat_total': cost_mat_total,
+        'cost_semi_total': cost_semi_total,
+        'cost_fp_total': cost_fp_total,
+        'end_stock_value': end_stock_value,
+        'end_pipe_value': end_pipe_value,
+        'end_stock_units': end_stock_units,
+        'end_pipe_units': end_pipe_units,
+        'store_end': end_store,
+        'lost_rev': tm * price,
+        **per_store,
+        'useful_pct': useful_pct, 'useless_pct': useless_pct,
+        'useful_units': ts, 'useless_units': useless_units,
+        'total_system_units': total_system_units,
+        'cost_of_sold': cost_of_sold, 'cost_of_unsold': cost_of_unsold,
+        'leftover_value': end_stock_value + end_pipe_value,
+    }
+
+
+def cumulative_kpis(states, week, price, var_cost, fixed_pct, base_forecast, total_weeks,
+                    init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
+    # Totals over states[:week], read from the running totals in O(1)
+    k = min(week, len(states))
+    def cum(name):
+        return float(states.prefix(name)[k])
+
+    ts = cum('sales'); tm = cum('missed')
+    td = cum('demand'); tfp = cum('fp_input')
+    init_stock_value = (init_store * var_cost * VALOR_FINISHED
+                       + init_cw * var_cost * VALOR_FINISHED
+                       + init_semi * var_cost * VALOR_SEMI
+                       + init_rawmat * var_cost * VALOR_RAW_MAT)
+    # Incremental production costs (no double counting)
+    prod_cost = (cum('cost_mat')
+                + cum('cost_semi')
+                + cum('cost_fp'))
+    vc = init_stock_value + prod_cost
+    rev = ts * price; gm = rev - vc
+    fx = base_forecast * week * price * fixed_pct
+    mg = gm - fx
+
+    init_total = init_store + init_cw + init_semi + init_rawmat
+    total_in = init_total + tfp
+    useful_pct = (ts / total_in * 100) if total_in > 0 else 0
+
+    return {'sales': ts, 'missed': tm, 'demand': td, 'revenue': rev,
+            'svc_level': ts / td if td > 0 else 0, 'margin': mg,
+            'stockout_wks': int(cum('stockout')),
+            'missed_a': cum('missed_a'),
+            'missed_b': cum('missed_b'),
+            'useful_pct': useful_pct, 'useless_pct': 100 - useful_pct}
+
+
+class RunningKpis:
+    """compute_kpis updated online from streamed SimResult chunks.
+
+    Keeps only running totals and the latest week, so a run of any length
+    can be scored without holding it. Weeks before `first_week` (week 0, the
+    initial state, by default) are skipped, like compute_kpis(states[1:]).
+    """
+
+    def __init__(self, price, var_cost, fixed_pct, base_forecast,
+                 init_store=0, init_cw=0, init_semi=0, init_rawmat=0, first_week=1):
+        self.econ = (price, var_cost, fixed_pct, base_forecast)
+        self.init = (init_store, init_cw, init_semi, init_rawmat)
+        self.first_week = first_week
+        self.totals = dict.fromkeys(TOTALS, 0.0)
+        self.stockout_weeks = 0
+        self.weeks = 0
+        self.last = {}
+
+    def update(self, chunk):
+        """Add a chunk's weeks; returns self so calls can be chained."""
+        skip = int((chunk['week'] < self.first_week).sum())
+        if skip < len(chunk):
+            for k in TOTALS:
+                # Summed in week order, like compute_kpis' prefix sums, so the totals match exactly
+                col = np.concatenate([[self.totals[k]], chunk[k][skip:]])
+                self.totals[k] = float(np.cumsum(col)[-1])
+            self.stockout_weeks += int((chunk['missed'][skip:] > 0.5).sum())
+            self.weeks += len(chunk) - skip
+            self.last = chunk.row(len(chunk) - 1)
+        return self
+
+    def result(self, weeks=None):
+        """KPIs so far; fixed costs cover `weeks` (default: the weeks seen)."""
+        price, var_cost, fixed_pct, base_forecast = self.econ
+        return _kpis(self.totals, self.stockout_weeks, _end_of(self.last),
+                     {k: self.totals[k] for k in STORE_TOTALS}, price, var_cost, fixed_pct,
+                     base_forecast, self.weeks if weeks is None else weeks, *self.init)
+
+
+def compute_kpis_batch(result, price, var_cost, fixed_pct, base_forecast, weeks,
+                       init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
+    """compute_kpis for every scenario of a BatchResult at once.
+
+    Uses weeks 1..N (like compute_kpis(states[1:], ...)) and returns the same
+    keys, each as an array with one value per scenario. Economic arguments may
+    be scalars or per-scenario arrays.
+    """
+    def total(name):
+        # Added week by week like compute_kpis's running totals, so the sums agree to the bit
+        col = result.rounded(name)[:, 1:]
+        return np.cumsum(col, axis=1)[:, -1] if col.shape[1] else np.zeros(len(result))
+
+    def last(name):
+        return result.rounded(name)[:, -1]
+
+    pipe = {k: result.pipe_totals(k, result.weeks) for k in
+            ('mat_pipe', 'semi_pipe', 'fp_pipe', 'dist_pipe_a', 'dist_pipe_b')}
+    end = {'store': last('store_a') + last('store_b'), 'cw': last('cw_stock'),
+           'semi': last('semi_stock'), 'rawmat': last('raw_mat_stock'),
+           'mat_pipe': pipe['mat_pipe'], 'semi_pipe': pipe['semi_pipe'],
+           'fp_pipe': pipe['fp_pipe'], 'dist_pipes': (pipe['dist_pipe_a'], pipe['dist_pipe_b'])}
+    totals = {k: total(k) for k in TOTALS}
+    out = _kpis(totals, (result.rounded('missed')[:, 1:] > 0.5).sum(axis=1), end,
+                {k: totals[k] for k in STORE_TOTALS}, price, var_cost, fixed_pct,
+                base_forecast, weeks, init_store, init_cw, init_semi, init_rawmat)
+    n = len(result)
+
+    def arr(x, dtype=float):
+        return np.broadcast_to(np.asarray(x, dtype=dtype), (n,))
+
+    return {k: arr(v, int if k == 'stockout_weeks' else float) for k, v in out.items()}
+
+
+def compute_network_kpis(result, price, var_cost, fixed_pct, base_forecast, weeks,
+                         init_store=0, init_cw=0, init_semi=0, init_rawmat=0):
+    """compute_kpis for a NetworkResult (weeks 1..N).
+
+    Same network-level keys as compute_kpis; the per-store split is returned
+    as arrays under 'store_*' instead of the _a / _b pairs.
+    """
+    def total(name):
+        # Added week by week, as compute_kpis does
+        return float(np.cumsum(result[name][1:])[-1]) if len(result) > 1 else 0.0
+
+    stores = result.store_totals()
+    pipe = result.pipe_units()
+    end = {'store': float(stores['end_stock'].sum()), 'cw': float(result['cw_stock'][-1]),
+           'semi': float(result['semi_stock'][-1]), 'rawmat': float(result['raw_mat_stock'][-1]),
+           'mat_pipe': float(pipe['mat_pipe']), 'semi_pipe': float(pipe['semi_pipe']),
+           'fp_pipe': float(pipe['fp_pipe']), 'dist_pipes': (float(pipe['dist_pipe'].sum()),)}
+    per_store = {'store_demand': stores['demand'], 'store_sales': stores['sales'],
+                 'store_missed': stores['missed'], 'store_svc_level': stores['svc_level'],
+                 'store_stockout_weeks': stores['stockout_weeks']}
+    return _kpis({k: total(k) for k in TOTALS if not k.endswith(('_a', '_b'))},
+                 int((result['missed'][1:] > 0.5).sum()), end, per_store,
+                 price, var_cost, fixed_pct, base_forecast, weeks,
+                 init_store, init_cw, init_semi, init_rawmat)
@@ -0,0 +1,247 @@
+import numpy as np
+
+from .batch import _batch_demand
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+from .engine import FlowState
+from .pipes import Pipe
+from .result import round1, round_reported
+
+# ════════════════════════════════════════════════════════════════
+# N-STORE ENGINE — run_simulation with store stock, shares and
+# distribution pipes held as arrays (one entry per store)
+# ════════════════════════════════════════════════════════════════
+
+# Network totals, one value per week (same names as the 2-store columns)
+NETWORK_COLUMNS = (
+    'demand', 'forecast', 'mat_arr', 'semi_arr', 'fp_arr', 'dist_arr',
+    'sales', 'missed', 'store_stock', 'supplier_shipped', 'supplier_cap',
+    'raw_mat_before_prod', 'raw_mat_stock', 'semi_input', 'semi_cap', 'semi_stock',
+    'fp_input', 'fp_cap', 'cw_shipped', 'cw_stock',
+    'order', 'pending', 'backlog', 'wip_total',
+    'cost_mat', 'cost_semi', 'cost_fp',
+)
+# Per-store matrices, shape (weeks+1, n_stores)
+STORE_COLUMNS = ('demand', 'dist_arr', 'sales', 'missed', 'stock', 'alloc')
+
+
+def normalize_shares(shares):
+    """Demand shares as fractions summing to 1 (any positive weights accepted).
+
+    The last share is taken as 1 minus the others, so [pct, 100 - pct] gives
+    exactly the pct_a / pct_b pair of the 2-store engine.
+    """
+    s = np.asarray(shares, dtype=float).ravel()
+    if s.size == 0 or (s < 0).any() or s.sum() <= 0:
+        raise ValueError("store_shares must be non-negative weights with a positive sum")
+    s = s / s.sum()
+    s[-1] = 1.0 - s[:-1].sum()
+    return s
+
+
+def apportion(qty, shares, order=None):
+    """Split whole units `qty` by `shares`, taking stores in `order`.
+
+    Cumulative rounding: the first k stores together get round(qty x their
+    share). With two stores this is `a = round(qty * pct); b = qty - a`, the
+    rule the 2-store engine uses, and the parts always sum to qty.
+    """
+    s = shares if order is None else shares[order]
+    edges = np.rint(np.cumsum(s) * qty)
+    edges[-1] = qty
+    part = np.diff(edges, prepend=0.0)
+    if order is None:
+        return part
+    out = np.empty_like(part)
+    out[order] = part
+    return out
+
+
+def water_fill(cover, rate, qty):
+    """Whole units lifting the lowest weeks-of-cover towards a common level.
+
+    Stores are sorted by cover; the level is the highest one `qty` units can
+    reach (never above the best-covered store). Returns the priority units per
+    store (summing to at most qty) and the store order, worst covered first.
+    """
+    order = np.argsort(cover, kind='stable')
+    c = cover[order]
+    r = rate[order]
+    cum_r = np.cumsum(r)
+    # Units needed to bring the k+1 lowest stores up to the k-th cover
+    need = cum_r * c - np.cumsum(r * c)
+    k = int(np.searchsorted(need, qty, side='right')) - 1
+    level = c[-1] if k == len(c) - 1 else c[k] + (qty - need[k]) / cum_r[k]
+    gap = np.ceil(np.maximum(0.0, (level - c) * r))
+    # Rounding up can overshoot: serve the worst covered first, up to qty
+    filled = np.minimum(np.cumsum(gap), qty)
+    prio = np.empty_like(gap)
+    prio[order] = np.diff(filled, prepend=0.0)
+    return prio, order
+
+
+class StoreArray:
+    """The stores of run_network_simulation for engine.FlowState: one entry per store.
+
+    Fills the per-store matrices `st` (STORE_COLUMNS, row = week); the
+    distribution pipes are the allocation rows of the last `d_lt` weeks.
+    """
+    __slots__ = ('stock', 'dist_wip', 'shares', 'equal', 'store_demand', 'd_lt', 'st')
+
+    def __init__(self, stock, shares, store_demand, d_lt, st):
+        self.stock = stock
+        self.dist_wip = np.zeros(len(shares))
+        self.shares = shares
+        self.equal = np.full(len(shares), 1.0 / len(shares))
+        self.store_demand = store_demand
+        self.d_lt = d_lt
+        self.st = st
+
+    def in_transit(self):
+        return float(self.dist_wip.sum())
+
+    def sell(self, c, w, dem_total):
+        st = self.st
+        dem = (self.store_demand[w] if self.store_demand is not None
+               else apportion(dem_total, self.shares))
+        st['demand'][w] = dem
+        d_arr = st['alloc'][w - self.d_lt] if w > self.d_lt else np.zeros(len(dem))
+        self.dist_wip -= d_arr
+        st['dist_arr'][w] = d_arr
+
+        # 2-3. Stores — sell
+        avail = self.stock + d_arr
+        sales = np.minimum(dem, avail)
+        missed = np.maximum(0.0, dem - sales)
+        stock = self.stock = avail - sales
+        st['sales'][w] = sales; st['missed'][w] = missed; st['stock'][w] = stock
+        return (float(d_arr.sum()), dem_total, float(sales.sum()), float(missed.sum()),
+                float(stock.sum()))
+
+    def ship(self, c, w, ship_out, ff, smart):
+        # Allocate: before first review = equal split (blind); after it,
+        # water-fill weeks-of-cover, then split the rest by demand share
+        shares = self.shares
+        if ship_out > 0:
+            if smart:
+                rate = np.maximum(ff * shares, 0.01)
+                prio, order = water_fill((self.stock + self.dist_wip) / rate, rate, ship_out)
+                alloc = prio + apportion(ship_out - prio.sum(), shares, order)
+            else:
+                alloc = apportion(ship_out, self.equal)
+        else:
+            alloc = np.zeros(len(shares))
+        self.st['alloc'][w] = alloc
+        self.dist_wip += alloc
+
+
+def run_network_simulation(weeks, init_store, init_cw, init_semi, init_rawmat,
+                           order_freq, mat_lt, semi_lt, fp_lt, dist_lt,
+                           cap_start, cap_ramp, base_forecast,
+                           demand_mult, ramp_start, ramp_end,
+                           price, var_cost, fixed_pct, store_shares, smart_distrib,
+                           custom_demand=None):
+    """run_simulation generalized to any number of stores.
+
+    ``store_shares`` holds one demand weight per store (e.g. [60, 40] is the
+    2-store default). ``custom_demand`` is either a total demand vector, split
+    by the shares, or a (weeks+1, n_stores) matrix of per-store demand. With
+    two stores the result matches run_simulation week for week.
+    """
+    shares = normalize_shares(store_shares)
+    n = len(shares)
+    phys_lt = mat_lt + semi_lt + fp_lt + dist_lt
+    coverage = phys_lt + order_freq
+    # Transit time of the pipes (a pipe holds at least one slot)
+    m_lt, s_lt, f_lt, d_lt = (max(1, lt) for lt in (mat_lt, semi_lt, fp_lt, dist_lt))
+
+    if custom_demand is not None and np.ndim(custom_demand) == 2:
+        cd = np.asarray(custom_demand, dtype=float)
+        if cd.shape[1] != n:
+            raise ValueError(f"custom_demand has {cd.shape[1]} store columns, expected {n}")
+        store_demand = np.trunc(cd[np.minimum(np.arange(weeks + 1), len(cd) - 1)])
+        demand = store_demand.sum(axis=1)
+    else:
+        demand = _batch_demand(weeks, 1, base_forecast, demand_mult,
+                               ramp_start, ramp_end, custom_demand)[0]
+        store_demand = None
+
+    c = {k: [0.0] * (weeks + 1) for k in NETWORK_COLUMNS}
+    st = {k: np.zeros((weeks + 1, n)) for k in STORE_COLUMNS}
+    # Initial store stock: ALWAYS equal split (push reality — planner hasn't reviewed yet)
+    stores = StoreArray(np.full(n, float(init_store) / n), shares, store_demand, d_lt, st)
+    flow = FlowState(stores, Pipe(mat_lt), Pipe(semi_lt), Pipe(fp_lt), init_rawmat, init_semi,
+                     init_cw, base_forecast, smart_distrib, cap_start, cap_ramp, coverage)
+
+    c['forecast'][0] = base_forecast
+    st['stock'][0] = stores.stock
+    c['store_stock'][0] = round(float(stores.stock.sum()), 1)
+    c['supplier_cap'][0] = cap_start; c['semi_cap'][0] = cap_start; c['fp_cap'][0] = cap_start
+    c['raw_mat_before_prod'][0] = flow.raw_mat; c['raw_mat_stock'][0] = flow.raw_mat
+    c['semi_stock'][0] = flow.semi; c['cw_stock'][0] = flow.cw
+    smart_mode = np.zeros(weeks + 1, dtype=bool)
+
+    for w in range(1, weeks + 1):
+        dem_total = float(demand[w])
+        review = order_freq <= 1 or w % order_freq == 0
+        pc, sc_, fpc = flow.capacities()
+        flow.step(c, w, w, dem_total, dem_total if review else None, pc, sc_, fpc)
+        flow.end_week(w)
+        smart_mode[w] = flow.smart
+
+        # Costs anticipated 1 week — book what arrives at each stage NEXT week
+        c['cost_mat'][w] = flow.mat_pipe.front * var_cost * VALOR_RAW_MAT
+        c['cost_semi'][w] = flow.semi_pipe.front * var_cost * (VALOR_SEMI - VALOR_RAW_MAT)
+        c['cost_fp'][w] = flow.fp_pipe.front * var_cost * (VALOR_FINISHED - VALOR_SEMI)
+
+    cols = round_reported(c, first=1)
+    cols['week'] = np.arange(weeks + 1)
+    stores = {k: round1(v) for k, v in st.items()}
+    lead_times = {'mat_pipe': m_lt, 'semi_pipe': s_lt, 'fp_pipe': f_lt, 'dist_pipe': d_lt}
+    return NetworkResult(cols, stores, lead_times, smart_mode)
+
+
+class NetworkResult:
+    """Output of run_network_simulation.
+
+    ``result['sales']`` is the network total per week, ``result.stores['sales']``
+    the (weeks+1, n_stores) matrix behind it. Pipe contents are not stored;
+    pipe_units() rebuilds them from what was pushed in the last L weeks.
+    """
+
+    _PUSHED = {'mat_pipe': 'supplier_shipped', 'semi_pipe': 'semi_input', 'fp_pipe': 'fp_input'}
+
+    def __init__(self, cols, stores, lead_times, smart_mode):
+        self.cols = cols
+        self.stores = stores
+        self.lead_times = lead_times
+        self.smart_mode = smart_mode
+
+    def __len__(self):
+        return len(self.cols['week'])
+
+    @property
+    def n_stores(self):
+        return self.stores['stock'].shape[1]
+
+    def __getitem__(self, name):
+        return self.cols[name]
+
+    def pipe_units(self, week=-1):
+        """Units in each pipe at the end of `week` (dist_pipe is per store)."""
+        w = week % len(self)
+        out = {}
+        for name, lt in self.lead_times.items():
+            src = self.stores['alloc'] if name == 'dist_pipe' else self.cols[self._PUSHED[name]]
+            out[name] = src[max(1, w - lt + 1):w + 1].sum(axis=0)
+        return out
+
+    def store_totals(self, first=1):
+        """Per-store totals from week `first` on: arrays of length n_stores."""
+        st = {k: v[first:] for k, v in self.stores.items()}
+        dem = st['demand'].sum(axis=0)
+        sales = st['sales'].sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            svc = np.where(dem > 0, sales / dem, 0.0)
+        return {'demand': dem, 'sales': sales, 'missed': st['missed'].sum(axis=0),
+                'svc_level': svc, 'stockout_weeks': (st['missed'] > 0.5).sum(axis=0),
+                'end_stock': self.stores['stock'][-1]}
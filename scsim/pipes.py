@@ -0,0 +1,45 @@
+class Pipe:
+    """Fixed-length transit pipe stored as a ring buffer with a running total.
+
+    Slot 0 (the front) is what arrives next week. Each week the engine calls
+    pop() to take the arrival, then push() to put new units in at the back;
+    the freed front slot becomes the new back, so both are O(1).
+    """
+    __slots__ = ('buf', 'head', 'total')
+
+    def __init__(self, length):
+        self.buf = [0.0] * max(1, length)
+        self.head = 0
+        self.total = 0.0
+
+    @classmethod
+    def load(cls, contents):
+        """Pipe holding `contents` (front first, as returned by to_list)."""
+        pipe = cls(len(contents))
+        pipe.buf[:len(contents)] = [float(x) for x in contents]
+        pipe.total = sum(pipe.buf)
+        return pipe
+
+    def __len__(self):
+        return len(self.buf)
+
+    @property
+    def front(self):
+        return self.buf[self.head]
+
+    def pop(self):
+        """Take the units arriving this week; the front slot is left empty."""
+        qty = self.buf[self.head]
+        self.buf[self.head] = 0.0
+        self.total -= qty
+        return qty
+
+    def push(self, qty):
+        """Put units in at the back (must follow pop() in the same week)."""
+        self.buf[self.head] = qty
+        self.head = (self.head + 1) % len(self.buf)
+        self.total += qty
+
+    def to_list(self):
+        """Contents front first, like the old `pipe[1:] + [x]` lists."""
+        return self.buf[self.head:] + self.buf[:self.head]
@@ -0,0 +1,158 @@
+import numpy as np
+
+from .batch import run_simulation_batch
+from .kpis import compute_kpis_batch
+from .sweep import SIM_ARGS, grid_from_columns
+
+# ════════════════════════════════════════════════════════════════
+# PORTFOLIO — many SKUs drawing on shared stage capacity
+# ════════════════════════════════════════════════════════════════
+
+STAGES = ('supplier', 'semi', 'fp')
+RULES = ('fair', 'priority')
+# compute_kpis keys that add up across SKUs
+ADDITIVE_KPIS = ('total_demand', 'total_sales', 'total_missed', 'revenue', 'var_cost',
+                 'gm', 'fixed', 'margin', 'produced', 'prod_cost', 'end_stock_value',
+                 'end_pipe_value', 'end_stock_units', 'end_pipe_units', 'lost_rev',
+                 'useless_units', 'total_system_units', 'leftover_value')
+
+
+def ramp_capacity(weeks, cap_start, cap_ramp):
+    """Weekly capacity of a pool ramping like a stage of run_simulation.
+
+    Week w gets cap_start x (1 + (w-1) x cap_ramp), capped at 10 x cap_start.
+    """
+    w = np.arange(weeks + 1)
+    return np.minimum(cap_start * (1 + np.maximum(w - 1, 0) * cap_ramp), cap_start * 10)
+
+
+def priority_share(request, cap, priority):
+    """Serve SKUs in ascending `priority` until `cap` whole units are used."""
+    order = np.argsort(priority, kind='stable')
+    req = request[order]
+    before = np.cumsum(req) - req
+    out = np.empty_like(request)
+    out[order] = np.clip(cap - before, 0, req)
+    return out
+
+
+def fair_share(request, cap, weights):
+    """Weighted max-min fair split of `cap` whole units.
+
+    Every SKU gets min(request, level x weight), with the level set so the
+    pool is used up; units lost to rounding down go to the first SKUs still
+    short, one each.
+    """
+    if request.sum() <= cap:
+        return request
+    ratio = request / weights
+    order = np.argsort(ratio, kind='stable')
+    req = request[order]; wt = weights[order]
+    # Level if the SKUs before i are served in full and the rest share the pool
+    tail_w = wt[::-1].cumsum()[::-1]
+    level = (cap - (np.cumsum(req) - req)) / tail_w
+    i = int(np.argmax(level <= ratio[order]))
+    out = np.minimum(request, np.floor(level[i] * weights))
+    short = out < request
+    extra = short & (np.cumsum(short) <= cap - out.sum())
+    return out + extra
+
+
+class SharedCapacity:
+    """Per-stage capacity pools shared by the scenarios of a batch run.
+
+    ``capacity`` maps 'supplier', 'semi' and 'fp' to a weekly capacity: a
+    scalar or a (weeks+1,) schedule such as ramp_capacity(); stages left out
+    are unconstrained. ``rule`` is 'fair' (weighted max-min fair share, equal
+    weights by default) or 'priority' (lowest `priority` value served first).
+    Units granted per stage and week are recorded in `used`.
+    """
+
+    def __init__(self, weeks, capacity, rule='fair', priority=None, weights=None):
+        if rule not in RULES:
+            raise ValueError(f"rule must be one of {RULES}, got {rule!r}")
+        unknown = set(capacity) - set(STAGES)
+        if unknown:
+            raise ValueError(f"unknown stages {sorted(unknown)}; expected {STAGES}")
+        self.rule = rule
+        self.priority = priority
+        self.weights = weights
+        self.capacity = {k: np.floor(np.broadcast_to(np.asarray(v, dtype=float), (weeks + 1,)))
+                         for k, v in capacity.items()}
+        self.used = {k: np.zeros(weeks + 1) for k in self.capacity}
+
+    def grant(self, stage, week, request):
+        """Units each scenario may process at `stage` this week."""
+        if stage not in self.capacity:
+            return request
+        cap = self.capacity[stage][week]
+        if self.rule == 'priority':
+            prio = np.arange(len(request)) if self.priority is None else np.asarray(self.priority)
+            out = priority_share(request, cap, prio)
+        else:
+            wt = (np.ones(len(request)) if self.weights is None
+                  else np.broadcast_to(np.asarray(self.weights, dtype=float), request.shape))
+            out = fair_share(request, cap, wt)
+        self.used[stage][week] = out.sum()
+        return out
+
+    def utilization(self, stage):
+        """Share of the pool used each week (0 where capacity is 0)."""
+        cap = self.capacity[stage]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(cap > 0, self.used[stage] / cap, 0.0)
+
+
+def run_portfolio(base, skus, capacity, rule='fair', priority=None, weights=None,
+                  custom_demand=None):
+    """Simulate a SKU portfolio against shared stage capacity.
+
+    `base` holds run_simulation arguments common to all SKUs and `skus` maps
+    argument names to per-SKU arrays (same forms as grid_from_columns, so
+    'total_stock' and the split percentages work). ``custom_demand`` may be a
+    2-D array with one demand row per SKU. Each SKU's own cap_start/cap_ramp
+    still applies; set them high to be limited by the pools only.
+    """
+    grid = grid_from_columns(base, skus)
+    n = len(next(iter(grid.values())))
+    weeks = int(base['weeks'])
+    shared = SharedCapacity(weeks, capacity, rule, priority, weights)
+    result = run_simulation_batch(weeks, *[grid[k] for k in SIM_ARGS],
+                                  custom_demand=custom_demand, shared_capacity=shared)
+    return PortfolioResult(weeks, grid, result, shared, n)
+
+
+class PortfolioResult:
+    """Batch result of a portfolio run plus its capacity pools."""
+
+    def __init__(self, weeks, grid, batch, shared, n_skus):
+        self.weeks = weeks
+        self.grid = grid
+        self.batch = batch
+        self.shared = shared
+        self.n_skus = n_skus
+
+    def __getitem__(self, name):
+        return self.batch[name]
+
+    def sku_kpis(self):
+        """compute_kpis per SKU: each key an array of length n_skus."""
+        g = self.grid
+        return compute_kpis_batch(self.batch, g['price'], g['var_cost'], g['fixed_pct'],
+                                  g['base_forecast'], self.weeks, g['init_store'],
+                                  g['init_cw'], g['init_semi'], g['init_rawmat'])
+
+    def kpis(self, sku=None):
+        """Portfolio totals, with ratios recomputed from the summed units."""
+        sku = self.sku_kpis() if sku is None else sku
+        out = {k: float(sku[k].sum()) for k in ADDITIVE_KPIS}
+        td, ts, rev = out['total_demand'], out['total_sales'], out['revenue']
+        tsu = out['total_system_units']
+        out['svc_level'] = ts / td if td > 0 else 0
+        out['margin_pct'] = out['margin'] / rev if rev > 0 else 0
+        out['useful_pct'] = ts / tsu * 100 if tsu > 0 else 0
+        out['useless_pct'] = out['useless_units'] / tsu * 100 if tsu > 0 else 0
+        out['stockout_weeks'] = int((self.batch.rounded('missed')[:, 1:].sum(axis=0) > 0.5).sum())
+        for stage in self.shared.capacity:
+            out[f'{stage}_utilization'] = float(self.shared.utilization(stage)[1:].mean())
+        return out
@@ -0,0 +1,90 @@
+import collections
+import json
+import logging
+import time
+
+import numpy as np
+
+# ════════════════════════════════════════════════════════════════
+# PROFILING — wall time per phase of a script run, with a rolling history
+# ════════════════════════════════════════════════════════════════
+
+logger = logging.getLogger('scsim.profile')
+
+
+class PhaseTimer:
+    """Times the consecutive phases of one run.
+
+    phase(name) closes the current phase and starts `name`, so the phases
+    split the run with no gap or overlap; a name used twice adds up. note()
+    records facts about the run (cache hit or miss, payload sizes).
+    """
+
+    def __init__(self, kind='run', clock=time.perf_counter):
+        self.kind = kind
+        self.clock = clock
+        self.t0 = clock()
+        self.phases = {}
+        self.notes = {}
+        self._current, self._since = None, self.t0
+
+    def phase(self, name):
+        now = self.clock()
+        if self._current is not None:
+            self.phases[self._current] = self.phases.get(self._current, 0.0) + (now - self._since) * 1000
+        self._current, self._since = name, now
+
+    def note(self, key, value):
+        self.notes[key] = value
+
+    def finish(self):
+        """Close the last phase; the run as a record for ProfileLog."""
+        self.phase(None)
+        return {'kind': self.kind, 'time': time.time(),
+                'total_ms': (self._since - self.t0) * 1000,
+                'phases': dict(self.phases), 'notes': dict(self.notes)}
+
+
+class ProfileLog:
+    """The last `size` run records, summarized per phase.
+
+    With a `sink` path every record is also appended there as a JSON line;
+    records always go to the 'scsim.profile' logger at DEBUG level.
+    """
+
+    def __init__(self, size=200, sink=None):
+        self.records = collections.deque(maxlen=size)
+        self.sink = sink
+
+    def add(self, record):
+        self.records.append(record)
+        logger.debug("%s %.1f ms %s %s", record['kind'], record['total_ms'],
+                     record['phases'], record['notes'])
+        if self.sink:
+            with open(self.sink, 'a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def last(self, kind):
+        """Latest record of `kind`, or None."""
+        return next((r for r in reversed(self.records) if r['kind'] == kind), None)
+
+    def summary(self):
+        """One row per kind and phase (and a 'total' row per kind), in run order.
+
+        Columns: kind, phase, runs, last_ms, p50_ms, p95_ms, mean_ms.
+        """
+        times = collections.defaultdict(list)
+        for r in self.records:
+            for name, ms in r['phases'].items():
+                times[r['kind'], name].append(ms)
+            times[r['kind'], 'total'].append(r['total_ms'])
+        rows = []
+        for (kind, name), ms in times.items():
+            p50, p95 = np.percentile(ms, [50, 95])
+            rows.append({'kind': kind, 'phase': name, 'runs': len(ms), 'last_ms': ms[-1],
+                         'p50_ms': float(p50), 'p95_ms': float(p95), 'mean_ms': float(np.mean(ms))})
+        return rows
+
+    def note_counts(self, key):
+        """How often each value of note `key` occurred, e.g. flow cache hits vs misses."""
+        return collections.Counter(r['notes'][key] for r in self.records if key in r['notes'])
@@ -0,0 +1,484 @@
+import json
+
+import numpy as np
+
+from .result import week_comment
+
+
+def make_sc_html(state, params, bind=False):
+    """Flow view of one week record.
+
+    With bind=True every per-week value carries a data-b attribute naming
+    its playback_frames() key, so make_playback_html can redraw it in place.
+    """
+    var_cost = params.get('var_cost', 200)
+    mat_lt = params['mat_lt']; semi_lt = params['semi_lt']
+    fp_lt = params['fp_lt']; dist_lt = params['dist_lt']
+    total_lt = mat_lt + semi_lt + fp_lt + dist_lt
+
+    # Grey-blue LVMH palette
+    C_TXT = '#2a3a4e'; C_TXT_L = '#5a6a7e'; C_ARR = '#a0aab8'
+    C_HEADER_BG = '#c8d4e6'; C_HEADER_BDR = '#5a6a7e'; C_HEADER_FG = '#1a2a3e'
+    C_BOX_BG = '#f2f4f8'; C_BOX_BDR = '#8a96a8'
+    C_BOX_FILL = '#4a6280'; C_BOX_FILL_FG = '#ffffff'
+    C_WIP_BG = '#f8f9fb'; C_WIP_BDR = '#b0b8c4'
+    C_SUP_BG = '#1a2744'; C_SUP_FG = '#ffffff'
+    C_LOST_BG = '#f8e8e8'; C_LOST_BDR = '#c05050'; C_LOST_FG = '#8a2020'
+
+    # Box sizing: compute based on available width
+    # Supplier + 2 store cards have a FIXED minimum width for readability
+    max_stage = max(mat_lt, semi_lt, fp_lt, dist_lt)
+    total_boxes_row = min(mat_lt, 8) + min(semi_lt, 8) + min(fp_lt, 8) + min(dist_lt, 8)
+
+    CARD_W = 98  # fixed width for supplier/store cards
+    available_width = 1300
+    # Remaining width for boxes after subtracting 3 cards + gaps
+    box_budget = available_width - 3 * CARD_W - 60
+    gap = 3
+    target_bw = (box_budget / total_boxes_row) - gap
+    box_w = max(44, min(110, int(target_bw)))
+    box_h = max(50, min(74, box_w - 8))
+
+    def attr(key, kind='num'):
+        """Playback binding of an element (empty unless bind)."""
+        return f' data-b="{key}" data-k="{kind}"' if bind and key else ''
+
+    def week_box(qty, is_proc=False, key=None):
+        """Render one week slot with quantity (or empty). Modern flat style, no harsh borders."""
+        if qty > 0.5:
+            bg = C_BOX_FILL; fg = C_BOX_FILL_FG; weight = "700"
+            content = f'{qty:.0f}'
+            bdr = 'none'
+        else:
+            bg = '#e8ecf2'; fg = '#8a96a6'; weight = "400"
+            content = ''
+            bdr = 'none'
+        # Processing week: subtle accent — left border strip instead of dashed contour
+        proc_style = 'box-shadow: inset 3px 0 0 #2a4058;' if is_proc else ''
+        return (f'<div{attr(key, "box")} style="width:{box_w}px;height:{box_h}px;background:{bg};'
+                f'border:{bdr};border-radius:6px;display:flex;align-items:center;'
+                f'justify-content:center;font-size:15px;font-weight:{weight};color:{fg};'
+                f'{proc_style}box-sizing:border-box;">{content}</div>')
+
+    def band_header(label, width_px):
+        """Colored band above a group of week boxes. Softer, modern."""
+        return (f'<div style="width:{width_px}px;background:#dce3ed;'
+                f'border-radius:6px;padding:6px 4px;text-align:center;font-size:12px;'
+                f'font-weight:600;color:#2a3a4e;box-sizing:border-box;">{label}</div>')
+
+    def wip_label(label, value, width_px, key=None):
+        """WIP total below a band — visible accent to link it to its stage."""
+        return (f'<div style="width:{width_px}px;background:#e4e9f0;'
+                f'border-left:3px solid #4a6280;border-radius:4px;padding:5px 8px;'
+                f'display:flex;justify-content:space-between;align-items:center;'
+                f'font-size:11px;color:{C_TXT};box-sizing:border-box;">'
+                f'<span style="font-weight:600;color:#4a6280;">{label}</span>'
+                f'<span{attr(key)} style="font-weight:800;color:#1a2a3e;font-size:12px;">{value:.0f}</span></div>')
+
+    # === BUILD WEEK-BY-WEEK CONTENT ===
+    # Map pipes to weeks (W1 = leftmost/upstream, W_last = rightmost/downstream)
+    # Material band: mat_pipe, oldest (just entered) at index n-1, newest (about to exit) at index 0
+    # So for display: mat_pipe reversed → W1 = mat_pipe[-1], W_mat = mat_pipe[0]
+    mat_pipe = state.get('mat_pipe', [])
+    semi_pipe = state.get('semi_pipe', [])
+    fp_pipe = state.get('fp_pipe', [])
+    dist_pipe_a = state.get('dist_pipe_a', [])
+    dist_pipe_b = state.get('dist_pipe_b', [])
+    raw_mat = state.get('raw_mat_stock', 0)
+    semi = state.get('semi_stock', 0)
+    cw = state.get('cw_stock', 0)
+
+    # Each stage's weeks: reversed pipe shows W1 (upstream) to W_last (downstream)
+    # Material: W1..W_mat = mat_pipe reversed (mat_pipe[-1] is W1, mat_pipe[0] is W_mat)
+    # The "last week" of a stage = the processing week (where material is transformed)
+    # Buffer stocks (raw_mat, semi) are inserted at the END of their corresponding stage's last week
+    #   — they represent material that has been processed but is waiting.
+    # But simplest mapping: pipe[0] = last week of stage (about to exit/arrive next)
+    #                       pipe[-1] = first week of stage (just entered)
+
+    # Per user: initial stock goes in the LAST week of each stage (ready to exit next)
+    # At W0 of simulation, we expect:
+    #   mat band last week (W_mat) = initial RM position
+    #   semi band last week (W_mat+W_semi) = initial Semi position
+    #   finish+CW band = initial CW position
+    #   dist band → stores directly
+    # At runtime this happens naturally: mat_pipe[-1] is first week, mat_pipe[0] is last week.
+    # The stage "buffer" (raw_mat, semi, cw) sits AT the last week of its band
+    # (after processing but before moving to next stage).
+
+    # For visual: we merge pipe + stage buffer into the band.
+    # Material band (mat_lt weeks):
+    #   W1 (entered first) = mat_pipe[-1] ... W_mat_lt (exiting) = raw_mat (the buffer)
+    #   Actually the pipe already represents the "in transit" weeks.
+    #   Let's say Material band = mat_lt boxes showing mat_pipe[::-1]
+    #   Then raw_mat buffer sits BETWEEN material and semi bands → we merge it into
+    #   the last slot of Material band (add raw_mat to the last box).
+
+    def reversed_list(lst):
+        return list(reversed(lst)) if lst else []
+
+    mat_weeks = reversed_list(mat_pipe)   # W1...W_mat
+    semi_weeks = reversed_list(semi_pipe) # first semi week...last semi week
+    fp_weeks = reversed_list(fp_pipe)
+
+    # Put buffer at end of each band (downstream position)
+    # Material band: last week gets + raw_mat
+    if mat_weeks:
+        mat_weeks[-1] = mat_weeks[-1] + raw_mat
+    # Semi band: last week gets + semi stock
+    if semi_weeks:
+        semi_weeks[-1] = semi_weeks[-1] + semi
+    # Finish band: last week gets + cw stock
+    if fp_weeks:
+        fp_weeks[-1] = fp_weeks[-1] + cw
+
+    # Distribution band: dist_lt weeks per store, combined view shows A+B total flow
+    # Each dist week slot = sum(a[i] + b[i]) at that pipe position
+    dist_a_weeks = reversed_list(dist_pipe_a)
+    dist_b_weeks = reversed_list(dist_pipe_b)
+
+    # === LAYOUT ===
+    # Row structure:
+    #   [Order card | Stage headers ... | Store labels]
+    #   [Supplier card | Week boxes ... | Store cards]
+    #   [Capa/Cost | WIP labels ... | (blank)]
+
+    # Compute widths (band width capped at MAX_PER_ROW for wrapped stages)
+    gap_px = 3
+    MAX_PER_ROW_PRELIM = 8  # must match MAX_PER_ROW below
+    def band_width(n):
+        cols = min(n, MAX_PER_ROW_PRELIM)
+        return cols * box_w + (cols - 1) * gap_px + 8
+
+    mat_band_w = band_width(mat_lt)
+    semi_band_w = band_width(semi_lt)
+    fp_band_w = band_width(fp_lt)
+    dist_band_w = band_width(dist_lt)
+
+    # === WIP per band ===
+    wip_mat = sum(mat_pipe) + raw_mat
+    wip_semi = sum(semi_pipe) + semi
+    wip_fp = sum(fp_pipe) + cw
+    wip_dist_a = sum(dist_pipe_a)
+    wip_dist_b = sum(dist_pipe_b)
+
+    # === Build week box rows with wrap within stage ===
+    MAX_PER_ROW = 8  # wrap after 8 boxes within a stage
+
+    def boxes_row(weeks, proc_last=True, weeks_labels_start=1, key=None):
+        """Generate rows of week boxes with labels above. Wraps if > MAX_PER_ROW weeks."""
+        n = len(weeks)
+        if n == 0:
+            return ''
+        # Split into chunks of MAX_PER_ROW
+        chunks = []
+        for i in range(0, n, MAX_PER_ROW):
+            chunk_start = i
+            chunk_end = min(i + MAX_PER_ROW, n)
+            chunks.append((chunk_start, chunk_end))
+
+        rows_html = []
+        for ci, (start, end) in enumerate(chunks):
+            chunk_weeks = weeks[start:end]
+            labels_html = ''.join(
+                f'<div style="width:{box_w}px;text-align:center;font-size:10px;'
+                f'color:{C_TXT_L};font-weight:600;margin-bottom:2px;">W{weeks_labels_start + start + i}</div>'
+                for i in range(len(chunk_weeks))
+            )
+            boxes_html = ''.join(
+                week_box(chunk_weeks[i], is_proc=(proc_last and (start + i) == n - 1),
+                         key=key and f'{key}{start + i}')
+                for i in range(len(chunk_weeks))
+            )
+            rows_html.append(
+                f'<div style="display:flex;gap:{gap_px}px;">{labels_html}</div>'
+                f'<div style="display:flex;gap:{gap_px}px;margin-top:2px;margin-bottom:4px;">{boxes_html}</div>'
+            )
+        return ''.join(rows_html)
+
+    def stage_band_width(n_weeks):
+        """Band header width = width of one row of boxes (capped at MAX_PER_ROW)."""
+        cols = min(n_weeks, MAX_PER_ROW)
+        return cols * box_w + (cols - 1) * gap_px + 8
+
+    # Bands with integrated week boxes
+    def stage_col(label, weeks, band_w_px, wip_value, wip_label_txt, weeks_start, key):
+        """Full stage column: header band, week labels, week boxes, WIP."""
+        return (
+            f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
+            f'{band_header(label, band_w_px)}'
+            f'<div>{boxes_row(weeks, proc_last=True, weeks_labels_start=weeks_start, key=key)}</div>'
+            f'{wip_label(wip_label_txt, wip_value, band_w_px, f"wip_{key}")}'
+            f'</div>'
+        )
+
+    # Left: Supplier card — modern, no harsh border
+    sup_qty = state.get('backlog', 0)
+    sup_cap = state.get('supplier_cap', 0)
+    sup_html = (
+        f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
+        f'{band_header("Order", CARD_W)}'
+        f'<div style="width:{CARD_W}px;height:{box_h + 20}px;background:#2a3a52;'
+        f'border-radius:6px;padding:4px 6px;'
+        f'display:flex;flex-direction:column;align-items:center;justify-content:center;'
+        f'color:#fff;box-sizing:border-box;">'
+        f'<div style="font-size:10px;font-weight:500;color:#9aaec6;text-transform:uppercase;letter-spacing:0.5px;">Supplier</div>'
+        f'<div{attr("backlog")} style="font-size:20px;font-weight:700;">{sup_qty:.0f}</div>'
+        f'</div>'
+        f'<div style="width:{CARD_W}px;background:#f4f6f9;'
+        f'border-radius:5px;padding:5px 8px;font-size:10px;color:{C_TXT};'
+        f'display:flex;justify-content:space-between;box-sizing:border-box;">'
+        f'<span style="color:{C_TXT_L};font-weight:500;">Cap</span>'
+        f'<span{attr("supplier_cap")} style="font-weight:700;color:#2a3a4e;">{sup_cap:.0f}</span></div>'
+        f'</div>'
+    )
+
+    # Stage columns
+    mat_label = f"Mat ({mat_lt}wk)" if mat_lt <= 2 else f"Material ({mat_lt}wk)"
+    semi_label = f"Semi ({semi_lt}wk)"
+    fp_label = f"Finish ({fp_lt}wk)" if fp_lt <= 2 else f"Finish+CW ({fp_lt}wk)"
+    mat_col = stage_col(mat_label, mat_weeks, mat_band_w,
+                        wip_mat, "WIP", 1, "mat")
+    semi_col = stage_col(semi_label, semi_weeks, semi_band_w,
+                         wip_semi, "WIP", mat_lt + 1, "semi")
+    fp_col = stage_col(fp_label, fp_weeks, fp_band_w,
+                       wip_fp, "WIP", mat_lt + semi_lt + 1, "fp")
+
+    # Distribution band: show combined total per week (A+B)
+    dist_combined = [dist_a_weeks[i] + dist_b_weeks[i] for i in range(len(dist_a_weeks))] if dist_a_weeks else []
+    # Shorter label when band is narrow (few boxes)
+    dist_label = f"Dist ({dist_lt}wk)" if dist_lt <= 2 else f"Distribution ({dist_lt}wk)"
+    dist_col = (
+        f'<div style="display:flex;flex-direction:column;align-items:center;gap:4px;">'
+        f'{band_header(dist_label, dist_band_w)}'
+        f'<div>{boxes_row(dist_combined, proc_last=True, weeks_labels_start=mat_lt + semi_lt + fp_lt + 1, key="dist")}</div>'
+        f'<div style="display:flex;flex-direction:column;gap:3px;width:{dist_band_w}px;">'
+        f'{wip_label("WIP A", wip_dist_a, dist_band_w, "wip_dist_a")}'
+        f'{wip_label("WIP B", wip_dist_b, dist_band_w, "wip_dist_b")}'
+        f'</div></div>'
+    )
+
+    # Store cards — modern, borderless except when LOST
+    def store_card(letter, stock, dem, sales, lost):
+        is_alert = lost > 0.5
+        k = letter.lower()
+        lost_badge = (f'<div{attr(f"missed_{k}", "lost")} style="margin-top:5px;background:#c05050;'
+                      f'color:#fff;padding:1px 5px;border-radius:3px;font-size:9px;font-weight:700;'
+                      f'letter-spacing:0.3px;display:{"inline-block" if is_alert else "none"};">'
+                      f'LOST {int(lost)}</div>')
+        bg = '#fef0f0' if is_alert else '#f4f6f9'
+        accent = '#c05050' if is_alert else 'transparent'
+        return (
+            f'<div style="display:flex;flex-direction:column;gap:3px;">'
+            f'{band_header(f"Store {letter}", CARD_W)}'
+            f'<div{attr(f"missed_{k}", "alert")} style="width:{CARD_W}px;background:{bg};'
+            f'{"box-shadow: inset 3px 0 0 "+accent+";" if is_alert else ""}'
+            f'border-radius:6px;padding:8px 6px;text-align:center;box-sizing:border-box;'
+            f'color:{C_TXT};">'
+            f'<div style="color:{C_TXT_L};font-weight:500;font-size:9px;text-transform:uppercase;letter-spacing:0.3px;">Stock</div>'
+            f'<div{attr(f"store_{k}")} style="font-size:20px;font-weight:700;color:{C_TXT};line-height:1.1;margin:2px 0 6px;">{stock:.0f}</div>'
+            f'<div style="display:flex;justify-content:space-between;padding:0 6px;gap:8px;font-size:9px;">'
+            f'<div style="text-align:center;"><div style="color:{C_TXT_L};text-transform:uppercase;letter-spacing:0.3px;">Dem</div><div{attr(f"demand_{k}")} style="font-size:13px;font-weight:600;color:{C_TXT};line-height:1.1;margin-top:2px;">{dem:.0f}</div></div>'
+            f'<div style="text-align:center;"><div style="color:{C_TXT_L};text-transform:uppercase;letter-spacing:0.3px;">Sold</div><div{attr(f"sales_{k}")} style="font-size:13px;font-weight:600;color:#2a5a3a;line-height:1.1;margin-top:2px;">{sales:.0f}</div></div>'
+            f'</div>'
+            f'{lost_badge if is_alert or bind else ""}'
+            f'</div></div>'
+        )
+
+    store_a_html = store_card("A", state.get('store_a', 0), state.get('demand_a', 0),
+                              state.get('sales_a', 0), state.get('missed_a', 0))
+    store_b_html = store_card("B", state.get('store_b', 0), state.get('demand_b', 0),
+                              state.get('sales_b', 0), state.get('missed_b', 0))
+
+    stores_html = (
+        f'<div style="display:flex;flex-direction:column;gap:6px;justify-content:center;align-self:stretch;">'
+        f'{store_a_html}{store_b_html}</div>'
+    )
+
+    # === ASSEMBLE ===
+    # Stages on row, stores centered vertically against the pipe
+    main = (
+        f'<div style="display:flex;align-items:center;gap:10px;">'
+        f'<div style="display:flex;align-items:flex-start;gap:10px;">'
+        f'{sup_html}{mat_col}{semi_col}{fp_col}{dist_col}</div>'
+        f'{stores_html}</div>'
+    )
+
+    # Info bar (top)
+    has_order = state.get('order', 0) > 0
+    order_html = (
+        f'<b{attr("order", "order")} style="color:#2a5a3a;font-size:13px;">ORDER {state["order"]:.0f}</b>'
+        if has_order else f'<span style="color:{C_TXT_L};">No order</span>'
+    )
+    if bind:
+        # Both variants, the inactive one hidden
+        order_html = (
+            f'<b{attr("order", "order")} style="color:#2a5a3a;font-size:13px;'
+            f'display:{"inline" if has_order else "none"};">ORDER {state.get("order", 0):.0f}</b>'
+            f'<span{attr("order", "no_order")} style="color:{C_TXT_L};'
+            f'display:{"none" if has_order else "inline"};">No order</span>'
+        )
+    info_bar = (
+        f'<div style="display:flex;justify-content:space-between;align-items:center;'
+        f'padding:8px 16px;background:linear-gradient(90deg,#f4f6f9,#eef1f6);'
+        f'border:1px solid #dde2ea;border-radius:8px;margin-bottom:10px;'
+        f'font-family:Arial,Helvetica,sans-serif;">'
+        f'<span style="font-size:12px;color:{C_TXT};">Backlog <b{attr("backlog")} style="color:#8a3030;">{state.get("backlog", 0):.0f}</b></span>'
+        f'<span style="font-size:12px;color:{C_TXT};">Pending <b{attr("pending")} style="color:#8a6a20;">{state.get("pending", 0):.0f}</b></span>'
+        f'<span style="font-size:12px;color:{C_TXT};">WIP <b{attr("wip_total")} style="color:#2a5a8a;">{state.get("wip_total", 0):.0f}</b></span>'
+        f'<span style="font-size:12px;">{order_html}</span>'
+        f'<span style="font-size:12px;color:{C_TXT};">Forecast <b{attr("forecast")} style="color:#1a2a40;">{state.get("forecast", 0):.0f}</b>/wk</span>'
+        f'<span style="font-size:12px;color:{C_TXT};">A:{params.get("store_a_pct", 60)}% B:{100 - params.get("store_a_pct", 60)}%</span>'
+        f'</div>'
+    )
+
+    # Comment
+    comment = state.get('comment', '')
+    comment_html = (
+        f'<div{attr("comment", "text")} style="padding:8px 16px;font-size:11px;color:{C_TXT};line-height:1.5;'
+        f'background:#f8f9fb;border:1px solid #e8ecf0;border-radius:6px;margin-top:10px;">{comment}</div>'
+        if comment or bind else ''
+    )
+
+    physical_flow = (
+        f'<div style="text-align:center;padding:8px 0;">'
+        f'<span style="font-size:10px;color:{C_TXT_L};letter-spacing:2px;font-weight:700;">'
+        f'- - - PHYSICAL FLOW (GOODS) - - -</span></div>'
+    )
+
+    # Calculate the intrinsic width of the diagram (approx)
+    # total_boxes_row * (bw + 3) + 3 cards (supplier + 2 stores) + gaps
+    intrinsic_w = (min(mat_lt,8) + min(semi_lt,8) + min(fp_lt,8) + min(dist_lt,8)) * (box_w + 3)
+    intrinsic_w += 3 * (CARD_W) + 60  # cards + gaps
+
+    container = (
+        f'<div style="font-family:Arial,Helvetica,sans-serif;padding:8px;'
+        f'background:linear-gradient(90deg,#f6f8fa,#f0f2f6);'
+        f'border:1px solid #dde2ea;border-radius:12px;'
+        f'width:100%;box-sizing:border-box;overflow:hidden;">'
+        f'<div id="sc-scaler" style="transform-origin:top left;width:{intrinsic_w}px;">'
+        f'{main}</div>'
+        f'</div>'
+        f'<script>'
+        f'(function(){{'
+        f'  var scaler=document.getElementById("sc-scaler");'
+        f'  if(!scaler) return;'
+        f'  var natural={intrinsic_w};'
+        f'  var wrapper=scaler.parentElement;'
+        f'  function fit(){{'
+        f'    var avail=wrapper.clientWidth - 16;'
+        f'    var scale=Math.min(1, avail/natural);'
+        f'    scaler.style.transform="scale("+scale+")";'
+        f'    wrapper.style.height=(scaler.offsetHeight*scale + 16)+"px";'
+        f'  }}'
+        f'  fit();'
+        f'  window.addEventListener("resize",fit);'
+        f'  setTimeout(fit,100);setTimeout(fit,500);'
+        f'}})();'
+        f'</script>'
+    )
+
+    return f'<div style="font-family:Arial,Helvetica,sans-serif;">{info_bar}{container}{physical_flow}{comment_html}</div>'
+
+
+
+# Stage bands of the flow view: (frame key, pipe, buffer stock merged into its last box)
+BANDS = (('mat', 'mat_pipe', 'raw_mat_stock'), ('semi', 'semi_pipe', 'semi_stock'),
+         ('fp', 'fp_pipe', 'cw_stock'))
+FRAME_COLUMNS = ('backlog', 'supplier_cap', 'pending', 'wip_total', 'order', 'forecast',
+                 'store_a', 'demand_a', 'sales_a', 'missed_a',
+                 'store_b', 'demand_b', 'sales_b', 'missed_b')
+
+
+def playback_frames(result):
+    """Every per-week value of the flow view, one list (index = week) per data-b key."""
+    cols, pipes = result.cols, result.pipes
+    frames = {}
+    for key, pipe, buffer in BANDS:
+        boxes = pipes[pipe][:, ::-1].copy()  # W1 (upstream) first
+        boxes[:, -1] += cols[buffer]
+        frames.update({f'{key}{i}': boxes[:, i] for i in range(boxes.shape[1])})
+        frames[f'wip_{key}'] = pipes[pipe].sum(axis=1) + cols[buffer]
+    dist = (pipes['dist_pipe_a'] + pipes['dist_pipe_b'])[:, ::-1]
+    frames.update({f'dist{i}': dist[:, i] for i in range(dist.shape[1])})
+    frames['wip_dist_a'] = pipes['dist_pipe_a'].sum(axis=1)
+    frames['wip_dist_b'] = pipes['dist_pipe_b'].sum(axis=1)
+    frames.update({k: cols[k] for k in FRAME_COLUMNS})
+    out = {k: np.round(v, 1).tolist() for k, v in frames.items()}
+    out['comment'] = [week_comment({k: v[w] for k, v in cols.items()}, bool(result.smart_mode[w]))
+                      for w in range(len(result))]
+    return out
+
+
+PLAYBACK_JS = """
+(function(){
+  var D=%(frames)s, N=%(last)d, w=%(week)d, timer=null;
+  var els=[].map.call(document.querySelectorAll('[data-b]'),function(e){return [e,D[e.dataset.b],e.dataset.k];});
+  var slider=document.getElementById('pb-week'), label=document.getElementById('pb-label'),
+      play=document.getElementById('pb-play'), speed=document.getElementById('pb-speed'),
+      ms=document.getElementById('pb-ms');
+  function f0(x){var r=Math.round(x); if(r-x===0.5&&r%%2!==0) r-=1; return String(r);}  // like Python's %%.0f
+  function draw(week){
+    var t0=performance.now();
+    w=week;
+    for(var i=0;i<els.length;i++){
+      var e=els[i][0], v=els[i][1][w], k=els[i][2];
+      if(k==='num'){e.textContent=f0(v);}
+      else if(k==='box'){var on=v>0.5; e.textContent=on?f0(v):'';
+        e.style.background=on?'#4a6280':'#e8ecf2'; e.style.color=on?'#ffffff':'#8a96a6';
+        e.style.fontWeight=on?'700':'400';}
+      else if(k==='alert'){var a=v>0.5; e.style.background=a?'#fef0f0':'#f4f6f9';
+        e.style.boxShadow=a?'inset 3px 0 0 #c05050':'';}
+      else if(k==='lost'){e.style.display=v>0.5?'inline-block':'none'; e.textContent='LOST '+Math.trunc(v);}
+      else if(k==='order'){e.style.display=v>0?'inline':'none'; e.textContent='ORDER '+f0(v);}
+      else if(k==='no_order'){e.style.display=v>0?'none':'inline';}
+      else if(k==='text'){e.textContent=v;}
+    }
+    slider.value=w; label.textContent='Week '+w+' / '+N;
+    ms.textContent=(performance.now()-t0).toFixed(2)+' ms/frame';
+  }
+  function stop(){clearInterval(timer); timer=null; play.textContent='\u25b6 Play';}
+  function start(){
+    if(w>=N) draw(0);
+    play.textContent='\u23f8 Pause';
+    timer=setInterval(function(){ if(w>=N){stop(); return;} draw(w+1); }, +speed.value);
+  }
+  slider.addEventListener('input',function(){draw(+slider.value);});
+  play.addEventListener('click',function(){ timer?stop():start(); });
+  speed.addEventListener('change',function(){ if(timer){stop(); start();} });
+  document.getElementById('pb-first').addEventListener('click',function(){draw(0);});
+  document.getElementById('pb-last').addEventListener('click',function(){draw(N);});
+  draw(w);
+})();
+"""
+
+
+def make_playback_html(result, params, week=0):
+    """Flow view with every week shipped at once: slider and autoplay run in the browser.
+
+    The markup is make_sc_html(bind=True) for `week`; playback_frames() is
+    inlined as JSON and a small script rewrites the bound values in place,
+    so scrubbing needs no server round-trip.
+    """
+    last = len(result) - 1
+    week = min(max(int(week), 0), last)
+    btn = ('border:1px solid #c8d0dc;background:#fff;border-radius:6px;padding:3px 10px;'
+           'font-size:12px;color:#2a3a4e;cursor:pointer;')
+    speeds = ''.join(f'<option value="{ms}"{" selected" if ms == 400 else ""}>{x}</option>'
+                     for x, ms in (('0.5x', 800), ('1x', 400), ('2x', 200), ('4x', 100), ('8x', 50)))
+    controls = (
+        f'<div style="display:flex;align-items:center;gap:8px;margin-bottom:8px;'
+        f'font-family:Arial,Helvetica,sans-serif;">'
+        f'<button id="pb-first" style="{btn}">\u23ee</button>'
+        f'<button id="pb-play" style="{btn}min-width:80px;">\u25b6 Play</button>'
+        f'<button id="pb-last" style="{btn}">\u23ed</button>'
+        f'<input id="pb-week" type="range" min="0" max="{last}" value="{week}" style="flex:1;">'
+        f'<span id="pb-label" style="font-size:13px;font-weight:700;color:#1a2a40;min-width:96px;'
+        f'text-align:center;">Week {week} / {last}</span>'
+        f'<select id="pb-speed" style="font-size:12px;">{speeds}</select>'
+        f'<span id="pb-ms" style="font-size:10px;color:#9aa6b6;min-width:80px;"></span>'
+        f'</div>'
+    )
+    frames = json.dumps(playback_frames(result), separators=(',', ':')).replace('</', '<\\/')
+    script = PLAYBACK_JS % {'frames': frames, 'last': last, 'week': week}
+    return f'{controls}{make_sc_html(result[week], params, bind=True)}<script>{script}</script>'
@@ -0,0 +1,179 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Per-week metrics, one column each (the pipes and the comment are derived)
+COLUMNS = (
+    'demand', 'demand_a', 'demand_b', 'forecast',
+    'mat_arr', 'semi_arr', 'fp_arr', 'dist_arr_a', 'dist_arr_b', 'dist_arr',
+    'sales_a', 'sales_b', 'sales', 'missed_a', 'missed_b', 'missed',
+    'store_a', 'store_b', 'store_stock', 'supplier_shipped', 'supplier_cap',
+    'raw_mat_before_prod', 'raw_mat_stock', 'semi_input', 'semi_cap', 'semi_stock',
+    'fp_input', 'fp_cap', 'cw_shipped', 'cw_stock', 'alloc_a', 'alloc_b',
+    'order', 'pending', 'backlog', 'wip_total',
+    'cost_mat', 'cost_semi', 'cost_fp',
+)
+# Physical flow only: the cost columns are added by valuation.valuate
+FLOW_COLUMNS = tuple(k for k in COLUMNS if not k.startswith('cost_'))
+# Rounded to whole units in the output (everything else to 0.1)
+ROUND0_COLUMNS = ('supplier_cap', 'semi_cap', 'fp_cap', 'order', 'pending', 'backlog')
+PIPES = ('mat_pipe', 'semi_pipe', 'fp_pipe', 'dist_pipe_a', 'dist_pipe_b')
+
+
+def round1(x):
+    """Python's round(v, 1) over an array.
+
+    np.round scales by 10 first, which can turn a value just below a tie into
+    a tie; the few values near one are re-rounded exactly.
+    """
+    out = np.round(x, 1)
+    near_tie = np.abs(np.abs(x * 10) % 1 - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(v, 1) for v in x[near_tie].tolist()]
+    return out
+
+
+def round_reported(cols, first=0):
+    """Columns (lists or arrays, equal length) rounded as the engines report them.
+
+    ROUND0_COLUMNS go to whole units and every other column to 0.1 with
+    round1; rows before `first` (the initial state) are kept as given.
+    Returns a dict of float arrays.
+    """
+    names = list(cols)
+    block = np.array([cols[k] for k in names], dtype=float)
+    whole = [j for j, k in enumerate(names) if k in ROUND0_COLUMNS]
+    rest = [j for j, k in enumerate(names) if k not in ROUND0_COLUMNS]
+    block[whole, first:] = np.round(block[whole, first:])
+    block[rest, first:] = round1(block[rest, first:])
+    return dict(zip(names, block))
+
+
+def pipe_history(pushed, lead_time, prior=()):
+    """Weeks x slots view of a pipe from what was pushed into it each week.
+
+    Row w holds the pushes of weeks w-L+1..w, front (next arrival) first.
+    `prior` holds pushes made before the first row (a streamed chunk's
+    predecessors); missing ones are zeros. It is a strided view over the
+    pushes, so it costs O(weeks + L) memory.
+    """
+    n = max(1, lead_time)
+    prior = np.asarray(prior, dtype=float)[max(0, len(prior) - (n - 1)):] if n > 1 else np.zeros(0)
+    padded = np.concatenate([np.zeros(n - 1 - len(prior)), prior, np.asarray(pushed, dtype=float)])
+    return sliding_window_view(padded, n)
+
+
+def week_comment(s, smart):
+    """One-line commentary for a week record.
+
+    Built from the reported (rounded) values, so it agrees with the table.
+    With whole-unit initial stocks these are the exact values; with
+    fractional ones a stock like 629.45 reads "stk 630" (from 629.5), where
+    the list-of-dicts engine wrote "stk 629".
+    """
+    if s['week'] == 0:
+        return "Week 0 - Initial state."
+    parts = []
+    if s['missed_a'] > 0.5:
+        parts.append(f"A: lost {s['missed_a']:.0f}/{s['demand_a']:.0f}.")
+    else:
+        parts.append(f"A: sold {s['sales_a']:.0f}/{s['demand_a']:.0f}, stk {s['store_a']:.0f}.")
+    if s['missed_b'] > 0.5:
+        parts.append(f"B: lost {s['missed_b']:.0f}/{s['demand_b']:.0f}.")
+    else:
+        parts.append(f"B: sold {s['sales_b']:.0f}/{s['demand_b']:.0f}, stk {s['store_b']:.0f}.")
+    if s['order'] > 0:
+        parts.append(f"ORDER {s['order']:.0f}.")
+    if s['supplier_shipped'] > 0.5:
+        parts.append(f"Supplier {s['supplier_shipped']:.0f}.")
+    if s['cw_shipped'] > 0.5:
+        mode = "smart" if smart else "push 50/50"
+        parts.append(f"WH\u2192A:{s['alloc_a']:.0f} B:{s['alloc_b']:.0f} ({mode}).")
+    return " ".join(parts)
+
+
+class SimResult:
+    """Columnar simulation output.
+
+    One NumPy array per metric (index = week) and one weeks x slots array per
+    pipe. ``result['sales']`` is a column, ``result[w]`` the week-w record as a
+    dict (same keys as the old list-of-dicts output), and ``result[a:b]`` a
+    SimResult over those weeks sharing the same arrays.
+    """
+
+    def __init__(self, cols, pipes, smart_mode):
+        self.cols = cols
+        self.pipes = pipes
+        self.smart_mode = smart_mode
+        self._prefix = {}
+        self._memo = {}
+
+    @classmethod
+    def from_pushes(cls, cols, smart_mode, pushes):
+        """Build from per-week column lists and (pushed column, lead time[, prior]) per pipe."""
+        arrays = {k: np.asarray(v, dtype=float) for k, v in cols.items()}
+        arrays['week'] = np.asarray(cols['week'], dtype=int)
+        arrays['coverage'] = np.asarray(cols['coverage'], dtype=int)
+        pipes = {k: pipe_history(*src) for k, src in pushes.items()}
+        return cls(arrays, pipes, np.asarray(smart_mode, dtype=bool))
+
+    def __len__(self):
+        return len(self.cols['week'])
+
+    def __iter__(self):
+        for w in range(len(self)):
+            yield self.row(w)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.cols[key] if key in self.cols else self.pipes[key]
+        if isinstance(key, slice):
+            return SimResult({k: v[key] for k, v in self.cols.items()},
+                             {k: v[key] for k, v in self.pipes.items()},
+                             self.smart_mode[key])
+        return self.row(key)
+
+    def __getstate__(self):
+        # Sliding-window pipes pickle as their 1-D series, not weeks x slots
+        pipes = {}
+        for k, v in self.pipes.items():
+            if len(v) and v.strides == (v.itemsize, v.itemsize):
+                pipes[k] = (np.concatenate([v[:, 0], v[-1, 1:]]), v.shape[1])
+            else:
+                pipes[k] = (np.ascontiguousarray(v), None)
+        return {'cols': self.cols, 'pipes': pipes, 'smart_mode': self.smart_mode}
+
+    def __setstate__(self, state):
+        self.cols = state['cols']
+        self.smart_mode = state['smart_mode']
+        self._prefix = {}
+        self._memo = {}
+        self.pipes = {k: v if n is None else sliding_window_view(v, n)
+                      for k, (v, n) in state['pipes'].items()}
+
+    def prefix(self, name):
+        """Running total of a column with a leading 0: prefix(name)[k] sums the first k weeks.
+
+        Memoized per result, so any cumulative lookup after the first is O(1).
+        'stockout' counts weeks with more than half a unit missed.
+        """
+        p = self._prefix.get(name)
+        if p is None:
+            col = self.cols['missed'] > 0.5 if name == 'stockout' else self.cols[name]
+            p = np.zeros(len(col) + 1)
+            np.cumsum(col, out=p[1:])
+            self._prefix[name] = p
+        return p
+
+    def memo(self, key, build):
+        """build(self), computed once per result under `key` (tables, chart data)."""
+        if key not in self._memo:
+            self._memo[key] = build(self)
+        return self._memo[key]
+
+    def row(self, i):
+        """Week record as a dict, pipes as lists front first."""
+        s = {k: v[i].item() for k, v in self.cols.items()}
+        for k, v in self.pipes.items():
+            s[k] = v[i].tolist()
+        s['comment'] = week_comment(s, bool(self.smart_mode[i]))
+        return s
@@ -0,0 +1,86 @@
+import numpy as np
+
+from .sweep import evaluate_grid, grid_from_columns
+
+# ════════════════════════════════════════════════════════════════
+# SENSITIVITY — one-at-a-time perturbations, all in one batch
+# ════════════════════════════════════════════════════════════════
+
+# Lever -> (step, relative?, min, max). Absolute steps move by `step` units;
+# relative ones by rel_step x the base value (at least `step`). Bounds are
+# the sidebar's.
+LEVERS = {
+    'mat_lt': (1, False, 1, 24),
+    'semi_lt': (1, False, 1, 12),
+    'fp_lt': (1, False, 1, 12),
+    'dist_lt': (1, False, 1, 12),
+    'order_freq': (1, False, 1, 4),
+    'cap_start': (10, True, 10, 1000),
+    'cap_ramp': (0.05, True, 0.0, 0.5),
+    'total_stock': (50, True, 0, 10000),
+    'store_pct': (5, False, 0, 100),      # share of the initial stock in stores
+    'store_a_pct': (10, False, 0, 100),   # store demand split
+}
+INTEGER_LEVERS = ('mat_lt', 'semi_lt', 'fp_lt', 'dist_lt', 'order_freq',
+                  'cap_start', 'total_stock', 'store_pct', 'store_a_pct')
+
+
+def perturbations(base, levers=None, rel_step=0.2):
+    """{lever: (low, high)} around base, kept within the lever's bounds.
+
+    store_pct is also capped so the stock split still adds up to 100%.
+    """
+    out = {}
+    for name in levers or LEVERS:
+        step, relative, lo, hi = LEVERS[name]
+        x = base[name]
+        if relative:
+            step = max(step, abs(x) * rel_step)
+        if name == 'store_pct':
+            hi = min(hi, 100 - base.get('wh_pct', 0) - base.get('semi_pct', 0))
+        low, high = max(lo, x - step), min(hi, x + step)
+        if name in INTEGER_LEVERS:
+            low, high = int(round(low)), int(round(high))
+        out[name] = (low, high)
+    return out
+
+
+def sensitivity(base, levers=None, metrics=('margin', 'svc_level'), rel_step=0.2):
+    """Tornado table: each lever moved down and up, the rest as in `base`.
+
+    `base` holds run_simulation arguments plus total_stock and the split
+    percentages (as for the solver). The base point and the 2 x len(levers)
+    perturbed points run as a single batch. Returns (rows, base KPIs): one
+    row per lever, largest swing of the first metric first, holding for
+    each metric m: m_low, m_high (KPI at the low / high value), m_swing
+    (high - low) and m_elasticity ((dKPI / KPI) / (dx / x) between low and
+    high; NaN when the lever or the KPI is 0 at base, or cannot move).
+    """
+    moves = perturbations(base, levers, rel_step)
+    names = list(moves)
+    # Point 0 is the base, then the low and high point of each lever in turn
+    # Float columns whatever the base value's type, so e.g. cap_ramp=0 can move to 0.05
+    cols = {name: np.full(1 + 2 * len(names), base[name], dtype=float) for name in names}
+    for i, name in enumerate(names):
+        cols[name][1 + 2 * i:3 + 2 * i] = moves[name]
+    for name in set(names) & set(INTEGER_LEVERS):
+        cols[name] = cols[name].astype(int)
+    table = evaluate_grid(grid_from_columns(base, cols), base.get('custom_demand'), workers=1)
+    base_kpis = {m: float(table[m][0]) for m in metrics}
+
+    rows = []
+    for i, name in enumerate(names):
+        x, (low, high) = base[name], moves[name]
+        row = {'lever': name, 'base': x, 'low': low, 'high': high}
+        for m in metrics:
+            k0 = base_kpis[m]
+            k_low, k_high = float(table[m][1 + 2 * i]), float(table[m][2 + 2 * i])
+            dx = (high - low) / x if x else 0
+            row[f'{m}_low'], row[f'{m}_high'] = k_low, k_high
+            row[f'{m}_swing'] = k_high - k_low
+            row[f'{m}_elasticity'] = (k_high - k_low) / k0 / dx if k0 and dx else float('nan')
+        rows.append(row)
+    first = metrics[0]
+    rows.sort(key=lambda r: -max(abs(r[f'{first}_low'] - base_kpis[first]),
+                                 abs(r[f'{first}_high'] - base_kpis[first])))
+    return rows, base_kpis
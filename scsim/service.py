@@ -0,0 +1,431 @@
+"""Local simulation service: warm workers, micro-batching and a shared result cache.
+
+    python -m scsim.service --port 8765 --workers 4
+    python -m scsim.service --unix /tmp/scsim.sock --cache /shared/scsim-cache.sqlite
+
+POST /simulate takes one scenario (or a list) in the format of `python -m
+scsim` and answers with its output row(s): the name, the resolved parameters
+and the KPIs; add ?trace=1 for the weekly columns. GET /metrics reports
+throughput, latency percentiles, batch sizes and cache hits; GET /health
+answers once the workers are up.
+
+Requests arriving within `max_wait_ms` of each other are run as one
+run_simulation_batch call per horizon, spread over a spawn process pool that
+is started and warmed before the server listens. Repeated parameter sets are
+answered from an in-memory LRU of rows, and identical requests already in
+flight wait for the same batch. With a DiskCache the physical flows are also
+shared with the app and other replicas (same keys as the app's cache).
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .batch import run_simulation_batch
+from .cache import DiskCache, params_key
+from .cli import resolve
+from .engine import run_simulation
+from .kpis import compute_kpis, compute_kpis_batch
+from .result import SimResult
+from .stochastic import demand_profile
+from .sweep import SIM_ARGS
+from .valuation import ECON_ARGS, STAGE_COSTS, valuate
+
+# Window of recent requests behind the latency percentiles and recent_rps
+RECENT_SECONDS = 10.0
+# Smaller chunks run through the scalar engine: the batch engine's fixed cost
+# only pays off from a few scenarios on
+BATCH_FROM = 4
+
+
+def _econ(p):
+    return (p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'], p['weeks'],
+            p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat'])
+
+
+def _kpi_row(kpis, i=None):
+    """Plain-Python KPI dict (scenario i of a batch's KPI arrays)."""
+    row = {}
+    for k, v in kpis.items():
+        v = v if i is None else v[i]
+        # The 'var_cost' KPI (total variable cost) would shadow the unit cost, as in run_sweep
+        row['var_cost_total' if k == 'var_cost' else k] = v.item() if isinstance(v, np.generic) else v
+    return row
+
+
+def _flows_of(result):
+    """run_simulation output without its cost columns, as simulate_flows returns it."""
+    return SimResult({k: v for k, v in result.cols.items() if k not in STAGE_COSTS},
+                     result.pipes, result.smart_mode)
+
+
+def _run_batch(task):
+    """Worker: one horizon's parameter sets as a single vectorized batch.
+
+    Returns (kpi row, trace columns or None, flows or None) per parameter set.
+    """
+    weeks, batch, trace, keep_flows = task
+    if len(batch) < BATCH_FROM:
+        runs = [run_simulation(**p) for p in batch]
+        rows = [_kpi_row(compute_kpis(s[1:], *_econ(p))) for s, p in zip(runs, batch)]
+    else:
+        args = {k: np.array([p[k] for p in batch]) for k in SIM_ARGS}
+        demand = np.vstack([demand_profile(p) for p in batch])
+        res = run_simulation_batch(weeks, **args, custom_demand=demand)
+        kpis = compute_kpis_batch(res, *_econ({**args, 'weeks': weeks}))
+        rows = [_kpi_row(kpis, i) for i in range(len(batch))]
+        runs = [res.states(i) for i in range(len(batch))] if trace or keep_flows else None
+    return [(row,
+             {k: v.tolist() for k, v in runs[i].cols.items()} if trace else None,
+             _flows_of(runs[i]) if keep_flows else None)
+            for i, row in enumerate(rows)]
+
+
+def _warm():
+    """Pool initializer: pay for the imports and the first batch before serving."""
+    _run_batch((8, [resolve({'weeks': 8})], False, False))
+
+
+class _Request:
+    __slots__ = ('name', 'params', 'trace', 'key', 'future', 't0')
+
+    def __init__(self, name, params, trace):
+        self.name, self.params, self.trace = name, params, trace
+        self.key = (params_key(params), trace)
+        self.future = Future()
+        self.t0 = time.perf_counter()
+
+
+class SimService:
+    """Simulation front end shared by every client of one process.
+
+    submit() resolves a scenario and queues it; a batching thread drains the
+    queue, answers what the caches know and sends the rest to the pool. Use
+    it directly, or behind HTTP with make_server().
+    """
+
+    def __init__(self, workers=None, max_batch=256, max_wait_ms=2.0, cache=None,
+                 memory_entries=4096):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache = cache
+        self.memory_entries = memory_entries
+        self._rows = collections.OrderedDict()   # LRU: request key -> row without name
+        self._inflight = {}                      # request key -> waiting requests
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._counts = collections.Counter()
+        self._batch_sizes = collections.Counter()
+        self._recent = collections.deque(maxlen=100_000)   # (done time, latency ms)
+        # spawn: same reasoning as run_sweep; every worker starts (and warms) now
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_warm)
+        # One chunk per worker at a time: while all are busy, requests queue
+        # up and go out as a bigger batch
+        self._slots = threading.Semaphore(self.workers)
+        for f in [self._pool.submit(int) for _ in range(self.workers)]:
+            f.result()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name='scsim-batcher', daemon=True)
+        self._thread.start()
+
+    # ── client side ──
+
+    def submit(self, spec, trace=False):
+        """Future of the output row of one scenario spec (see scsim.cli).
+
+        Raises ValueError for an invalid spec.
+        """
+        try:
+            params = resolve(spec)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"invalid scenario: {e}") from None
+        req = _Request(str(spec.get('name', '')), params, bool(trace))
+        with self._lock:
+            self._counts['requests'] += 1
+            row = self._rows.get(req.key)
+            if row is not None:
+                # Known answers skip the queue
+                self._rows.move_to_end(req.key)
+                self._counts['memory_hits'] += 1
+                self._finish(req, row)
+                return req.future
+        self._queue.put(req)
+        return req.future
+
+    def run(self, spec, trace=False, timeout=None):
+        """Output row of one scenario, blocking."""
+        return self.submit(spec, trace).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── batching ──
+
+    def _loop(self):
+        while True:
+            req = self._queue.get()
+            if req is None:
+                return
+            batch = [req]
+            # Wait for a free worker; what arrives meanwhile joins this batch
+            self._slots.acquire()
+            self._slots.release()
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    req = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if req is None:
+                    self._queue.put(None)
+                    break
+                batch.append(req)
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                for r in batch:
+                    if not r.future.done():
+                        self._fail([r], e)
+
+    def _dispatch(self, batch):
+        todo = collections.defaultdict(list)   # (weeks, trace) -> params of new keys
+        with self._lock:
+            for r in batch:
+                row = self._rows.get(r.key)
+                if row is not None:
+                    self._rows.move_to_end(r.key)
+                    self._counts['memory_hits'] += 1
+                    self._finish(r, row)
+                elif r.key in self._inflight:
+                    self._counts['coalesced'] += 1
+                    self._inflight[r.key].append(r)
+                else:
+                    self._inflight[r.key] = [r]
+                    todo[r.params['weeks'], r.trace].append(r)
+        for (weeks, trace), reqs in todo.items():
+            if self.cache is not None:
+                reqs = [r for r in reqs if not self._from_disk(r)]
+            # Big batches are split so every worker gets a share
+            step = max(16, -(-len(reqs) // self.workers))
+            for start in range(0, len(reqs), step):
+                chunk = reqs[start:start + step]
+                task = (weeks, [r.params for r in chunk], trace, self.cache is not None)
+                self._slots.acquire()
+                with self._lock:
+                    self._counts['batches'] += 1
+                    self._counts['simulated'] += len(chunk)
+                    self._batch_sizes[len(chunk)] += 1
+                fut = self._pool.submit(_run_batch, task)
+                fut.add_done_callback(lambda f, chunk=chunk: self._done(chunk, f))
+
+    def _flow_key(self, params):
+        return params_key({k: v for k, v in params.items() if k not in ECON_ARGS})
+
+    def _from_disk(self, r):
+        """Answer r from the disk cache's flows if they are there."""
+        flows = self.cache.get(self._flow_key(r.params))
+        if flows is None:
+            return False
+        p = r.params
+        states = valuate(flows, p['var_cost'])
+        row = _kpi_row(compute_kpis(states[1:], *_econ(p)))
+        self._store(r.key, p, row, {k: v.tolist() for k, v in states.cols.items()} if r.trace else None)
+        with self._lock:
+            self._counts['disk_hits'] += 1
+        return True
+
+    def _done(self, chunk, fut):
+        self._slots.release()
+        try:
+            rows = fut.result()
+        except Exception as e:
+            self._fail(chunk, e)
+            return
+        for r, (row, trace, flows) in zip(chunk, rows):
+            if flows is not None:
+                self.cache.put(self._flow_key(r.params), flows)
+            self._store(r.key, r.params, row, trace)
+
+    # ── results ──
+
+    def _store(self, key, params, kpis, trace):
+        row = {**params, **kpis}
+        if trace is not None:
+            row['trace'] = trace
+        with self._lock:
+            self._rows[key] = row
+            while len(self._rows) > self.memory_entries:
+                self._rows.popitem(last=False)
+            for r in self._inflight.pop(key, ()):
+                self._finish(r, row)
+
+    def _finish(self, r, row):
+        # Called with the lock held
+        now = time.perf_counter()
+        self._counts['completed'] += 1
+        self._recent.append((now, (now - r.t0) * 1000))
+        r.future.set_result({'name': r.name, **row})
+
+    def _fail(self, reqs, exc):
+        with self._lock:
+            for r in reqs:
+                for w in self._inflight.pop(r.key, [r]):
+                    self._counts['errors'] += 1
+                    w.future.set_exception(exc)
+
+    # ── metrics ──
+
+    def metrics(self):
+        """Counters, throughput (requests/s) and recent latency percentiles (ms)."""
+        now = time.perf_counter()
+        with self._lock:
+            c = dict(self._counts)
+            recent = [ms for t, ms in self._recent if now - t <= RECENT_SECONDS]
+            sizes = dict(self._batch_sizes)
+        uptime = now - self._started
+        out = {'uptime_s': uptime, 'workers': self.workers,
+               **{k: c.get(k, 0) for k in ('requests', 'completed', 'errors', 'memory_hits',
+                                           'disk_hits', 'coalesced', 'batches', 'simulated')}}
+        out['in_flight'] = out['requests'] - out['completed'] - out['errors']
+        answered = out['memory_hits'] + out['disk_hits'] + out['coalesced'] + out['simulated']
+        out['cache_hit_rate'] = (answered - out['simulated']) / answered if answered else 0.0
+        out['mean_batch'] = out['simulated'] / out['batches'] if out['batches'] else 0.0
+        out['max_batch'] = max(sizes, default=0)
+        out['throughput_rps'] = out['completed'] / uptime if uptime > 0 else 0.0
+        out['recent_rps'] = len(recent) / min(RECENT_SECONDS, uptime) if uptime > 0 else 0.0
+        if recent:
+            p50, p90, p99 = np.percentile(recent, [50, 90, 99])
+            out['latency_ms'] = {'p50': p50, 'p90': p90, 'p99': p99,
+                                 'mean': float(np.mean(recent)), 'max': max(recent)}
+        else:
+            out['latency_ms'] = {}
+        if self.cache is not None:
+            out['disk_cache'] = self.cache.stats()
+        return out
+
+
+# ════════════════════════════════════════════════════════════════
+# HTTP FRONT END — TCP or Unix socket
+# ════════════════════════════════════════════════════════════════
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None   # set on a subclass by make_server
+    # Keep-alive, so clients that reuse a connection skip the handshake
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, doc):
+        body = json.dumps(doc, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/metrics':
+            self._send(200, self.service.metrics())
+        elif path == '/health':
+            self._send(200, {'ok': True, 'workers': self.service.workers})
+        else:
+            self._send(404, {'error': f"no route {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if url.path != '/simulate':
+            self._send(404, {'error': f"no route {url.path}"})
+            return
+        trace = parse_qs(url.query).get('trace', ['0'])[0] not in ('0', 'false', '')
+        try:
+            doc = json.loads(body or b'{}')
+            specs = doc if isinstance(doc, list) else [doc]
+            futures = [self.service.submit(spec, trace) for spec in specs]
+        except (ValueError, AttributeError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        try:
+            rows = [f.result() for f in futures]
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, rows if isinstance(doc, list) else rows[0])
+
+    def log_message(self, format, *args):
+        # One stderr line per request would cost more than a cached answer
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # The handler expects a (host, port) client address
+        return request, ('local', 0)
+
+
+def make_server(service, host='127.0.0.1', port=8765, unix=None):
+    """HTTP server for `service` on host:port, or on the Unix socket path `unix`."""
+    handler = type('Handler', (_Handler,), {'service': service})
+    if unix is None:
+        return ThreadingHTTPServer((host, port), handler)
+    if os.path.exists(unix):
+        os.unlink(unix)
+    return _UnixHTTPServer(unix, handler)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m scsim.service', description=__doc__.splitlines()[0])
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765, help='TCP port (0: any free port)')
+    ap.add_argument('--unix', metavar='PATH', help='listen on this Unix socket instead of TCP')
+    ap.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    ap.add_argument('--max-batch', type=int, default=256, help='most requests per batch')
+    ap.add_argument('--max-wait-ms', type=float, default=2.0,
+                    help='how long a batch waits for more requests')
+    ap.add_argument('--memory-entries', type=int, default=4096, help='rows kept in memory')
+    ap.add_argument('--cache', default=os.environ.get('SCSIM_CACHE'),
+                    help="DiskCache file shared with the app (default: $SCSIM_CACHE; 'off' for none)")
+    args = ap.parse_args(argv)
+
+    cache = DiskCache(args.cache) if args.cache and args.cache != 'off' else None
+    service = SimService(args.workers, args.max_batch, args.max_wait_ms, cache, args.memory_entries)
+    server = make_server(service, args.host, args.port, args.unix)
+    where = args.unix or 'http://%s:%d' % server.server_address[:2]
+    print(f"serving on {where} ({service.workers} workers)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix:
+            os.unlink(args.unix)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
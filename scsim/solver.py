@@ -0,0 +1,226 @@
+import numpy as np
+
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+from .sweep import STOCK_SPLIT, evaluate_grid, grid_from_columns
+
+
+class _Evaluator:
+    """Runs parameter points through the batch engine, memoizing every point."""
+
+    def __init__(self, base):
+        self.base = base
+        self.memo = {}
+        self.batches = 0
+
+    def __call__(self, points):
+        """KPI rows (dicts) for a list of override dicts, in order."""
+        keys = [tuple(sorted(p.items())) for p in points]
+        todo = list(dict.fromkeys(k for k in keys if k not in self.memo))
+        if todo:
+            cols = {name: np.array([dict(k)[name] for k in todo]) for name, _ in todo[0]}
+            table = evaluate_grid(grid_from_columns(self.base, cols),
+                                  self.base.get('custom_demand'), workers=1)
+            self.batches += 1
+            for i, k in enumerate(todo):
+                self.memo[k] = {c: v[i].item() for c, v in table.items()}
+        return [self.memo[k] for k in keys]
+
+
+def kpis_at(base, **overrides):
+    """KPIs of a single point, e.g. kpis_at(base, total_stock=2400)."""
+    return _Evaluator(base)([overrides])[0]
+
+
+def _bisect_min(evaluate, searches, name, grid, target, metric, coarse=17):
+    """Smallest grid value of `name` meeting metric >= target, per search.
+
+    `searches` is a list of fixed overrides, one independent search each; all
+    searches advance in lockstep so every round is a single batch. A coarse
+    scan brackets the first passing point (the metric need not be monotone over
+    the whole range), then bisection narrows the bracket assuming it is
+    monotone inside. Returns the grid index per search, or None if unreachable.
+    """
+    n = len(grid)
+    scan = np.unique(np.linspace(0, n - 1, min(n, coarse)).round().astype(int))
+
+    def passes(pairs):
+        rows = evaluate([dict(fixed, **{name: grid[i].item()}) for fixed, i in pairs])
+        return [r[metric] >= target for r in rows]
+
+    ok = passes([(f, i) for f in searches for i in scan])
+    lo, hi = [], []
+    for s in range(len(searches)):
+        hits = [j for j in range(len(scan)) if ok[s * len(scan) + j]]
+        if not hits:
+            lo.append(None); hi.append(None)
+        else:
+            j = hits[0]
+            hi.append(int(scan[j]))
+            lo.append(int(scan[j - 1]) if j > 0 else -1)
+    while True:
+        active = [s for s in range(len(searches)) if hi[s] is not None and hi[s] - lo[s] > 1]
+        if not active:
+            break
+        mids = [(lo[s] + hi[s]) // 2 for s in active]
+        for s, m, good in zip(active, mids, passes([(searches[s], m) for s, m in zip(active, mids)])):
+            if good:
+                hi[s] = m
+            else:
+                lo[s] = m
+    return hi
+
+
+def _solution(evaluate, fixed, name, grid, idx, metric):
+    if idx is None:
+        return {'feasible': False, name: None, 'value': None, 'kpis': None}
+    value = grid[idx].item()
+    kpis = evaluate([dict(fixed, **{name: value})])[0]
+    return {'feasible': True, name: value, 'value': kpis[metric], 'kpis': kpis}
+
+
+def min_stock_for_target(base, target, metric='svc_level', lo=0, hi=10000, step=50):
+    """Least total initial stock (split as in `base`) reaching metric >= target.
+
+    `base` is the app's params dict plus 'total_stock', 'store_pct', 'wh_pct'
+    and 'semi_pct'. Returns a dict with 'feasible', 'total_stock', the achieved
+    metric 'value', its 'kpis', and 'runs' (distinct simulations evaluated).
+    """
+    evaluate = _Evaluator(base)
+    grid = np.arange(lo, hi + 1, step)
+    fixed = {k: base.get(k, d) for k, d in zip(STOCK_SPLIT, (100, 0, 0))}
+    idx = _bisect_min(evaluate, [fixed], 'total_stock', grid, target, metric)[0]
+    out = _solution(evaluate, fixed, 'total_stock', grid, idx, metric)
+    out['runs'] = len(evaluate.memo)
+    return out
+
+
+def min_capacity_for_target(base, target, metric='svc_level', param='cap_start',
+                            lo=None, hi=None, step=None):
+    """Least 'cap_start' (pcs/wk) or 'cap_ramp' (fraction/wk) reaching the target."""
+    defaults = {'cap_start': (10, 1000, 10), 'cap_ramp': (0.0, 0.5, 0.05)}[param]
+    lo = defaults[0] if lo is None else lo
+    hi = defaults[1] if hi is None else hi
+    step = defaults[2] if step is None else step
+    evaluate = _Evaluator(base)
+    grid = np.round(np.arange(lo, hi + step / 2, step), 6)
+    if param == 'cap_start':
+        grid = grid.astype(int)
+    idx = _bisect_min(evaluate, [{}], param, grid, target, metric)[0]
+    out = _solution(evaluate, {}, param, grid, idx, metric)
+    out['runs'] = len(evaluate.memo)
+    return out
+
+
+def _bisect_below(evaluate, searches, name, grid, bounds, target, metric):
+    """Smallest grid index <= bound meeting the target, per search (None if the bound fails).
+
+    One batch checks every bound; the searches that pass are bisected in
+    lockstep below it, assuming the metric is monotone in `name`.
+    """
+    def passes(pairs):
+        rows = evaluate([dict(fixed, **{name: grid[i].item()}) for fixed, i in pairs])
+        return [r[metric] >= target for r in rows]
+
+    live = [s for s, b in enumerate(bounds) if b >= 0]
+    ok = passes([(searches[s], bounds[s]) for s in live])
+    lo = {s: -1 for s, good in zip(live, ok) if good}
+    hi = {s: bounds[s] for s in lo}
+    while True:
+        active = [s for s in hi if hi[s] - lo[s] > 1]
+        if not active:
+            break
+        mids = [(lo[s] + hi[s]) // 2 for s in active]
+        for s, m, good in zip(active, mids, passes([(searches[s], m) for s, m in zip(active, mids)])):
+            if good:
+                hi[s] = m
+            else:
+                lo[s] = m
+    return [hi.get(s) for s in range(len(searches))]
+
+
+def _unit_value(split):
+    """Stage valorization of one unit of initial stock split as `split` (share of var_cost)."""
+    rm = 100 - split['store_pct'] - split['wh_pct'] - split['semi_pct']
+    return (VALOR_FINISHED * (split['store_pct'] + split['wh_pct'])
+            + VALOR_SEMI * split['semi_pct'] + VALOR_RAW_MAT * rm) / 100
+
+
+def _moves(split, move):
+    """Splits `move` % away from `split`: stock shifted from one stage to another."""
+    stages = list(STOCK_SPLIT) + [None]   # None: raw material, the remainder
+    pct = dict(split)
+    pct[None] = 100 - sum(split.values())
+    out = []
+    for src in stages:
+        for dst in stages:
+            if src != dst and pct[src] >= move:
+                new = dict(pct)
+                new[src] -= move
+                new[dst] += move
+                del new[None]
+                out.append(new)
+    return out
+
+
+def cheapest_split_for_target(base, target, metric='svc_level', split_step=10,
+                              lo=0, hi=10000, step=50):
+    """Cheapest store/warehouse/semi/raw split and total stock reaching the target.
+
+    "Cheapest" is the initial stock's worth at stage valorization (store/WH
+    100%, semi 75%, RM 50%). A coarse-to-fine local search over splits on a
+    `split_step` % grid: from the split in `base`, shifts of 4, 2 and then 1
+    `split_step` between two stages are tried while they improve. Each
+    candidate is first run at the largest total stock that would still beat
+    the best cost so far, and only candidates that pass are bisected below it,
+    so most cost a single run and the whole search takes tens of runs.
+    """
+    evaluate = _Evaluator(base)
+    grid = np.arange(lo, hi + 1, step)
+    top = len(grid) - 1
+
+    def found(splits, bounds):
+        idx = _bisect_below(evaluate, splits, 'total_stock', grid, bounds, target, metric)
+        return [(evaluate([dict(s, total_stock=grid[i].item())])[0]['init_stock_value'], s, i)
+                for s, i in zip(splits, idx) if i is not None]
+
+    # Start from the base split on the grid; if it cannot reach the target,
+    # from the cheapest feasible split of a coarse (50 %) grid
+    snap = {k: int(round(base.get(k, d) / split_step)) * split_step
+            for k, d in zip(STOCK_SPLIT, (100, 0, 0))}
+    while sum(snap.values()) > 100:
+        k = max(snap, key=snap.get)
+        snap[k] -= split_step
+    tried = [snap]
+    hits = found([snap], [top])
+    if not hits:
+        coarse = [s for s in _moves({'store_pct': 0, 'wh_pct': 0, 'semi_pct': 0}, 50)
+                  + _moves({'store_pct': 50, 'wh_pct': 0, 'semi_pct': 0}, 50) if s not in tried]
+        coarse = list({tuple(s.values()): s for s in coarse}.values())
+        tried += coarse
+        hits = found(coarse, [top] * len(coarse))
+    best = min(hits, key=lambda h: h[0]) if hits else None
+
+    move = split_step * 4
+    while best is not None:
+        cands = [s for s in _moves(best[1], move) if s not in tried]
+        tried += cands
+        # Largest stock at which each candidate would still cost less than the best
+        per_unit = best[0] / max(grid[best[2]].item(), 1) / _unit_value(best[1])
+        bounds = [int(np.searchsorted(grid * _unit_value(s) * per_unit, best[0], side='left')) - 1
+                  for s in cands]
+        better = [h for h in found(cands, bounds) if h[0] < best[0]]
+        if better:
+            best = min(better, key=lambda h: h[0])
+        elif move > split_step:
+            move = max(split_step, move // 2 // split_step * split_step)
+        else:
+            break
+
+    if best is None:
+        out = _solution(evaluate, {}, 'total_stock', grid, None, metric)
+    else:
+        out = _solution(evaluate, best[1], 'total_stock', grid, best[2], metric)
+        out.update(best[1])
+        out['init_stock_value'] = best[0]
+    out['runs'] = len(evaluate.memo)
+    return out
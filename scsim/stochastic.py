@@ -0,0 +1,98 @@
+import numpy as np
+
+from .batch import run_simulation_batch, _batch_demand
+from .kpis import compute_kpis_batch
+from .sweep import SIM_ARGS
+
+NOISE_MODELS = ('poisson', 'negbin', 'lognormal')
+FAN_SERIES = ('demand', 'sales', 'missed', 'store_stock')
+# Replications per batch; fixed so a seed gives the same draws at any n
+CHUNK = 2000
+
+
+def demand_profile(params):
+    """Deterministic demand vector (weeks+1,) the engine would use for `params`."""
+    return _batch_demand(params['weeks'], 1, params['base_forecast'], params['demand_mult'],
+                         params['ramp_start'], params['ramp_end'], params.get('custom_demand'))[0]
+
+
+def sample_demand(profile, n, noise='poisson', cv=0.3, rng=None):
+    """n noisy demand paths around `profile`, shape (n, weeks+1), whole units.
+
+    poisson:   Poisson(mean), CV fixed at 1/sqrt(mean)
+    negbin:    negative binomial with the given CV (Poisson where CV is too
+               low for over-dispersion)
+    lognormal: profile x lognormal factor with mean 1 and the given CV
+    Week 0 is left at the profile value (the engine ignores it).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    mu = np.broadcast_to(np.asarray(profile, dtype=float), (n, len(profile)))
+    if noise == 'poisson':
+        out = rng.poisson(mu).astype(float)
+    elif noise == 'negbin':
+        var = (cv * mu) ** 2
+        over = var > mu
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(over, mu ** 2 / (var - mu), 1.0)
+            p = np.where(over, r / (r + mu), 1.0)
+        # Separate streams, so row k's draws do not depend on n (prefix stability)
+        nb_rng, poisson_rng = rng.spawn(2)
+        nb = nb_rng.negative_binomial(r, p).astype(float)
+        out = np.where(over, nb, poisson_rng.poisson(mu))
+    elif noise == 'lognormal':
+        sigma = np.sqrt(np.log1p(cv ** 2))
+        out = np.rint(mu * rng.lognormal(-sigma ** 2 / 2, sigma, size=mu.shape))
+    else:
+        raise ValueError(f"unknown noise model {noise!r}; expected one of {NOISE_MODELS}")
+    out[:, 0] = mu[:, 0]
+    return out
+
+
+class MonteCarloResult:
+    """KPI distribution and weekly fan bands from run_monte_carlo."""
+
+    def __init__(self, kpis, series, quantiles, seed):
+        self.kpis = kpis
+        self.series = series
+        self.quantiles = quantiles
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.kpis['svc_level'])
+
+    def fan(self, name):
+        """(weeks+1, len(quantiles)) array of weekly quantiles of a FAN_SERIES column."""
+        return np.quantile(self.series[name], self.quantiles, axis=0).T
+
+    def prob(self, metric, below):
+        """Share of replications with metric < below, e.g. prob('svc_level', 0.9)."""
+        return float(np.mean(self.kpis[metric] < below))
+
+    def percentiles(self, metric, q=(5, 50, 95)):
+        return dict(zip(q, np.percentile(self.kpis[metric], q).tolist()))
+
+
+def run_monte_carlo(params, n=10000, noise='poisson', cv=0.3, seed=0,
+                    quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Simulate `params` under n noisy demand replications.
+
+    `params` is the app's params dict. Replications run as vectorized batches of
+    CHUNK, each with its own stream spawned from `seed`, so results are
+    reproducible and the first k replications are the same for any n >= k.
+    """
+    profile = demand_profile(params)
+    weeks = params['weeks']
+    streams = np.random.SeedSequence(seed).spawn(-(-n // CHUNK))
+    kpis, series = [], {k: [] for k in FAN_SERIES}
+    for i, ss in enumerate(streams):
+        m = min(CHUNK, n - i * CHUNK)
+        dem = sample_demand(profile, m, noise, cv, np.random.default_rng(ss))
+        res = run_simulation_batch(weeks, **{k: params[k] for k in SIM_ARGS}, custom_demand=dem)
+        kpis.append(compute_kpis_batch(res, params['price'], params['var_cost'], params['fixed_pct'],
+                                       params['base_forecast'], weeks, params['init_store'],
+                                       params['init_cw'], params['init_semi'], params['init_rawmat']))
+        for k in FAN_SERIES:
+            series[k].append(res.rounded(k))
+    return MonteCarloResult({k: np.concatenate([c[k] for c in kpis]) for k in kpis[0]},
+                            {k: np.concatenate(v) for k, v in series.items()},
+                            np.asarray(quantiles), seed)
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import run_simulation_batch
+from .kpis import compute_kpis_batch
+
+# run_simulation arguments besides `weeks` and `custom_demand`
+SIM_ARGS = ('init_store', 'init_cw', 'init_semi', 'init_rawmat',
+            'order_freq', 'mat_lt', 'semi_lt', 'fp_lt', 'dist_lt',
+            'cap_start', 'cap_ramp', 'base_forecast',
+            'demand_mult', 'ramp_start', 'ramp_end',
+            'price', 'var_cost', 'fixed_pct', 'store_a_pct', 'smart_distrib')
+# Derived axes: expanded into run_simulation arguments by expand_grid
+STOCK_SPLIT = ('store_pct', 'wh_pct', 'semi_pct')
+
+
+def split_stock(total_stock, store_pct, wh_pct, semi_pct):
+    """Initial stock per stage from a total and % split, rounded like the sidebar."""
+    total_stock = np.asarray(total_stock)
+    init_store = np.rint(total_stock * np.asarray(store_pct) / 100).astype(int)
+    init_cw = np.rint(total_stock * np.asarray(wh_pct) / 100).astype(int)
+    init_semi = np.rint(total_stock * np.asarray(semi_pct) / 100).astype(int)
+    return init_store, init_cw, init_semi, total_stock - init_store - init_cw - init_semi
+
+
+def split_lead_time(total_lt, mat_lt, semi_lt, fp_lt, dist_lt):
+    """Spread a total lead time over the four stages in the proportions given.
+
+    Semi, finishing and distribution get their rounded share (at least 1 week);
+    material takes the rest, so 6/3/1/1 scaled to 8 gives the Agile 4/2/1/1.
+    """
+    total_lt = np.asarray(total_lt)
+    base = np.asarray(mat_lt) + np.asarray(semi_lt) + np.asarray(fp_lt) + np.asarray(dist_lt)
+    others = [np.maximum(1, np.rint(total_lt * np.asarray(x) / base)).astype(int)
+              for x in (semi_lt, fp_lt, dist_lt)]
+    mat = np.maximum(1, total_lt - sum(others))
+    return (mat, *others)
+
+
+def expand_grid(base, ranges):
+    """Cartesian product of `ranges` on top of the `base` parameters.
+
+    `base` holds run_simulation arguments (as in the app's params dict); it may
+    also give 'total_stock' with 'store_pct'/'wh_pct'/'semi_pct', which are then
+    split into init_* the way the sidebar does. `ranges` maps a parameter name
+    to the values to try; besides run_simulation arguments it accepts
+    'total_stock', the split percentages and 'total_lt' (stage lead times scaled
+    in the base proportions). Returns a dict of equal-length 1-D arrays.
+    """
+    names = list(ranges)
+    axes = np.meshgrid(*[np.asarray(list(ranges[k])) for k in names], indexing='ij')
+    return grid_from_columns(base, {k: a.ravel() for k, a in zip(names, axes)})
+
+
+def grid_from_columns(base, columns):
+    """Broadcast `base` to the length of `columns` (equal-length overrides).
+
+    Derived names in `columns` ('total_stock', the split percentages,
+    'total_lt') are expanded into run_simulation arguments as in expand_grid.
+    """
+    n = len(next(iter(columns.values()))) if columns else 1
+    grid = {k: np.full(n, v) for k, v in base.items()
+            if k != 'custom_demand' and np.ndim(v) == 0}
+    grid.update({k: np.asarray(v) for k, v in columns.items()})
+    if 'total_stock' in grid and (set(columns) & ({'total_stock'} | set(STOCK_SPLIT))
+                                  or 'init_store' not in grid):
+        split = [grid.get(k, np.full(n, d)) for k, d in zip(STOCK_SPLIT, (100, 0, 0))]
+        (grid['init_store'], grid['init_cw'],
+         grid['init_semi'], grid['init_rawmat']) = split_stock(grid['total_stock'], *split)
+    if 'total_lt' in columns:
+        (grid['mat_lt'], grid['semi_lt'],
+         grid['fp_lt'], grid['dist_lt']) = split_lead_time(
+            grid['total_lt'], grid['mat_lt'], grid['semi_lt'], grid['fp_lt'], grid['dist_lt'])
+    return grid
+
+
+def _eval_chunk(task):
+    """Worker: run one chunk of the grid through the batch engine and KPI layer."""
+    weeks, params, custom_demand = task
+    res = run_simulation_batch(weeks, **{k: params[k] for k in SIM_ARGS},
+                               custom_demand=custom_demand)
+    return compute_kpis_batch(res, params['price'], params['var_cost'], params['fixed_pct'],
+                              params['base_forecast'], weeks, params['init_store'],
+                              params['init_cw'], params['init_semi'], params['init_rawmat'])
+
+
+def run_sweep(base, ranges, workers=None, chunk_size=4096):
+    """Evaluate compute_kpis over the grid expand_grid(base, ranges).
+
+    Grid points are cut into chunks (grouped by horizon) and each chunk runs as
+    one vectorized batch; chunks are spread over a process pool using all cores
+    unless `workers` says otherwise. Returns a tidy table as a dict of columns:
+    one row per grid point, parameter columns first, then every KPI (the
+    total variable cost KPI is renamed 'var_cost_total').
+    """
+    return evaluate_grid(expand_grid(base, ranges), base.get('custom_demand'),
+                         workers=workers, chunk_size=chunk_size)
+
+
+def evaluate_grid(grid, custom_demand=None, workers=None, chunk_size=4096):
+    """KPI table for an already expanded grid (see run_sweep).
+
+    Raises ValueError for a grid without rows or missing a column.
+    """
+    missing = [k for k in ('weeks',) + SIM_ARGS if k not in grid]
+    if missing:
+        raise ValueError(f"grid is missing columns {missing}")
+    n = len(grid['weeks'])
+    if n == 0:
+        raise ValueError("grid has no rows")
+    workers = workers or os.cpu_count() or 1
+    # Several chunks per worker so uneven chunks still balance out
+    step = max(256, min(chunk_size, -(-n // (workers * 4))))
+
+    tasks, index = [], []
+    for weeks in np.unique(grid['weeks']):
+        idx = np.flatnonzero(grid['weeks'] == weeks)
+        for start in range(0, len(idx), step):
+            sel = idx[start:start + step]
+            tasks.append((int(weeks), {k: grid[k][sel] for k in SIM_ARGS}, custom_demand))
+            index.append(sel)
+
+    if workers == 1 or len(tasks) == 1:
+        results = map(_eval_chunk, tasks)
+        outputs = list(results)
+    else:
+        # spawn: never fork a process that may be running Streamlit's threads
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx) as ex:
+            outputs = list(ex.map(_eval_chunk, tasks))
+
+    table = dict(grid)
+    for key in outputs[0]:
+        col = np.empty(n, dtype=outputs[0][key].dtype)
+        for sel, out in zip(index, outputs):
+            col[sel] = out[key]
+        # The 'var_cost' KPI (total variable cost) would shadow the unit cost
+        table['var_cost_total' if key == 'var_cost' else key] = col
+    return table
@@ -0,0 +1,41 @@
+import numpy as np
+
+from .constants import VALOR_RAW_MAT, VALOR_SEMI, VALOR_FINISHED
+from .result import SimResult, round1
+
+# ════════════════════════════════════════════════════════════════
+# VALUATION — costs from the unit flows of a simulated run
+# ════════════════════════════════════════════════════════════════
+
+# Arguments that only affect valuation, never the physical flow
+ECON_ARGS = ('price', 'var_cost', 'fixed_pct')
+# Cost column -> (pipe, incremental value per unit as a share of var_cost).
+# Costs are anticipated 1 week: a week books what reaches the end of the
+# stage NEXT week, i.e. the front of its pipe.
+STAGE_COSTS = {
+    'cost_mat': ('mat_pipe', VALOR_RAW_MAT),                 # supplier ships RM: +50%
+    'cost_semi': ('semi_pipe', VALOR_SEMI - VALOR_RAW_MAT),  # semi processing: +25%
+    'cost_fp': ('fp_pipe', VALOR_FINISHED - VALOR_SEMI),     # finishing: +25%
+}
+
+
+def cost_units(flows):
+    """Units costed per week and stage: {cost column: pipe front}."""
+    return {k: flows[pipe][:, 0] for k, (pipe, _) in STAGE_COSTS.items()}
+
+
+def cost_columns(flows, var_cost):
+    """Weekly cost columns for `var_cost`, rounded to 0.1 as the engine reports them."""
+    return {k: round1(units * var_cost * STAGE_COSTS[k][1])
+            for k, units in cost_units(flows).items()}
+
+
+def valuate(flows, var_cost):
+    """The flow SimResult with cost columns for `var_cost` added.
+
+    Shares every other array with `flows`, so re-pricing a cached run costs
+    three vector products instead of a simulation.
+    """
+    cols = dict(flows.cols)
+    cols.update(cost_columns(flows, var_cost))
+    return SimResult(cols, flows.pipes, flows.smart_mode)
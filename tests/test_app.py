@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = str(Path(__file__).resolve().parent.parent / 'app.py')
+W0, MINUS, PLUS, END = range(4)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('SCSIM_CACHE', 'off')
+    monkeypatch.setenv('SCSIM_PROFILE', '1')
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    assert not at.exception
+    return at
+
+
+def week_header(at):
+    return next(m.value for m in at.markdown if "font-size:24px;font-weight:800" in m.value)
+
+
+def test_week_steps_reuse_the_cached_flows(app):
+    log = app.session_state['_profile']
+    first = len(log.records)
+    for week in (1, 2, 3):
+        app.button[PLUS].click().run()
+        assert not app.exception
+        assert app.session_state['week_num'] == week
+        assert f">Week {week} <span" in week_header(app)
+    app.button[MINUS].click().run()
+    assert app.session_state['week_num'] == 2
+    steps = list(log.records)[first:]
+    assert {r['notes']['flows'] for r in steps if r['kind'] == 'run'} == {'memory hit'}
+    assert sum(r['kind'] == 'week_view' for r in steps) == 4
+    assert any(c.value.startswith('Week step ') for c in app.caption)
+
+
+def test_navigation_bounds(app):
+    assert app.button[W0].disabled and app.button[MINUS].disabled
+    app.button[END].click().run()
+    weeks = app.session_state['week_num']
+    assert weeks == 26
+    assert app.button[PLUS].disabled and app.button[END].disabled
+    app.button[W0].click().run()
+    assert app.session_state['week_num'] == 0
+    assert not app.exception
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from scsim import run_simulation, run_simulation_batch
+from scsim.result import COLUMNS, PIPES
+
+BASE = {'weeks': 26, 'init_store': 900, 'init_cw': 300, 'init_semi': 150, 'init_rawmat': 150,
+        'order_freq': 4, 'mat_lt': 6, 'semi_lt': 3, 'fp_lt': 1, 'dist_lt': 1,
+        'cap_start': 100, 'cap_ramp': 0.2, 'base_forecast': 100,
+        'demand_mult': 1.0, 'ramp_start': 1, 'ramp_end': 1,
+        'price': 1000, 'var_cost': 200, 'fixed_pct': 0.45, 'store_a_pct': 50,
+        'smart_distrib': False, 'custom_demand': None}
+PULSE = [0] + [100] * 12 + [300, 300] + [100] * 12
+IRREGULAR = [0] + [50 + (37 * w) % 160 for w in range(1, 53)]
+
+
+def scenario(**overrides):
+    return {**BASE, **overrides}
+
+
+SCENARIOS = [
+    scenario(),
+    scenario(order_freq=1, demand_mult=3.0, ramp_start=1, ramp_end=8),
+    # Non-integer costs and capacity: the cost columns and week-0 caps must still match
+    scenario(var_cost=37.3, cap_start=87.5, cap_ramp=0.17, demand_mult=2.6, ramp_start=2, ramp_end=9),
+    scenario(var_cost=123.45, price=777.7, cap_start=41.25, order_freq=2, store_a_pct=73,
+             smart_distrib=True, custom_demand=PULSE),
+    scenario(weeks=52, mat_lt=12, init_store=0, init_cw=0, init_semi=0, init_rawmat=0,
+             custom_demand=IRREGULAR),
+]
+SIM_ARGS = [k for k in BASE if k not in ('weeks', 'custom_demand')]
+
+
+def assert_same(got, expected, keys=COLUMNS + ('week', 'coverage') + PIPES):
+    for k in keys:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    np.testing.assert_array_equal(got.smart_mode, expected.smart_mode)
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_states_match_scalar(p):
+    assert_same(run_simulation_batch(**p).states(0), run_simulation(**p))
+
+
+def test_scenarios_in_one_batch_match_scalar():
+    ps = [dict(p, weeks=26, custom_demand=IRREGULAR[:27]) for p in SCENARIOS]
+    args = {k: np.array([p[k] for p in ps]) for k in SIM_ARGS}
+    res = run_simulation_batch(26, **args, custom_demand=IRREGULAR[:27])
+    for i, p in enumerate(ps):
+        assert_same(res.states(i), run_simulation(**p))
@@ -0,0 +1,62 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import bench  # noqa: E402
+from scenarios import PRESETS, SCENARIOS  # noqa: E402
+
+KEYS = ('wall_ms', 'wall_min_ms', 'alloc_kib', 'alloc_blocks', 'peak_kib')
+
+
+def doc(**metrics):
+    r = {'wall_ms': 10.0, 'wall_min_ms': 9.0, 'alloc_kib': 100.0, 'alloc_blocks': 50,
+         'peak_kib': 200.0}
+    return {'meta': {}, 'results': {'Agile-Flat/run_simulation': {**r, **metrics}}}
+
+
+def test_nine_presets():
+    assert len(PRESETS) == 9
+    assert set(PRESETS) <= set(SCENARIOS)
+
+
+def test_run_measures_every_target():
+    out = bench.run(repeat=1, only='Agile-Flat')
+    assert sorted(out['results']) == sorted(f'Agile-Flat/{name}' for name in
+                                            ('run_simulation', 'compute_kpis',
+                                             'cumulative_kpis_all_weeks', 'make_sc_html'))
+    for r in out['results'].values():
+        assert set(r) == set(KEYS)
+        assert r['wall_ms'] > 0 and r['peak_kib'] > 0
+    json.dumps(out)
+
+
+@pytest.mark.parametrize('metrics, regressed', [
+    ({}, set()),
+    ({'wall_ms': 12.4}, set()),
+    ({'wall_ms': 13.0}, {'wall_ms'}),
+    # Large relative change but below the absolute noise floor
+    ({'alloc_kib': 0.0}, set()),
+    ({'peak_kib': 300.0, 'alloc_kib': 130.0}, {'peak_kib', 'alloc_kib'}),
+])
+def test_compare_flags_regressions_over_the_tolerance(metrics, regressed):
+    rows = bench.compare(doc(), doc(**metrics), 0.25)
+    assert {metric for _, metric, *_, bad in rows if bad} == regressed
+
+
+def test_compare_floor_ignores_tiny_absolute_changes():
+    base = doc(wall_ms=0.01)
+    assert not any(r[5] for r in bench.compare(base, doc(wall_ms=0.03), 0.25))
+
+
+def test_compare_command_exit_status(tmp_path, capsys):
+    old, new = tmp_path / 'old.json', tmp_path / 'new.json'
+    old.write_text(json.dumps(doc()))
+    new.write_text(json.dumps(doc(wall_ms=20.0)))
+    assert bench.main(['compare', str(old), str(old)]) == 0
+    assert bench.main(['compare', str(old), str(new)]) == 1
+    assert 'REGRESSION Agile-Flat/run_simulation wall_ms' in capsys.readouterr().out
+    assert bench.main(['compare', str(old), str(new), '--tolerance', '1.5']) == 0
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from scsim import compute_kpis, run_simulation
+from scsim.buckets import run_bucketed_simulation
+from scsim.result import COLUMNS, PIPES
+
+from test_batch import SCENARIOS, scenario
+
+RAMP = [0] + [min(300, 100 + 25 * w) for w in range(1, 27)]
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_one_bucket_per_week_matches_weekly_engine(p):
+    expected = run_simulation(**p)
+    got = run_bucketed_simulation(**p, buckets_per_week=1).weekly()
+    for k in COLUMNS + ('week', 'coverage'):
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    for k in PIPES:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    np.testing.assert_array_equal(got.smart_mode, expected.smart_mode)
+    assert compute_kpis(got, p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'],
+                        p['weeks'], p['init_store'], p['init_cw'], p['init_semi'],
+                        p['init_rawmat']) == compute_kpis(
+        expected, p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'], p['weeks'],
+        p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat'])
+
+
+@pytest.mark.parametrize('bpw', [5, 7])
+def test_daily_buckets_split_weekly_demand(bpw):
+    p = scenario(order_freq=1, custom_demand=RAMP)
+    res = run_bucketed_simulation(**p, buckets_per_week=bpw)
+    assert len(res) == p['weeks'] * bpw + 1
+    week = res.weekly()
+    np.testing.assert_array_equal(week['demand'][1:], run_simulation(**p)['demand'][1:])
+    # Every bucket's demand is either sold or missed
+    np.testing.assert_allclose(res['sales'] + res['missed'], res['demand'])
+    assert (res['store_stock'] >= 0).all()
+
+
+def test_bucket_weights_shape_the_week():
+    p = scenario(order_freq=1)
+    res = run_bucketed_simulation(**p, buckets_per_week=5, bucket_weights=[1, 1, 1, 1, 6])
+    by_day = res['demand'][1:].reshape(p['weeks'], 5)
+    assert (by_day[:, 4] > by_day[:, 0]).all()
+    np.testing.assert_array_equal(by_day.sum(axis=1), run_simulation(**p)['demand'][1:])
+
+
+def test_bucket_caps_are_the_applied_split():
+    p = scenario(order_freq=1, cap_start=87.5, cap_ramp=0.17, custom_demand=RAMP)
+    res = run_bucketed_simulation(**p, buckets_per_week=7)
+    week = res.weekly()
+    for k in ('supplier_cap', 'semi_cap', 'fp_cap'):
+        by_day = res[k][1:].reshape(p['weeks'], 7)
+        # Whole units per bucket, adding up to the week's capacity rounded up
+        np.testing.assert_array_equal(by_day, np.round(by_day))
+        np.testing.assert_array_equal(by_day.sum(axis=1), np.ceil(res.week_caps[k][1:]))
+        np.testing.assert_array_equal(week[k], run_simulation(**p)[k], err_msg=k)
+    # No bucket ships more than its cap
+    assert (res['supplier_shipped'] <= res['supplier_cap']).all()
+
+
+@pytest.mark.parametrize('kwargs', [{'order_bucket': 7}, {'bucket_weights': [1, 1]},
+                                    {'bucket_weights': [0] * 7}])
+def test_bad_bucket_options_raise(kwargs):
+    with pytest.raises(ValueError):
+        run_bucketed_simulation(**scenario(), buckets_per_week=7, **kwargs)
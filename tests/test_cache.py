@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+from scsim import run_simulation, simulate_flows
+from scsim.cache import DiskCache, pack, params_key, unpack
+from scsim.valuation import ECON_ARGS
+
+from test_batch import scenario
+
+
+def flow_args(**overrides):
+    return {k: v for k, v in scenario(**overrides).items() if k not in ECON_ARGS}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / 'cache.sqlite'))
+
+
+def test_pack_roundtrip():
+    res = run_simulation(**scenario(order_freq=1, smart_distrib=True, demand_mult=3.0, ramp_end=8))
+    back = unpack(pack(res))
+    for k, v in res.cols.items():
+        np.testing.assert_array_equal(back[k], v, err_msg=k)
+    for k, v in res.pipes.items():
+        np.testing.assert_array_equal(back[k], v, err_msg=k)
+    np.testing.assert_array_equal(back.smart_mode, res.smart_mode)
+
+
+def test_params_key_normalizes_demand():
+    ramp = flow_args()
+    vector = dict(ramp, custom_demand=[0] + [100] * ramp['weeks'], demand_mult=3.0)
+    assert params_key(ramp) == params_key(vector)
+    assert params_key(dict(ramp, cap_start=100.0)) == params_key(ramp)
+    assert params_key(dict(ramp, order_freq=1)) != params_key(ramp)
+
+
+def test_run_hits_after_first_call(cache):
+    p = flow_args(order_freq=2)
+    first = cache.run(simulate_flows, **p)
+    second = cache.run(simulate_flows, **p)
+    np.testing.assert_array_equal(first['sales'], second['sales'])
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['writes'], stats['entries']) == (1, 1, 1, 1)
+    # Shared through the file with another instance
+    assert DiskCache(cache.path).get(params_key(p)) is not None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    blob = len(pack(simulate_flows(**flow_args())))
+    cache = DiskCache(str(tmp_path / 'c.sqlite'), max_bytes=int(blob * 3.5))
+    keys = [f'k{i}' for i in range(4)]
+    for k, freq in zip(keys[:3], (1, 2, 3)):
+        cache.put(k, simulate_flows(**flow_args(order_freq=freq)))
+    assert cache.get('k0') is not None   # k1 is now the least recently used
+    cache.put('k3', simulate_flows(**flow_args(order_freq=4)))
+    assert [cache.get(k) is not None for k in keys] == [True, False, True, True]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lookups_do_not_take_the_write_lock(tmp_path):
+    path = str(tmp_path / 'c.sqlite')
+    cache = DiskCache(path, timeout=0.2)
+    cache.put('k', simulate_flows(**flow_args()))
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")   # another process holding the write lock
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('k') is not None))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [True] * 4
+    finally:
+        writer.execute("ROLLBACK")
+    assert cache.stats()['hits'] == 4
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from scsim import run_simulation
+from scsim.cli import DEFAULTS, load_scenarios, main, resolve, run_scenarios, write_parquet
+
+
+def test_resolve_defaults_and_split():
+    p = resolve({})
+    assert p['weeks'] == DEFAULTS['weeks'] and p['custom_demand'] is None
+    # 1500 pcs split 60 / 20 / 10, the rest raw material
+    assert (p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat']) == (900, 300, 150, 150)
+
+
+def test_resolve_takes_all_init_keys_or_none():
+    init = {'init_store': 500, 'init_cw': 10, 'init_semi': 0, 'init_rawmat': 2.5}
+    p = resolve(init)
+    assert {k: p[k] for k in init} == init
+    # Also when the defaults hold them
+    assert resolve({}, defaults=init)['init_rawmat'] == 2.5
+    with pytest.raises(ValueError, match='init_cw'):
+        resolve({'init_store': 500})
+    with pytest.raises(ValueError, match='init_rawmat'):
+        resolve({'init_semi': 10}, defaults={'init_store': 500, 'init_cw': 10})
+
+
+def test_resolve_demand_forms():
+    assert resolve({'weeks': 4, 'demand': [5, 6, 7, 8]})['custom_demand'] == [0, 5, 6, 7, 8]
+    assert resolve({'weeks': 3, 'demand': 'flat'})['custom_demand'] == [0, 100, 100, 100]
+    ramp = resolve({'weeks': 6, 'demand': {'shape': 'ramp', 'end': 300, 'over': 2}})['custom_demand']
+    assert ramp == [0, 200, 300, 300, 300, 300, 300]
+    assert resolve({'weeks': 2, 'custom_demand': [0, 9.7, 3]})['custom_demand'] == [0, 9, 3]
+
+
+@pytest.mark.parametrize('spec', [
+    {'weeks': 'x'}, {'weeks': 2.5}, {'weeks': 0}, {'mat_lt': '6'}, {'price': None},
+    {'var_cost': float('nan')}, {'smart_distrib': 'yes'}, {'demand': [1, 'x']},
+    {'demand': 7}, {'custom_demand': 'abc'}, {'demand': {'shape': 'flat', 'bogus': 1}},
+    {'demand': {'end': 3}}, {'no_such_key': 1}, ['not', 'a', 'dict'],
+])
+def test_resolve_rejects_bad_values(spec):
+    with pytest.raises((ValueError, KeyError)):
+        resolve(spec)
+
+
+def test_load_scenarios_formats(tmp_path):
+    doc = tmp_path / 'doc.json'
+    doc.write_text(json.dumps({'defaults': {'weeks': 13},
+                               'scenarios': [{'name': 'a'}, {'name': 'b', 'order_freq': 1}]}))
+    lines = tmp_path / 'lines.jsonl'
+    lines.write_text('{"name": "a", "weeks": 13}\n\n{"name": "b", "weeks": 13, "order_freq": 1}\n')
+    assert load_scenarios(str(doc)) == load_scenarios(str(lines))
+    assert [name for name, _ in load_scenarios(str(doc))] == ['a', 'b']
+
+
+def test_bad_scenario_exits_with_error(tmp_path, capsys):
+    path = tmp_path / 's.json'
+    for bad in ([{'name': 'x', 'weeks': 'x'}], [{'demand': [1, 'x']}], [3], {'scenarios': 3}):
+        path.write_text(json.dumps(bad))
+        assert main([str(path)]) == 2
+        assert capsys.readouterr().err.startswith('error: ')
+
+
+def test_rows_hold_params_and_kpis(tmp_path):
+    path = tmp_path / 's.json'
+    path.write_text(json.dumps([{'name': 'base', 'weeks': 13}, {'name': 'agile', 'weeks': 13, 'order_freq': 1}]))
+    out = tmp_path / 'out.jsonl'
+    assert main([str(path), '-o', str(out), '--workers', '1', '--trace']) == 0
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r['name'] for r in rows] == ['base', 'agile']
+    states = run_simulation(**resolve({'weeks': 13, 'order_freq': 1}))
+    assert rows[1]['trace']['sales'] == states['sales'].tolist()
+    assert rows[1]['total_sales'] == float(states['sales'][1:].sum())
+    assert rows[1]['var_cost'] == DEFAULTS['var_cost'] and 'var_cost_total' in rows[1]
+
+
+def test_parquet_schema_holds_across_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    # custom_demand is null in the first row group and a list in the next; cap_start int then float
+    specs = [('a', resolve({'weeks': 4})), ('b', resolve({'weeks': 4, 'cap_start': 80})),
+             ('c', resolve({'weeks': 4, 'demand': [1, 2, 3, 4], 'cap_start': 87.5}))]
+    out = tmp_path / 'out.parquet'
+    assert write_parquet(run_scenarios(specs, trace=True, workers=1), str(out), batch_rows=2) == 3
+    table = pq.read_table(out)
+    assert table.column('name').to_pylist() == ['a', 'b', 'c']
+    assert table.column('custom_demand').to_pylist() == [None, None, [0, 1, 2, 3, 4]]
+    assert table.column('cap_start').to_pylist() == [100.0, 80.0, 87.5]
+    assert table.column('trace.week').to_pylist()[2] == [0, 1, 2, 3, 4]
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+import pytest
+
+from scsim.demand import (SEASONAL, SHAPES, demand_curve, demand_over, demand_vector,
+                          gamma_weights)
+
+# Seasonal radio labels of the original sidebar
+PROFILES = {'very_steep': 'Very Steep', 'steep': 'Steep', 'flat': '~Flat'}
+
+
+def linear_loop(weeks, bf, end, over):
+    """Ramp / drop demand as the sidebar built it, week by week."""
+    out = [0]
+    for w in range(1, weeks + 1):
+        val = bf + (end - bf) * w / over if w <= over else end
+        out.append(max(0, int(round(val))))
+    return out
+
+
+def seasonal_pdf(weeks, profile):
+    ratio, k = SEASONAL[profile]
+    theta = (ratio * weeks) / max(k - 1, 0.1)
+    return [(w ** (k - 1)) * math.exp(-w / theta) / ((theta ** k) * math.gamma(k))
+            for w in range(1, weeks + 1)]
+
+
+def seasonal_loop(weeks, avg, profile):
+    pdf = seasonal_pdf(weeks, profile)
+    total = avg * weeks
+    if sum(pdf) <= 0 or total <= 0:
+        return [0] * (weeks + 1)
+    scale = total / sum(pdf)
+    return [0] + [max(0, int(round(v * scale))) for v in pdf]
+
+
+@pytest.mark.parametrize('weeks', [8, 13, 26, 39, 52])
+def test_vectors_match_the_sidebar_loops(weeks):
+    for end in (0, 30, 100, 250, 1000):
+        for over in (1, 3, weeks // 3, weeks):
+            shape = 'ramp' if end >= 100 else 'drop'
+            assert demand_vector(shape, weeks, 100, end=end, over=over).tolist() == \
+                linear_loop(weeks, 100, end, over), (end, over)
+    for profile in SEASONAL:
+        for avg in (0, 10, 100, 370, 1000):
+            assert demand_vector('seasonal', weeks, 100, avg=avg, profile=profile).tolist() == \
+                seasonal_loop(weeks, avg, profile), (profile, avg)
+
+
+@pytest.mark.parametrize('profile', SEASONAL)
+def test_demand_over_matches_the_recommendation_sum(profile):
+    for weeks in (13, 26, 52):
+        pdf = seasonal_pdf(weeks, profile)
+        scaled = [v * 100 * weeks / (sum(pdf) or 1) for v in pdf]
+        for n in range(weeks + 1):
+            assert demand_over('seasonal', weeks, n, 100, avg=100, profile=profile) == \
+                int(round(sum(scaled[:n]))), (weeks, n)
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_shapes_are_memoized_and_read_only(shape):
+    vec = demand_vector(shape, 26, 100)
+    assert vec.shape == (27,) and vec[0] == 0 and (vec >= 0).all()
+    assert demand_vector(shape, 26, 100) is vec
+    assert demand_curve(shape, 26, 100) is demand_curve(shape, 26.0, 100)
+    with pytest.raises(ValueError):
+        vec[1] = 5
+    assert not gamma_weights(26, 'steep').flags.writeable
+
+
+def test_step_and_pulse():
+    assert demand_vector('step', 6, 100, at=3, end=40).tolist() == [0, 100, 100, 40, 40, 40, 40]
+    assert demand_vector('pulse', 6, 100, start=2, length=2, mult=1.5).tolist() == \
+        [0, 100, 150, 150, 100, 100, 100]
+
+
+@pytest.mark.parametrize('args, opts', [(('zigzag', 26, 100), {}),
+                                        (('ramp', 26, 100), {'avg': 3})])
+def test_unknown_shapes_and_options_raise(args, opts):
+    with pytest.raises(ValueError):
+        demand_vector(*args, **opts)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from scsim import checkpoint, resume_flows, simulate_flows
+from scsim.result import FLOW_COLUMNS, PIPES
+from scsim.valuation import ECON_ARGS
+
+from test_batch import IRREGULAR, scenario
+
+INIT_KEYS = ('init_store', 'init_cw', 'init_semi', 'init_rawmat')
+
+
+def flow_args(**overrides):
+    return {k: v for k, v in scenario(**overrides).items() if k not in ECON_ARGS}
+
+
+def assert_same_flows(got, expected):
+    for k in FLOW_COLUMNS + ('week', 'coverage'):
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    for k in PIPES:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    np.testing.assert_array_equal(got.smart_mode, expected.smart_mode)
+
+
+@pytest.mark.parametrize('init', [(900, 300, 150, 150), (901, 0, 0, 0), (900.5, 300.3, 150.7, 149.25)])
+@pytest.mark.parametrize('spec', [
+    {'order_freq': 1, 'custom_demand': [0] + [min(300, 100 + 25 * w) for w in range(1, 27)]},
+    {'order_freq': 3, 'smart_distrib': True, 'store_a_pct': 70, 'cap_start': 62.5,
+     'custom_demand': IRREGULAR[:27]},
+])
+def test_resume_equals_full_run(spec, init):
+    p = flow_args(**spec, **dict(zip(INIT_KEYS, init)))
+    prev = simulate_flows(**p)
+    for k in range(1, p['weeks'] + 1):
+        demand = list(p['custom_demand'])
+        demand[k:] = [d + 37 for d in demand[k:]]
+        edited = dict(p, custom_demand=demand)
+        assert_same_flows(resume_flows(prev, **edited), simulate_flows(**edited))
+
+
+def test_resume_with_a_fractional_base_forecast():
+    # Reviews before the ramp order against the base forecast, 100.37
+    p = flow_args(order_freq=2, base_forecast=100.37, demand_mult=2.0, ramp_start=10, ramp_end=14)
+    prev = simulate_flows(**p)
+    for mult in (1.5, 2.5):
+        edited = dict(p, demand_mult=mult)
+        assert_same_flows(resume_flows(prev, **edited), simulate_flows(**edited))
+
+
+def test_resume_to_a_longer_or_shorter_horizon():
+    p = flow_args(order_freq=2, custom_demand=[0] + [100] * 26)
+    prev = simulate_flows(**p)
+    for weeks in (13, 26, 39):
+        edited = dict(p, weeks=weeks, custom_demand=None)
+        assert_same_flows(resume_flows(prev, **edited), simulate_flows(**edited))
+
+
+def test_checkpoint_needs_whole_unit_stocks_and_forecast():
+    assert checkpoint(simulate_flows(**flow_args()), 5).week == 5
+    with pytest.raises(ValueError):
+        checkpoint(simulate_flows(**flow_args(init_semi=150.5)), 5)
+    with pytest.raises(ValueError):
+        checkpoint(simulate_flows(**flow_args(base_forecast=100.37)), 5)
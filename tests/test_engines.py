@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+
+from scsim import run_simulation, run_simulation_batch
+from scsim.buckets import run_bucketed_simulation
+from scsim.network import NETWORK_COLUMNS
+from scsim.result import COLUMNS, PIPES
+from scsim.stochastic import demand_profile
+from scsim.sweep import SIM_ARGS
+
+from test_batch import scenario
+from test_network import PAIRS, _two_stores
+
+# The scalar, N-store network and bucketed engines share engine.FlowState's
+# week step, the batch engine has its own; each must reproduce run_simulation
+# exactly on random scenarios
+N_SCENARIOS = 60
+
+
+def random_scenario(rng):
+    weeks = rng.choice([8, 13, 26, 39, 52])
+    p = scenario(
+        weeks=weeks,
+        init_store=rng.choice([0, 450, 541, 900, 2400]),
+        init_cw=rng.choice([0, 180, 300]),
+        init_semi=rng.choice([0, 90, 150]),
+        init_rawmat=rng.choice([0, 90, 150]),
+        order_freq=rng.randint(1, 4),
+        mat_lt=rng.randint(1, 12), semi_lt=rng.randint(1, 6),
+        fp_lt=rng.randint(1, 3), dist_lt=rng.randint(1, 3),
+        cap_start=rng.choice([40, 87.5, 100, 155.25, 400]),
+        cap_ramp=rng.choice([0, 0.05, 0.17, 0.2, 0.5]),
+        var_cost=rng.choice([37.3, 123.45, 200, 512.5]),
+        price=rng.choice([777.7, 1000]),
+        store_a_pct=rng.randint(10, 90),
+        smart_distrib=rng.random() < 0.5,
+    )
+    shape = rng.choice(['flat', 'ramp', 'random'])
+    if shape == 'ramp':
+        start = rng.randint(1, weeks)
+        p.update(demand_mult=rng.choice([0.5, 2.6, 3.0]), ramp_start=start,
+                 ramp_end=rng.randint(start, weeks))
+    elif shape == 'random':
+        p['custom_demand'] = [0] + [rng.randint(0, 400) for _ in range(weeks)]
+    return p
+
+
+SCENARIOS = [random_scenario(random.Random(i)) for i in range(N_SCENARIOS)]
+
+
+def assert_same(got, expected, keys=COLUMNS + ('week', 'coverage')):
+    for k in keys:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_engines_match_run_simulation(p):
+    expected = run_simulation(**p)
+
+    batch = run_simulation_batch(**p).states(0)
+    assert_same(batch, expected, COLUMNS + ('week', 'coverage') + PIPES)
+    np.testing.assert_array_equal(batch.smart_mode, expected.smart_mode)
+
+    weekly = run_bucketed_simulation(**p, buckets_per_week=1).weekly()
+    assert_same(weekly, expected, COLUMNS + ('week', 'coverage') + PIPES)
+    np.testing.assert_array_equal(weekly.smart_mode, expected.smart_mode)
+
+    net = _two_stores(p)
+    assert_same(net, expected, NETWORK_COLUMNS)
+    for k, (a, b) in PAIRS.items():
+        np.testing.assert_array_equal(net.stores[k][:, 0], expected[a], err_msg=k)
+        np.testing.assert_array_equal(net.stores[k][:, 1], expected[b], err_msg=k)
+    np.testing.assert_array_equal(net.smart_mode, expected.smart_mode)
+
+
+def test_one_batch_of_mixed_scenarios():
+    ps = [dict(p, weeks=8, custom_demand=demand_profile(p)[:9].tolist()) for p in SCENARIOS]
+    args = {k: np.array([p[k] for p in ps]) for k in SIM_ARGS}
+    res = run_simulation_batch(8, **args, custom_demand=np.vstack([p['custom_demand'] for p in ps]))
+    for i, p in enumerate(ps):
+        assert_same(res.states(i), run_simulation(**p))
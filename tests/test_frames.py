@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from scsim import run_simulation, run_network_simulation
+from scsim.frames import chart_frames, long_format, store_frame, week_table
+
+from test_batch import SCENARIOS, scenario
+
+
+def table_rows(states, price):
+    """The week table as the app used to build it, one dict per week record."""
+    rows = []
+    for s in states:
+        wk_rev = s['sales'] * price
+        wk_vc = s['cost_mat'] + s['cost_semi'] + s['cost_fp']
+        rows.append({
+            'Week': s['week'],
+            'Demand': s['demand'], 'Dem A': s['demand_a'], 'Dem B': s['demand_b'],
+            'Sales': s['sales'], 'Sales A': s['sales_a'], 'Sales B': s['sales_b'],
+            'Missed': s['missed'], 'Miss A': s['missed_a'], 'Miss B': s['missed_b'],
+            'Stk A': s['store_a'], 'Stk B': s['store_b'],
+            'Alloc A': s['alloc_a'], 'Alloc B': s['alloc_b'],
+            'CW Wait': s['cw_stock'], 'CW Pipe': s['cw_shipped'],
+            'FP Pipe': round(sum(s['fp_pipe']), 1),
+            'Semi Wait': s['semi_stock'], 'Semi Pipe': round(sum(s['semi_pipe']), 1),
+            'RM Wait': s['raw_mat_stock'], 'Mat Pipe': round(sum(s['mat_pipe']), 1),
+            'WIP': s['wip_total'], 'Order': s['order'], 'Pending': s['pending'],
+            'Sup Cap': s['supplier_cap'],
+            'Revenue': round(wk_rev), 'Cost RM': round(s['cost_mat']),
+            'Cost Semi': round(s['cost_semi']), 'Cost FP': round(s['cost_fp']),
+            'Tot VC': round(wk_vc), 'Margin': round(wk_rev - wk_vc),
+        })
+    return rows
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_week_table_matches_row_by_row_build(p):
+    res = run_simulation(**p)
+    table = week_table(res, p['price'])
+    expected = table_rows(res, p['price'])
+    assert list(table) == list(expected[0])
+    for label, col in table.items():
+        assert len(col) == len(res)
+        assert col.tolist() == [r[label] for r in expected], label
+    assert week_table(res, p['price']) is table
+
+
+def test_chart_frames_match_row_by_row_build():
+    p = SCENARIOS[3]
+    res = run_simulation(**p)
+    frames = chart_frames(res)
+    rows = []
+    for s in list(res)[1:]:
+        rows += [(s['week'], 'Fill A', 'Sales A', s['sales_a']), (s['week'], 'Fill A', 'Lost A', s['missed_a']),
+                 (s['week'], 'Fill B', 'Sales B', s['sales_b']), (s['week'], 'Fill B', 'Lost B', s['missed_b'])]
+    f = frames['fulfillment']
+    assert list(zip(f['Week'].tolist(), f['Group'], f['Component'], f['Value'].tolist())) == rows
+    assert frames['demand']['Week'].tolist() == list(range(1, len(res)))
+    np.testing.assert_array_equal(frames['stocks']['Store A'], res['store_a'])
+    assert chart_frames(res) is frames
+
+
+def test_long_format_is_week_major():
+    out = long_format(np.array([1, 2]), [[10, 20], [30, 40]], ['a', 'b'])
+    assert out['Week'].tolist() == [1, 1, 2, 2]
+    assert out['Component'].tolist() == ['a', 'b', 'a', 'b']
+    assert out['Value'].tolist() == [10, 20, 30, 40]
+
+
+def test_store_frame_has_a_row_per_store_and_week():
+    p = scenario(weeks=12)
+    net = run_network_simulation(**{k: v for k, v in p.items() if k != 'store_a_pct'},
+                                 store_shares=[1, 2, 3])
+    out = store_frame(net, 'stock')
+    assert len(out['Week']) == 13 * 3
+    assert out['Store'][:3].tolist() == ['Store 1', 'Store 2', 'Store 3']
+    np.testing.assert_array_equal(out['Stock'].reshape(13, 3), net.stores['stock'])
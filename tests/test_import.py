@@ -0,0 +1,22 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = """
+import sys
+import scsim
+scsim.run_simulation(weeks=4, init_store=900, init_cw=300, init_semi=150, init_rawmat=150,
+                     order_freq=1, mat_lt=2, semi_lt=1, fp_lt=1, dist_lt=1,
+                     cap_start=100, cap_ramp=0.2, base_forecast=100,
+                     demand_mult=1.0, ramp_start=1, ramp_end=1,
+                     price=1000, var_cost=200, fixed_pct=0.45, store_a_pct=50, smart_distrib=False)
+print(sorted(m for m in ('streamlit', 'pandas', 'altair') if m in sys.modules))
+"""
+
+
+def test_import_and_run_load_no_ui_dependency():
+    out = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, capture_output=True,
+                         text=True, check=True)
+    assert out.stdout.strip() == '[]'
@@ -0,0 +1,100 @@
+import collections
+import io
+import random
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from scsim.ingest import MAX_DEMAND, load_demand, read_demand  # noqa: E402
+
+
+def random_rows(n=600, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        rows.append({'Store': rng.choice(['S1', 'S2', 'S3']), 'SKU': rng.choice(['a', 'b']),
+                     'Week': rng.choice([1, 2, 3, 5, 8, 13, 0, -1, 2.5, None]),
+                     'Qty': rng.choice([0, 7, 40.4, 40.6, 120, -3, 20000, None])})
+    return rows
+
+
+def naive(rows):
+    """(store, sku) -> {week: units}, row by row."""
+    out = collections.defaultdict(collections.Counter)
+    for r in rows:
+        w = r['Week']
+        if w is None or w < 1 or w != int(w):
+            continue
+        q = 0 if r['Qty'] is None else min(max(round(r['Qty']), 0), MAX_DEMAND)
+        out[r['Store'], r['SKU']][int(w)] += q
+    return out
+
+
+def to_csv(rows):
+    return pd.DataFrame(rows).to_csv(index=False).encode()
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 100, 200_000])
+def test_history_matches_a_row_by_row_read(chunk_rows):
+    rows = random_rows()
+    hist = read_demand(to_csv(rows), chunk_rows=chunk_rows)
+    expected = naive(rows)
+    assert sorted(hist.keys) == sorted(expected)
+    assert hist.weeks == 13
+    for key, weeks in expected.items():
+        row = hist.matrix[hist.keys.index(key)]
+        assert row[0] == 0
+        assert {w: int(v) for w, v in enumerate(row) if v} == {w: v for w, v in weeks.items() if v}
+    assert hist.stats['rows'] == len(rows)
+    assert hist.stats['rows_used'] + hist.stats['bad_week'] == len(rows)
+    assert hist.stats['clipped'] == sum(1 for r in rows if r['Qty'] in (-3, 20000)
+                                        and r['Week'] in (1, 2, 3, 5, 8, 13))
+
+
+def test_parquet_reads_like_csv(tmp_path):
+    pytest.importorskip('pyarrow')
+    rows = random_rows(seed=1)
+    path = tmp_path / 'demand.parquet'
+    pd.DataFrame(rows).to_parquet(path)
+    a, b = read_demand(str(path), chunk_rows=50), read_demand(to_csv(rows))
+    assert sorted(a.keys) == sorted(b.keys)
+    for key in a.keys:
+        np.testing.assert_array_equal(a.matrix[a.keys.index(key)], b.matrix[b.keys.index(key)])
+    assert read_demand(path.read_bytes()).keys == a.keys
+
+
+def test_dates_count_weeks_from_the_earliest():
+    csv = b"date,units\n2024-01-03,5\n2024-01-09,6\n2024-01-10,7\nnot a date,9\n2024-01-24,1\n"
+    hist = read_demand(csv)
+    assert hist.series().tolist() == [0, 11, 7, 0, 1]
+    assert str(hist.start_date) == '2024-01-03'
+    assert hist.stats['bad_week'] == 1
+
+
+def test_series_window_and_splits():
+    rows = [{'store': s, 'sku': k, 'week': w, 'demand': 10 * i + w}
+            for i, (s, k) in enumerate([('A', 'x'), ('A', 'y'), ('B', 'x')]) for w in range(1, 5)]
+    hist = read_demand(to_csv(rows))
+    assert hist.stores == ['A', 'B'] and hist.skus == ['x', 'y']
+    assert hist.series(store='A').tolist() == [0, 12, 14, 16, 18]
+    assert hist.window(start=2, weeks=2, sku='x').tolist() == [0, 24, 26]
+    stores, by_store = hist.by_store()
+    assert by_store.shape == (5, 2)
+    np.testing.assert_array_equal(by_store.sum(axis=1), hist.series())
+    skus, by_sku = hist.by_sku(store='A')
+    assert skus == ['x', 'y'] and by_sku[:, 1].tolist() == [1, 11]
+
+
+def test_missing_columns_and_long_histories_raise():
+    with pytest.raises(ValueError, match='demand column'):
+        read_demand(b"week,price\n1,3\n")
+    with pytest.raises(ValueError, match='max_weeks'):
+        read_demand(b"week,qty\n202401,3\n")
+
+
+def test_load_demand_memoizes_by_content():
+    data = to_csv(random_rows(50, seed=2))
+    assert load_demand(data) is load_demand(bytes(data))
+    assert load_demand(data, chunk_rows=10) is not load_demand(data)
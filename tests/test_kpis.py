@@ -0,0 +1,41 @@
+import pytest
+
+from scsim import compute_kpis, cumulative_kpis, run_simulation
+
+from test_batch import scenario
+from test_result import BASELINE
+
+KPI_ARGS = ('price', 'var_cost', 'fixed_pct', 'base_forecast', 'weeks',
+            'init_store', 'init_cw', 'init_semi', 'init_rawmat')
+
+
+def kpi_args(p):
+    return [p[k] for k in KPI_ARGS]
+
+
+@pytest.mark.parametrize('case', BASELINE)
+def test_kpis_match_list_of_dicts_engine(case):
+    p = case['params']
+    res = run_simulation(**p)
+    assert compute_kpis(res, *kpi_args(p)) == case['kpis']
+    for week, expected in case['cumulative'].items():
+        assert cumulative_kpis(res[1:], int(week), *kpi_args(p)) == expected
+
+
+def test_cumulative_kpis_equal_a_plain_sum_at_every_week():
+    p = scenario(weeks=40, order_freq=2, demand_mult=3.2, ramp_start=3, ramp_end=12)
+    states = run_simulation(**p)[1:]
+    rows = list(states)
+    for week in range(len(rows) + 1):
+        sub = rows[:week]
+        got = cumulative_kpis(states, week, *kpi_args(p))
+        for k in ('sales', 'missed', 'demand', 'missed_a', 'missed_b'):
+            assert got[k] == sum(s[k] for s in sub), (week, k)
+        assert got['stockout_wks'] == sum(s['missed'] > 0.5 for s in sub)
+
+
+def test_prefix_is_computed_once():
+    res = run_simulation(**scenario())
+    assert res.prefix('sales') is res.prefix('sales')
+    assert res.prefix('sales')[0] == 0
+    assert res.prefix('stockout')[-1] == (res['missed'] > 0.5).sum()
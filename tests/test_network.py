@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from scsim import compute_kpis, compute_network_kpis, run_network_simulation, run_simulation
+from scsim.network import NETWORK_COLUMNS, apportion, normalize_shares, water_fill
+
+from test_batch import scenario
+
+# Per-store matrix -> the 2-store engine's (store A, store B) columns
+PAIRS = {'stock': ('store_a', 'store_b'), 'sales': ('sales_a', 'sales_b'),
+         'missed': ('missed_a', 'missed_b'), 'demand': ('demand_a', 'demand_b'),
+         'alloc': ('alloc_a', 'alloc_b'), 'dist_arr': ('dist_arr_a', 'dist_arr_b')}
+SCENARIOS = [
+    scenario(),
+    scenario(order_freq=1, store_a_pct=70, smart_distrib=True,
+             custom_demand=[0] + [min(300, 100 + 25 * w) for w in range(1, 27)]),
+    # Non-integer costs and capacity
+    scenario(var_cost=37.3, cap_start=87.5, cap_ramp=0.17, store_a_pct=35, smart_distrib=True,
+             order_freq=2, init_store=541, init_cw=180, init_semi=90, init_rawmat=90,
+             custom_demand=[0] + [100] * 13 + [300, 300] + [100] * 11),
+]
+
+
+def _econ(p):
+    return (p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'], p['weeks'],
+            p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat'])
+
+
+def _two_stores(p):
+    q = dict(p)
+    pct = q.pop('store_a_pct')
+    return run_network_simulation(**q, store_shares=[pct, 100 - pct])
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_two_stores_reproduce_run_simulation(p):
+    expected = run_simulation(**p)
+    got = _two_stores(p)
+    for k in NETWORK_COLUMNS:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+    for k, (a, b) in PAIRS.items():
+        np.testing.assert_array_equal(got.stores[k][:, 0], expected[a], err_msg=k)
+        np.testing.assert_array_equal(got.stores[k][:, 1], expected[b], err_msg=k)
+    np.testing.assert_array_equal(got.smart_mode, expected.smart_mode)
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_two_store_kpis_match_compute_kpis(p):
+    expected = compute_kpis(run_simulation(**p)[1:], *_econ(p))
+    got = compute_network_kpis(_two_stores(p), *_econ(p))
+    for k, v in expected.items():
+        if k in got:
+            assert got[k] == v, k
+    np.testing.assert_array_equal(got['store_sales'], [expected['sales_a'], expected['sales_b']])
+
+
+def test_store_flows_add_up():
+    p = scenario(order_freq=1, smart_distrib=True, weeks=39,
+                 custom_demand=[0] + [min(400, 100 + 25 * w) for w in range(1, 40)])
+    p.pop('store_a_pct')
+    res = run_network_simulation(**p, store_shares=np.arange(1, 51))
+    np.testing.assert_array_equal(res.stores['sales'].sum(axis=1), res['sales'])
+    np.testing.assert_array_equal(res.stores['demand'].sum(axis=1), res['demand'])
+    # Demand = sales + missed, store by store
+    np.testing.assert_allclose(res.stores['sales'] + res.stores['missed'], res.stores['demand'])
+
+
+def test_apportion_and_water_fill():
+    shares = normalize_shares([60, 40])
+    assert apportion(7, shares).tolist() == [4, 3]
+    parts = apportion(101, normalize_shares([1, 1, 1]))
+    assert parts.sum() == 101 and parts.max() - parts.min() <= 1
+    prio, order = water_fill(np.array([1.0, 3.0, 2.0]), np.array([10.0, 10.0, 10.0]), 15)
+    assert prio.tolist() == [13, 0, 2] and order.tolist() == [0, 2, 1]
+    with pytest.raises(ValueError):
+        normalize_shares([0, 0])
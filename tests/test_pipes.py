@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from scsim import run_simulation
+from scsim.pipes import Pipe
+
+from test_batch import scenario
+
+
+@pytest.mark.parametrize('length', [1, 2, 5, 24])
+def test_pipe_matches_shifting_list(length):
+    rng = random.Random(length)
+    pipe, ref = Pipe(length), [0.0] * length
+    for _ in range(100):
+        qty = float(rng.randint(0, 500))
+        assert pipe.front == ref[0]
+        assert pipe.pop() == ref[0]
+        pipe.push(qty)
+        ref = ref[1:] + [qty]
+        assert pipe.to_list() == ref
+        assert pipe.total == sum(ref)
+        assert len(pipe) == length
+
+
+def test_zero_lead_time_keeps_one_slot():
+    assert len(Pipe(0)) == 1
+
+
+def test_long_lead_times_keep_pipes_full_length():
+    res = run_simulation(**scenario(weeks=60, mat_lt=40, semi_lt=30, fp_lt=20, dist_lt=10))
+    assert res['mat_pipe'].shape == (61, 40)
+    assert res['dist_pipe_a'].shape == (61, 10)
+    # WIP is what the pipes hold plus the upstream stocks and the backlog
+    held = sum(res[k].sum(axis=1) for k in ('mat_pipe', 'semi_pipe', 'fp_pipe',
+                                             'dist_pipe_a', 'dist_pipe_b'))
+    held += res['raw_mat_stock'] + res['semi_stock'] + res['cw_stock'] + res['backlog']
+    np.testing.assert_allclose(res['wip_total'][1:], held[1:], atol=1.0)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from scsim import compute_kpis, run_simulation, run_simulation_batch
+from scsim.portfolio import (SharedCapacity, fair_share, priority_share, ramp_capacity,
+                             run_portfolio)
+from scsim.result import COLUMNS
+from scsim.sweep import SIM_ARGS
+
+from test_batch import scenario
+
+BASE = scenario(order_freq=1, var_cost=37.3, cap_start=300)
+BASE.pop('custom_demand')
+SKUS = {'base_forecast': [100, 60, 30], 'total_stock': [1500, 600, 0]}
+
+
+def test_priority_share_serves_in_order():
+    request = np.array([50.0, 30.0, 40.0])
+    assert priority_share(request, 70, np.array([2, 0, 1])).tolist() == [0, 30, 40]
+    assert priority_share(request, 500, np.array([0, 1, 2])).tolist() == [50, 30, 40]
+
+
+def test_fair_share_is_max_min_fair():
+    request = np.array([10.0, 50.0, 50.0])
+    out = fair_share(request, 61, np.ones(3))
+    assert out.tolist() == [10, 26, 25]
+    assert fair_share(request, 200, np.ones(3)) is request
+    weighted = fair_share(np.array([100.0, 100.0]), 90, np.array([2.0, 1.0]))
+    assert weighted.tolist() == [60, 30]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_shares_use_the_pool_in_whole_units(seed):
+    rng = np.random.default_rng(seed)
+    request = rng.integers(0, 100, 6).astype(float)
+    cap = float(rng.integers(0, 400))
+    for out in (fair_share(request, cap, rng.uniform(0.5, 2, 6)),
+                priority_share(request, cap, rng.permutation(6))):
+        assert (out >= 0).all() and (out <= request).all()
+        assert (out == np.floor(out)).all()
+        assert out.sum() == min(cap, request.sum())
+
+
+def test_ramp_capacity_steps_like_a_stage():
+    cap = ramp_capacity(30, 100, 0.5)
+    assert cap[:3].tolist() == [100, 100, 150]
+    assert cap.max() == 1000
+
+
+def test_unconstrained_pools_match_the_batch_engine():
+    port = run_portfolio(BASE, SKUS, {})
+    grid = port.grid
+    alone = run_simulation_batch(26, *[grid[k] for k in SIM_ARGS])
+    for k in COLUMNS:
+        np.testing.assert_array_equal(port[k], alone[k], err_msg=k)
+    # ... and each SKU its own run_simulation
+    for i in range(3):
+        p = {'weeks': 26, **{k: grid[k][i].item() for k in SIM_ARGS}}
+        res = run_simulation(**p)
+        np.testing.assert_array_equal(port.batch.rounded('sales')[i][1:], res['sales'][1:])
+        kpis = compute_kpis(res, p['price'], p['var_cost'], p['fixed_pct'], p['base_forecast'],
+                            26, p['init_store'], p['init_cw'], p['init_semi'], p['init_rawmat'])
+        sku = port.sku_kpis()
+        assert {k: sku[k][i] for k in kpis} == kpis
+
+
+@pytest.mark.parametrize('rule', ['fair', 'priority'])
+def test_pools_bound_the_flow(rule):
+    port = run_portfolio(BASE, SKUS, {'semi': 120, 'fp': ramp_capacity(26, 80, 0.1)}, rule=rule)
+    semi = port['semi_input'].sum(axis=0)
+    assert (semi[1:] <= 120).all() and semi.max() == 120
+    assert (port['fp_input'].sum(axis=0) <= ramp_capacity(26, 80, 0.1)).all()
+    np.testing.assert_array_equal(port.shared.used['semi'][1:], semi[1:])
+    kpis = port.kpis()
+    assert kpis['total_sales'] == pytest.approx(port.sku_kpis()['total_sales'].sum())
+    assert 0 < kpis['semi_utilization'] <= 1
+    assert 'supplier_utilization' not in kpis
+
+
+def test_priority_favours_the_first_sku():
+    fair = run_portfolio(BASE, SKUS, {'semi': 60}, rule='fair').sku_kpis()
+    prio = run_portfolio(BASE, SKUS, {'semi': 60}, rule='priority', priority=[0, 1, 2]).sku_kpis()
+    assert prio['total_sales'][0] > fair['total_sales'][0]
+
+
+@pytest.mark.parametrize('kwargs', [{'rule': 'fifo'}, {'capacity': {'dc': 10}}])
+def test_bad_options_raise(kwargs):
+    with pytest.raises(ValueError):
+        SharedCapacity(26, kwargs.pop('capacity', {}), **kwargs)
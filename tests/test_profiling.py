@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+
+from scsim.profiling import PhaseTimer, ProfileLog
+
+
+class FakeClock:
+    def __init__(self, *times):
+        self.times = list(times)
+
+    def __call__(self):
+        return self.times.pop(0)
+
+
+def test_phases_split_the_run():
+    t = PhaseTimer('run', clock=FakeClock(0.0, 0.010, 0.025, 0.030, 0.040))
+    t.phase('setup')
+    t.phase('simulate')
+    t.phase('setup')
+    t.note('flows', 'memory hit')
+    rec = t.finish()
+    assert rec['kind'] == 'run'
+    assert rec['phases'] == pytest.approx({'setup': 25.0, 'simulate': 5.0})
+    assert rec['total_ms'] == pytest.approx(40.0)
+    assert rec['notes'] == {'flows': 'memory hit'}
+
+
+def record(kind, total, flows=None, **phases):
+    return {'kind': kind, 'time': 0.0, 'total_ms': total, 'phases': phases,
+            'notes': {} if flows is None else {'flows': flows}}
+
+
+def test_summary_and_lookups():
+    log = ProfileLog(size=50)
+    for i in range(1, 21):
+        log.add(record('run', 10.0 * i, 'memory hit' if i % 4 else 'simulated', kpis=float(i)))
+    log.add(record('week_view', 3.0))
+    rows = {(r['kind'], r['phase']): r for r in log.summary()}
+    total = rows['run', 'total']
+    assert total['runs'] == 20 and total['last_ms'] == 200.0
+    assert total['p50_ms'] == pytest.approx(105.0)
+    assert total['p95_ms'] == pytest.approx(190.5)
+    assert rows['run', 'kpis']['mean_ms'] == pytest.approx(10.5)
+    assert log.last('week_view')['total_ms'] == 3.0
+    assert log.last('sweep') is None
+    assert log.note_counts('flows') == {'memory hit': 15, 'simulated': 5}
+
+
+def test_history_is_bounded():
+    log = ProfileLog(size=3)
+    for i in range(10):
+        log.add(record('run', float(i)))
+    assert [r['total_ms'] for r in log.records] == [7.0, 8.0, 9.0]
+
+
+def test_sink_and_logger(tmp_path, caplog):
+    sink = tmp_path / 'profile.jsonl'
+    log = ProfileLog(sink=str(sink))
+    with caplog.at_level(logging.DEBUG, logger='scsim.profile'):
+        log.add(record('run', 12.5, 'simulated', simulate=10.0))
+        log.add(record('week_view', 2.0))
+    lines = [json.loads(x) for x in sink.read_text().splitlines()]
+    assert [r['kind'] for r in lines] == ['run', 'week_view']
+    assert lines[0]['phases'] == {'simulate': 10.0}
+    assert 'run 12.5 ms' in caplog.text
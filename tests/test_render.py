@@ -0,0 +1,52 @@
+import html
+import json
+import re
+
+import pytest
+
+from scsim import make_playback_html, make_sc_html, run_simulation
+from scsim.render import playback_frames
+
+from test_batch import scenario
+
+SCENARIOS = [
+    scenario(weeks=20),
+    scenario(order_freq=1, smart_distrib=True, store_a_pct=70, mat_lt=3, dist_lt=2,
+             custom_demand=[0] + [min(260, 100 + 25 * w) for w in range(1, 27)]),
+]
+BOUND = re.compile(r'<\w+ [^<>]*data-b="(\w+)" data-k="(\w+)"[^<>]*>([^<]*)')
+
+
+def drawn(kind, v):
+    """Text the playback script writes for a bound value (None: it only restyles)."""
+    if kind == 'num':
+        return f'{v:.0f}'
+    if kind == 'box':
+        return f'{v:.0f}' if v > 0.5 else ''
+    if kind == 'text':
+        return v
+    return None
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_frames_redraw_what_the_server_renders(p):
+    res = run_simulation(**p)
+    frames = playback_frames(res)
+    assert all(len(v) == len(res) for v in frames.values())
+    for w in range(len(res)):
+        bound = BOUND.findall(make_sc_html(res[w], p, bind=True))
+        assert bound
+        for key, kind, text in bound:
+            expected = drawn(kind, frames[key][w])
+            if expected is not None:
+                assert html.unescape(text).strip() == expected, (w, key)
+
+
+def test_playback_html_embeds_every_week():
+    p = SCENARIOS[1]
+    res = run_simulation(**p)
+    page = make_playback_html(res, p, week=99)
+    assert 'max="26" value="26"' in page
+    data = re.search(r'var D=(\{.*?\}), N=26, w=26', page).group(1)
+    assert json.loads(data.replace('<\\/', '</')) == playback_frames(res)
+    assert make_sc_html(res[26], p, bind=True) in page
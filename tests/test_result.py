@@ -0,0 +1,76 @@
+import json
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from scsim import run_simulation
+from scsim.result import COLUMNS, PIPES, pipe_history, round1
+
+from test_batch import scenario
+
+# Week records, compute_kpis and cumulative_kpis from the original
+# list-of-dicts engine in app.py, recorded before the columnar rewrite
+BASELINE = json.loads((Path(__file__).parent / 'data' / 'baseline_runs.json').read_text())
+
+
+@pytest.mark.parametrize('case', BASELINE)
+def test_rows_match_list_of_dicts_engine(case):
+    res = run_simulation(**case['params'])
+    assert len(res) == len(case['states'])
+    for w, expected in enumerate(case['states']):
+        assert res[w] == expected, w
+    assert [s['comment'] for s in res] == [s['comment'] for s in case['states']]
+
+
+def test_comment_uses_the_reported_values():
+    # Store stock 679.45 per store at week 0; 629.45 after a week's sales
+    res = run_simulation(**scenario(weeks=4, init_store=1358.9))
+    s = res[1]
+    assert s['store_a'] == 629.5
+    assert s['comment'].startswith("A: sold 50/50, stk 630. B: sold 50/50, stk 630.")
+
+
+def test_columns_and_pipes_have_one_row_per_week():
+    res = run_simulation(**scenario(weeks=30, mat_lt=5))
+    for k in COLUMNS:
+        assert res[k].shape == (31,), k
+    assert res['mat_pipe'].shape == (31, 5)
+    assert res['week'].dtype.kind == 'i'
+    assert res.row(4)['mat_pipe'] == res['mat_pipe'][4].tolist()
+
+
+def test_slice_shares_the_arrays():
+    res = run_simulation(**scenario(weeks=30))
+    part = res[5:12]
+    assert len(part) == 7
+    assert part[0] == res[5]
+    assert np.shares_memory(part['sales'], res['sales'])
+    assert [s['week'] for s in part] == list(range(5, 12))
+
+
+def test_pickle_round_trip():
+    res = run_simulation(**scenario(weeks=40, mat_lt=12, dist_lt=3))
+    back = pickle.loads(pickle.dumps(res))
+    for k in COLUMNS + ('week', 'coverage'):
+        np.testing.assert_array_equal(back[k], res[k], err_msg=k)
+        assert back[k].dtype == res[k].dtype
+    for k in PIPES:
+        np.testing.assert_array_equal(back[k], res[k], err_msg=k)
+    np.testing.assert_array_equal(back.smart_mode, res.smart_mode)
+    assert back[7] == res[7]
+
+
+def test_pipe_history_rows_hold_the_last_pushes():
+    assert pipe_history([1, 2, 3, 4], 3).tolist() == [[0, 0, 1], [0, 1, 2], [1, 2, 3], [2, 3, 4]]
+    assert pipe_history([5, 6], 3, prior=[9, 8, 7]).tolist() == [[8, 7, 5], [7, 5, 6]]
+    assert pipe_history([1, 2], 0).tolist() == [[1], [2]]
+
+
+def test_round1_matches_python_round():
+    rng = np.random.default_rng(0)
+    values = (rng.integers(0, 10 ** 6, 20000)
+              * rng.choice([0.05, 0.15, 0.25, 1.0, 37.3, 12.345], 20000)).tolist()
+    values += [0.05, 0.15, 0.25, 0.35, 2.675, 1.45, 1234.55, -0.05, -2.25]
+    assert round1(np.array(values)).tolist() == [round(v, 1) for v in values]
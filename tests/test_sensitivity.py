@@ -0,0 +1,64 @@
+import math
+import time
+
+import pytest
+
+from scsim.cli import resolve
+from scsim.sensitivity import LEVERS, perturbations, sensitivity
+from scsim.solver import kpis_at
+
+
+@pytest.fixture
+def base():
+    p = resolve({'weeks': 52, 'demand': {'shape': 'ramp', 'end': 300}})
+    return dict(p, total_stock=1500, store_pct=60, wh_pct=20, semi_pct=10)
+
+
+def test_rows_match_single_runs(base):
+    rows, base_kpis = sensitivity(base)
+    assert base_kpis['margin'] == kpis_at(base)['margin']
+    assert {r['lever'] for r in rows} == set(LEVERS)
+    for r in rows:
+        for side in ('low', 'high'):
+            k = kpis_at(base, **{r['lever']: r[side]})
+            assert r[f'margin_{side}'] == k['margin'], (r['lever'], side)
+            assert r[f'svc_level_{side}'] == k['svc_level'], (r['lever'], side)
+
+
+def test_sorted_by_largest_deviation(base):
+    rows, base_kpis = sensitivity(base, metrics=('svc_level',))
+    dev = [max(abs(r['svc_level_low'] - base_kpis['svc_level']),
+               abs(r['svc_level_high'] - base_kpis['svc_level'])) for r in rows]
+    assert dev == sorted(dev, reverse=True)
+
+
+def test_elasticity(base):
+    rows, base_kpis = sensitivity(base, levers=['total_stock'])
+    r = rows[0]
+    assert (r['low'], r['high']) == (1200, 1800)
+    dk = (r['margin_high'] - r['margin_low']) / base_kpis['margin']
+    assert r['margin_elasticity'] == pytest.approx(dk / (600 / 1500))
+
+
+def test_integer_base_values_keep_fractional_moves(base):
+    # An int base value must not truncate the perturbed values
+    rows, _ = sensitivity(dict(base, cap_ramp=0), levers=['cap_ramp'])
+    r = rows[0]
+    assert (r['low'], r['high']) == (0.0, 0.05)
+    assert r['margin_high'] == kpis_at(dict(base, cap_ramp=0), cap_ramp=0.05)['margin']
+    assert math.isnan(r['margin_elasticity'])   # no elasticity around 0
+
+
+def test_bounds(base):
+    moves = perturbations(dict(base, mat_lt=1, order_freq=4, store_pct=70, wh_pct=20, semi_pct=10))
+    assert moves['mat_lt'] == (1, 2)
+    assert moves['order_freq'] == (3, 4)
+    assert moves['store_pct'] == (65, 70)   # the split cannot pass 100 %
+
+
+def test_one_batch_within_the_interactive_budget(base):
+    sensitivity(base)   # imports and first-call costs
+    t0 = time.perf_counter()
+    rows, _ = sensitivity(dict(base, weeks=52, mat_lt=7))
+    assert 1 + 2 * len(rows) >= 21
+    assert time.perf_counter() - t0 < 1.0
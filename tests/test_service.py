@@ -0,0 +1,66 @@
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from scsim.cli import resolve
+from scsim.service import BATCH_FROM, SimService, _run_batch, make_server
+
+SPEC = {'var_cost': 37.3, 'cap_start': 87.5, 'order_freq': 1, 'demand': {'shape': 'ramp', 'end': 300}}
+OTHERS = [{'order_freq': f, 'mat_lt': lt, 'var_cost': 61.7} for f in (1, 2, 4) for lt in (3, 8)]
+
+
+@pytest.fixture(scope='module')
+def service():
+    # No memory LRU, so every request is simulated; batches wait long enough to fill up
+    with SimService(workers=1, max_wait_ms=300, memory_entries=0) as svc:
+        yield svc
+
+
+def test_run_batch_does_not_depend_on_batch_size():
+    # Below BATCH_FROM the scalar engine runs, above it the batch engine
+    batch = [resolve(s) for s in [SPEC] + OTHERS]
+    assert len(batch) >= BATCH_FROM
+    batched = _run_batch((26, batch, True, False))
+    for p, (kpis, trace, _) in zip(batch, batched):
+        alone_kpis, alone_trace, _ = _run_batch((26, [p], True, False))[0]
+        assert json.dumps(kpis) == json.dumps(alone_kpis)
+        assert trace == alone_trace
+
+
+def test_service_answer_does_not_depend_on_batching(service):
+    alone = service.run(SPEC, timeout=60)
+    futures = [service.submit(s) for s in OTHERS] + [service.submit(SPEC)]
+    rows = [f.result(60) for f in futures]
+    assert service.metrics()['max_batch'] >= BATCH_FROM
+    assert json.dumps(rows[-1]) == json.dumps(alone)
+
+
+def test_coalesces_identical_requests(service):
+    before = service.metrics()['coalesced']
+    spec = {'weeks': 13, 'var_cost': 99.9}
+    rows = [f.result(60) for f in [service.submit(spec) for _ in range(5)]]
+    assert all(r == rows[0] for r in rows)
+    assert service.metrics()['coalesced'] - before == 4
+
+
+def test_invalid_spec_raises(service):
+    with pytest.raises(ValueError):
+        service.submit({'no_such_key': 1})
+
+
+def test_http(service):
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://%s:%d' % server.server_address[:2]
+    try:
+        req = urllib.request.Request(base + '/simulate', json.dumps([SPEC, {'name': 'x'}]).encode())
+        rows = json.load(urllib.request.urlopen(req, timeout=60))
+        assert [r['name'] for r in rows] == ['', 'x']
+        assert rows[0]['var_cost_total'] == service.run(SPEC, timeout=60)['var_cost_total']
+        assert json.load(urllib.request.urlopen(base + '/health', timeout=10))['ok']
+        assert json.load(urllib.request.urlopen(base + '/metrics', timeout=10))['requests'] > 0
+    finally:
+        server.shutdown()
+        server.server_close()
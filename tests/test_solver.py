@@ -0,0 +1,61 @@
+import pytest
+
+from scsim import compute_kpis, run_simulation
+from scsim.solver import (_moves, cheapest_split_for_target, kpis_at, min_capacity_for_target,
+                          min_stock_for_target)
+from scsim.sweep import split_stock
+
+from test_batch import scenario
+
+SPLIT = {'store_pct': 60, 'wh_pct': 20, 'semi_pct': 10}
+# Demand ramping from 100 to 300 over the first weeks
+RAMP = [0] + [min(300, 100 + 25 * w) for w in range(1, 27)]
+
+
+@pytest.fixture
+def base():
+    return scenario(custom_demand=RAMP, total_stock=1500, **SPLIT)
+
+
+def test_kpis_at_matches_run_simulation(base):
+    init = dict(zip(('init_store', 'init_cw', 'init_semi', 'init_rawmat'),
+                    (int(x) for x in split_stock(2400, *SPLIT.values()))))
+    p = scenario(custom_demand=RAMP, **init)
+    expected = compute_kpis(run_simulation(**p)[1:], p['price'], p['var_cost'], p['fixed_pct'],
+                            p['base_forecast'], 26, p['init_store'], p['init_cw'], p['init_semi'],
+                            p['init_rawmat'])
+    got = kpis_at(base, total_stock=2400)
+    assert got['margin'] == expected['margin'] and got['svc_level'] == expected['svc_level']
+
+
+def test_min_stock_is_the_least_on_the_grid(base):
+    sol = min_stock_for_target(base, 0.95)
+    assert sol['feasible'] and sol['value'] >= 0.95
+    assert kpis_at(base, total_stock=sol['total_stock'] - 50)['svc_level'] < 0.95
+    assert sol['runs'] <= 30
+
+
+@pytest.mark.parametrize('param, below', [('cap_start', 10), ('cap_ramp', 0.05)])
+def test_min_capacity(base, param, below):
+    target = kpis_at(base, total_stock=1500, **{param: base[param] * 2})['svc_level']
+    sol = min_capacity_for_target(base, target, param=param)
+    assert sol['feasible'] and sol['value'] >= target
+    assert kpis_at(base, **{param: round(sol[param] - below, 6)})['svc_level'] < target
+    assert sol['runs'] <= 30
+
+
+def test_unreachable_target(base):
+    assert not min_stock_for_target(base, 1.01)['feasible']
+    assert not cheapest_split_for_target(base, 1.01)['feasible']
+
+
+def test_cheapest_split_in_tens_of_runs(base):
+    sol = cheapest_split_for_target(base, 0.95)
+    split = {k: sol[k] for k in SPLIT}
+    assert sol['feasible'] and sol['value'] >= 0.95
+    assert sol['runs'] <= 150
+    # No worse than the sidebar's split, and no single 10 % shift does better
+    assert sol['init_stock_value'] <= min_stock_for_target(base, 0.95)['kpis']['init_stock_value']
+    for other in _moves(split, 10):
+        alt = min_stock_for_target(dict(base, **other), 0.95)
+        assert not alt['feasible'] or alt['kpis']['init_stock_value'] >= sol['init_stock_value']
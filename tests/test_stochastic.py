@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from scsim import compute_kpis, run_simulation
+from scsim.stochastic import (CHUNK, FAN_SERIES, NOISE_MODELS, demand_profile,
+                              run_monte_carlo, sample_demand)
+
+from test_batch import scenario
+
+# Demand ramping from 100 to 250
+PARAMS = scenario(weeks=20, order_freq=2, var_cost=37.3,
+                  custom_demand=[0] + [min(250, 100 + 25 * w) for w in range(1, 21)])
+
+
+def test_profile_is_the_deterministic_demand():
+    np.testing.assert_array_equal(demand_profile(PARAMS)[1:], run_simulation(**PARAMS)['demand'][1:])
+
+
+@pytest.mark.parametrize('noise', NOISE_MODELS)
+def test_samples_are_whole_units_around_the_profile(noise):
+    profile = demand_profile(PARAMS)
+    dem = sample_demand(profile, 4000, noise, cv=0.3, rng=np.random.default_rng(1))
+    assert dem.shape == (4000, 21)
+    assert (dem[:, 1:] == np.rint(dem[:, 1:])).all() and (dem >= 0).all()
+    np.testing.assert_array_equal(dem[:, 0], profile[0])
+    np.testing.assert_allclose(dem[:, 1:].mean(axis=0), profile[1:], rtol=0.05)
+
+
+def test_negbin_and_lognormal_follow_the_cv():
+    profile = np.full(2, 200.0)
+    for noise in ('negbin', 'lognormal'):
+        dem = sample_demand(profile, 20000, noise, cv=0.4, rng=np.random.default_rng(2))
+        assert dem[:, 1].std() / dem[:, 1].mean() == pytest.approx(0.4, rel=0.05)
+
+
+def test_unknown_noise_raises():
+    with pytest.raises(ValueError):
+        sample_demand(demand_profile(PARAMS), 3, 'uniform')
+
+
+def test_seed_is_reproducible_and_prefix_stable():
+    a = run_monte_carlo(PARAMS, n=CHUNK + 50, noise='negbin', seed=7)
+    b = run_monte_carlo(PARAMS, n=CHUNK + 50, noise='negbin', seed=7)
+    c = run_monte_carlo(PARAMS, n=CHUNK, noise='negbin', seed=7)
+    for k in a.kpis:
+        np.testing.assert_array_equal(a.kpis[k], b.kpis[k], err_msg=k)
+        np.testing.assert_array_equal(a.kpis[k][:CHUNK], c.kpis[k], err_msg=k)
+    assert len(a) == CHUNK + 50
+    assert not np.array_equal(run_monte_carlo(PARAMS, n=50, seed=8).kpis['total_demand'],
+                              a.kpis['total_demand'][:50])
+
+
+@pytest.mark.parametrize('noise', NOISE_MODELS)
+def test_prefix_stable_within_a_chunk(noise):
+    # cv=0.05 is below Poisson dispersion: negbin falls back to Poisson draws
+    a = run_monte_carlo(PARAMS, n=10, noise=noise, cv=0.05, seed=1)
+    b = run_monte_carlo(PARAMS, n=50, noise=noise, cv=0.05, seed=1)
+    for k in a.kpis:
+        np.testing.assert_array_equal(a.kpis[k], b.kpis[k][:10], err_msg=k)
+    np.testing.assert_array_equal(a.series['demand'], b.series['demand'][:10])
+
+
+def test_replications_match_single_runs():
+    mc = run_monte_carlo(PARAMS, n=5, noise='lognormal', seed=3)
+    for i in range(5):
+        p = dict(PARAMS, custom_demand=mc.series['demand'][i].astype(int).tolist())
+        res = run_simulation(**p)
+        for k in FAN_SERIES:
+            np.testing.assert_array_equal(mc.series[k][i][1:], res[k][1:], err_msg=k)
+        expected = compute_kpis(res, p['price'], p['var_cost'], p['fixed_pct'],
+                                p['base_forecast'], p['weeks'], p['init_store'], p['init_cw'],
+                                p['init_semi'], p['init_rawmat'])
+        for k, v in expected.items():
+            assert mc.kpis[k][i] == v, (i, k)
+
+
+def test_summaries():
+    mc = run_monte_carlo(PARAMS, n=500, seed=0)
+    fan = mc.fan('sales')
+    assert fan.shape == (21, len(mc.quantiles))
+    assert (np.diff(fan, axis=1) >= 0).all()
+    svc = mc.kpis['svc_level']
+    assert mc.prob('svc_level', 0.9) == np.mean(svc < 0.9)
+    pct = mc.percentiles('svc_level')
+    assert list(pct) == [5, 50, 95] and pct[5] <= pct[50] <= pct[95]
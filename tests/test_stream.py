@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from scsim import RunningKpis, compute_kpis, run_simulation, stream_simulation
+from scsim.result import COLUMNS, PIPES
+
+from test_batch import SCENARIOS, scenario
+from test_kpis import kpi_args
+
+
+@pytest.mark.parametrize('chunk_weeks', [1, 5, 52])
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_chunks_concatenate_to_run_simulation(p, chunk_weeks):
+    full = run_simulation(**p)
+    chunks = list(stream_simulation(**p, chunk_weeks=chunk_weeks))
+    assert all(len(c) <= chunk_weeks for c in chunks)
+    assert sum(len(c) for c in chunks) == len(full)
+    for k in COLUMNS + ('week', 'coverage'):
+        np.testing.assert_array_equal(np.concatenate([c[k] for c in chunks]), full[k], err_msg=k)
+    for k in PIPES:
+        np.testing.assert_array_equal(np.concatenate([c[k] for c in chunks]), full[k], err_msg=k)
+    np.testing.assert_array_equal(np.concatenate([c.smart_mode for c in chunks]), full.smart_mode)
+
+    args = kpi_args(p)
+    running = RunningKpis(*args[:4], *args[5:])
+    for c in chunks:
+        running.update(c)
+    assert running.result() == compute_kpis(full, *args)
+
+
+def test_open_ended_run_follows_the_demand_iterable():
+    demand = [100 + w % 7 for w in range(301)]
+    p = dict(scenario(), weeks=None, custom_demand=iter(demand))
+    chunks = list(stream_simulation(**p, chunk_weeks=64))
+    expected = run_simulation(**dict(p, weeks=300, custom_demand=demand))
+    for k in ('week', 'demand', 'sales', 'cost_fp'):
+        np.testing.assert_array_equal(np.concatenate([c[k] for c in chunks]), expected[k], err_msg=k)
+
+
+def test_open_ended_run_needs_demand():
+    p = dict(scenario(), weeks=None)
+    with pytest.raises(ValueError):
+        next(stream_simulation(**p))
+
+
+def test_running_kpis_skip_week_zero_and_scale_fixed_costs():
+    p = scenario(weeks=40)
+    args = kpi_args(p)
+    running = RunningKpis(*args[:4], *args[5:])
+    for c in stream_simulation(**p, chunk_weeks=7):
+        running.update(c)
+    assert running.weeks == 40
+    assert running.result(weeks=80)['fixed'] == 2 * running.result()['fixed']
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from scsim import compute_kpis, run_simulation
+from scsim.sweep import SIM_ARGS, evaluate_grid, expand_grid, run_sweep, split_lead_time, split_stock
+
+from test_batch import scenario
+
+BASE = scenario(weeks=20, cap_start=87.5, var_cost=37.3)
+RANGES = {'order_freq': [1, 2, 4], 'total_lt': [8, 11, 16], 'total_stock': [0, 1500, 4000]}
+
+
+def test_split_stock_rounds_like_the_sidebar():
+    store, cw, semi, raw = split_stock(np.array([1500, 1001]), 60, 20, 10)
+    assert store.tolist() == [900, 601]
+    assert cw.tolist() == [300, 200]
+    assert semi.tolist() == [150, 100]
+    assert raw.tolist() == [150, 100]
+
+
+def test_split_lead_time_keeps_the_base_proportions():
+    assert [int(x) for x in split_lead_time(8, 6, 3, 1, 1)] == [4, 2, 1, 1]
+    assert [int(x) for x in split_lead_time(11, 6, 3, 1, 1)] == [6, 3, 1, 1]
+    mat, semi, fp, dist = split_lead_time(np.arange(4, 30), 6, 3, 1, 1)
+    assert ((mat + semi + fp + dist) == np.arange(4, 30)).all()
+    assert (np.minimum.reduce([mat, semi, fp, dist]) >= 1).all()
+
+
+def test_expand_grid_is_the_cartesian_product():
+    grid = expand_grid(BASE, RANGES)
+    assert len(grid['order_freq']) == 27
+    points = set(zip(grid['order_freq'].tolist(), grid['total_lt'].tolist(),
+                     grid['total_stock'].tolist()))
+    assert len(points) == 27
+    assert (grid['price'] == BASE['price']).all()
+    total = grid['init_store'] + grid['init_cw'] + grid['init_semi'] + grid['init_rawmat']
+    assert (total == grid['total_stock']).all()
+
+
+def test_rows_equal_single_runs():
+    table = run_sweep(BASE, RANGES, workers=1)
+    for i in range(len(table['order_freq'])):
+        p = {'weeks': 20, **{k: table[k][i].item() for k in SIM_ARGS}}
+        expected = compute_kpis(run_simulation(**p), p['price'], p['var_cost'], p['fixed_pct'],
+                                p['base_forecast'], 20, p['init_store'], p['init_cw'],
+                                p['init_semi'], p['init_rawmat'])
+        for k, v in expected.items():
+            assert table['var_cost_total' if k == 'var_cost' else k][i] == v, (i, k)
+
+
+def test_process_pool_gives_the_same_table():
+    ranges = {'weeks': [20, 26], 'order_freq': [1, 3], 'total_stock': [0, 3000]}
+    serial = run_sweep(BASE, ranges, workers=1)
+    pooled = run_sweep(BASE, ranges, workers=2)
+    assert serial.keys() == pooled.keys()
+    for k in serial:
+        np.testing.assert_array_equal(pooled[k], serial[k], err_msg=k)
+
+
+def test_evaluate_grid_rejects_empty_or_incomplete_grids():
+    grid = expand_grid(BASE, RANGES)
+    with pytest.raises(ValueError, match='no rows'):
+        evaluate_grid({k: v[:0] for k, v in grid.items()}, workers=1)
+    with pytest.raises(ValueError, match='weeks'):
+        evaluate_grid({k: v for k, v in grid.items() if k != 'weeks'}, workers=1)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from scsim import run_simulation, simulate_flows, valuate
+from scsim.result import COLUMNS, FLOW_COLUMNS
+from scsim.valuation import ECON_ARGS
+
+from test_batch import SCENARIOS
+
+
+def flow_args(p):
+    return {k: v for k, v in p.items() if k not in ECON_ARGS}
+
+
+@pytest.mark.parametrize('p', SCENARIOS)
+def test_valuated_flows_equal_run_simulation(p):
+    expected = run_simulation(**p)
+    got = valuate(simulate_flows(**flow_args(p)), p['var_cost'])
+    for k in COLUMNS:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+
+
+def test_repricing_reuses_the_flows():
+    p = SCENARIOS[2]
+    flows = simulate_flows(**flow_args(p))
+    assert not any(k.startswith('cost_') for k in flows.cols)
+    for var_cost in (1, 37.3, 199.99, 512.5):
+        priced = valuate(flows, var_cost)
+        assert priced['sales'] is flows['sales']
+        expected = run_simulation(**dict(p, var_cost=var_cost))
+        for k in ('cost_mat', 'cost_semi', 'cost_fp'):
+            np.testing.assert_array_equal(priced[k], expected[k], err_msg=(var_cost, k))
+
+
+def test_flows_do_not_depend_on_economics():
+    p = SCENARIOS[3]
+    a = run_simulation(**p)
+    b = run_simulation(**dict(p, price=5, var_cost=3.3, fixed_pct=0.9))
+    for k in FLOW_COLUMNS:
+        np.testing.assert_array_equal(a[k], b[k], err_msg=k)
+